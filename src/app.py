@@ -1,11 +1,26 @@
-﻿import tkinter as tk
+﻿import queue
+import time
+import tkinter as tk
 from tkinter import ttk, font as tkfont
 
-from .weather import fetch_forecast_periods, fetch_latest_relative_humidity
-from .cities import CITY_DB, ALL_CITIES
+from .cities import CITY_DB, CITY_ALAND, ALL_CITIES
 from .city_search import CitySearchController
 from .forecast_summary import build_day_summaries
 from .forecast_format import format_days, format_now
+from .metrics import tracing
+
+POLL_INTERVAL_MS = 50
+
+
+def _age_text(fetched_at):
+    minutes = int((time.time() - fetched_at) // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes} min ago"
+    if minutes < 48 * 60:
+        return f"{minutes // 60} h ago"
+    return f"{minutes // (24 * 60)} days ago"
 
 
 class WeatherApp(tk.Tk):
@@ -15,9 +30,8 @@ class WeatherApp(tk.Tk):
         self.geometry("700x520")
         self.resizable(False, False)
 
-        default_city = ALL_CITIES[0] if ALL_CITIES else ""
-        self.city_var = tk.StringVar(value=default_city)
-        self.status_var = tk.StringVar(value="Ready" if ALL_CITIES else "No cities loaded")
+        self.city_var = tk.StringVar(value="")
+        self.status_var = tk.StringVar(value="Loading cities...")
 
         self.time_range_var = tk.StringVar(value="")
         self.show_temp_range = tk.BooleanVar(value=False)
@@ -33,7 +47,7 @@ class WeatherApp(tk.Tk):
         self.city_combo = ttk.Combobox(
             frame,
             textvariable=self.city_var,
-            values=ALL_CITIES,
+            values=(),
             width=45,
         )
         self.city_combo.grid(row=0, column=1, sticky="we", padx=(8, 8))
@@ -42,28 +56,25 @@ class WeatherApp(tk.Tk):
         self.suggest_list = tk.Listbox(frame, height=0)
         self.suggest_list.grid(row=1, column=1, sticky="we", padx=(8, 8))
         self.suggest_list.grid_remove()
-        self.suggest_scroll = ttk.Scrollbar(frame, orient="vertical", command=self.suggest_list.yview)
-        self.suggest_list.configure(yscrollcommand=self.suggest_scroll.set)
+        # CitySearchController drives the scrollbar; the Listbox only holds the visible rows.
+        self.suggest_scroll = ttk.Scrollbar(frame, orient="vertical")
         self.suggest_scroll.grid(row=1, column=2, sticky="nsw")
         self.suggest_scroll.grid_remove()
 
         self.fetch_btn = ttk.Button(frame, text="Fetch", command=self.on_fetch)
         self.fetch_btn.grid(row=0, column=2, sticky="e")
 
+        self.pin_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Pin", variable=self.pin_var, command=self.on_toggle_pin).grid(
+            row=0, column=3, sticky="e", padx=(8, 0)
+        )
+
         frame.columnconfigure(1, weight=1)
 
-        self.city_search = CitySearchController(
-            self.city_combo,
-            self.suggest_list,
-            self.city_var,
-            ALL_CITIES,
-            suggest_scroll=self.suggest_scroll,
-            max_display=10,
-        )
-        self.city_search.bind(status_callback=self.status_var.set)
+        self.city_search = None
 
         options_frame = ttk.Frame(frame)
-        options_frame.grid(row=2, column=0, columnspan=3, sticky="we", pady=(10, 0))
+        options_frame.grid(row=2, column=0, columnspan=4, sticky="we", pady=(10, 0))
 
         time_frame = ttk.LabelFrame(options_frame, text="Time Range")
         time_frame.grid(row=0, column=0, sticky="w", padx=(0, 12))
@@ -101,19 +112,67 @@ class WeatherApp(tk.Tk):
             row=1, column=0, sticky="w", padx=8, pady=2
         )
 
-        ttk.Separator(frame).grid(row=3, column=0, columnspan=3, sticky="we", pady=12)
+        ttk.Separator(frame).grid(row=3, column=0, columnspan=4, sticky="we", pady=12)
 
         self.output_font = tkfont.Font(family="Times New Roman", size=11)
         self.output = tk.Text(frame, height=14, wrap="word", font=self.output_font)
-        self.output.grid(row=4, column=0, columnspan=3, sticky="nsew")
+        self.output.grid(row=4, column=0, columnspan=4, sticky="nsew")
         self.output.configure(state="disabled")
 
         ttk.Label(frame, textvariable=self.status_var).grid(
-            row=5, column=0, columnspan=3, sticky="w", pady=(8, 0)
+            row=5, column=0, columnspan=4, sticky="w", pady=(8, 0)
         )
 
         self.bind("<Return>", lambda event: self.on_fetch())
 
+        # The network stack (requests, thread pools) and the background refresh of
+        # recent and pinned cities start on the first fetch or pin, not at startup.
+        self.engine = None
+        self.prefetch = None
+        self.history = None
+        self.history_reader = None
+        self.results = queue.Queue()
+        self.fetch_generation = 0
+        self.lookup = None
+        self.polling = False
+
+        # Show the window first; the city list loads on the first timer tick.
+        self.after(1, self.load_cities)
+
+    def load_cities(self):
+        all_cities = list(ALL_CITIES)
+        self.city_combo["values"] = all_cities
+        if all_cities and not self.city_var.get():
+            self.city_var.set(all_cities[0])
+        self.status_var.set("Ready" if all_cities else "No cities loaded")
+
+        self.city_search = CitySearchController(
+            self.city_combo,
+            self.suggest_list,
+            self.city_var,
+            all_cities,
+            suggest_scroll=self.suggest_scroll,
+            max_display=10,
+            weights=[CITY_ALAND.get(c, 0) for c in all_cities],
+        )
+        self.city_search.bind(status_callback=self.status_var.set)
+
+    def start_engine(self):
+        if self.engine is not None:
+            return
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .fetch_engine import FetchEngine
+        from .history import HistoryStore
+        from .prefetch import PrefetchScheduler
+
+        self.engine = FetchEngine()
+        self.history = HistoryStore()
+        # SQLite reads (and waits on a flush in progress) stay off the Tk thread.
+        self.history_reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self.prefetch = PrefetchScheduler(self.engine, history=self.history)
+        self.prefetch.start()
+
     def set_output(self, text: str):
         self.output.configure(state="normal")
         self.output.delete("1.0", "end")
@@ -131,55 +190,213 @@ class WeatherApp(tk.Tk):
             )
             return
 
+        # Repeated Enter presses for the city already being fetched are no-ops.
+        if self.lookup is not None and self.lookup["city"] == city and not self.lookup["done"]:
+            return
+
+        self.start_engine()
+        self.cancel_fetch()
         lat, lon = CITY_DB[city]
+        self.fetch_generation += 1
+        generation = self.fetch_generation
+        self.prefetch.touch(city, lat, lon)
+        self.pin_var.set(self.prefetch.is_pinned(city))
+
+        cached = self.prefetch.get(city)
+        if cached is not None:
+            self.show_cached(city, lat, lon, cached)
+            return
+
+        handle = self.engine.start(lat, lon)
+        # The last forecast on record (from an earlier run, say) is shown while the refresh runs.
+        last_known = self.history_reader.submit(self.history.last, city)
+        self.lookup = {
+            "city": city,
+            "lat": lat,
+            "lon": lon,
+            "handle": handle,
+            "periods": None,
+            "humidity": None,
+            "forecast_done": False,
+            "humidity_done": False,
+            "done": False,
+            "error": None,
+            "last_known": None,
+            "last_known_done": False,
+        }
+        # Engine callbacks run on worker threads; they only enqueue, and the
+        # Tk thread picks the results up in _poll_results.
+        handle.forecast.add_done_callback(lambda f: self.results.put((generation, "forecast", f)))
+        handle.humidity.add_done_callback(lambda f: self.results.put((generation, "humidity", f)))
+        last_known.add_done_callback(lambda f: self.results.put((generation, "last_known", f)))
 
         self.status_var.set("Fetching forecast from NWS...")
         self.set_output("Fetching...\n")
-        self.update_idletasks()
+        if not self.polling:
+            self.polling = True
+            self.after(POLL_INTERVAL_MS, self._poll_results)
 
+    def show_cached(self, city, lat, lon, cached):
         try:
-            periods = fetch_forecast_periods(lat, lon)
-            humidity = fetch_latest_relative_humidity(lat, lon)
-
-            if not periods:
-                raise ValueError("No forecast periods returned.")
+            self.render_forecast(city, lat, lon, cached["periods"], cached["humidity"])
+        except Exception as e:
+            self.status_var.set("Error")
+            self.set_output(f"Error:\n{e}")
+            return
+        self.status_var.set(f"Done (updated {_age_text(cached['fetched_at'])})")
 
-            target_unit = self.temp_unit_var.get()
+    def show_last_known(self, city, lat, lon, last_known):
+        try:
+            self.render_forecast(city, lat, lon, last_known["periods"], last_known["humidity"])
+        except Exception:
+            return False
+        return True
 
-            lines = []
-            lines.append(f"City: {city}")
-            lines.append(f"Coords: {lat:.4f}, {lon:.4f}")
-            lines.append("")
-            lines.append(format_now(periods[0], humidity, target_unit))
-
-            time_range = self.time_range_var.get().strip()
-            if time_range in ("1", "3", "7"):
-                days = int(time_range)
-                summaries = build_day_summaries(periods)
-                lines.append("")
-                lines.append(f"Forecast (next {days} day{'s' if days > 1 else ''}):")
-                lines.extend(
-                    format_days(
-                        summaries,
-                        days,
-                        show_temp_range=self.show_temp_range.get(),
-                        show_weather=self.show_weather.get(),
-                        show_wind=self.show_wind.get(),
-                        target_unit=target_unit,
-                        font=self.output_font,
-                    )
-                )
+    def on_toggle_pin(self):
+        city = self.city_var.get().strip()
+        if city not in CITY_DB:
+            self.pin_var.set(False)
+            self.status_var.set("Pick a city from the list to pin it.")
+            return
+        self.start_engine()
+        if self.pin_var.get():
+            self.prefetch.pin(city, *CITY_DB[city])
+            self.status_var.set(f"Pinned {city}; it is kept up to date in the background.")
+        else:
+            self.prefetch.unpin(city)
+            self.status_var.set(f"Unpinned {city}.")
+
+    def cancel_fetch(self):
+        if self.lookup is not None and not self.lookup["done"]:
+            self.lookup["handle"].cancel()
+        self.lookup = None
+
+    def _poll_results(self):
+        while True:
+            try:
+                generation, kind, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # Results for a previously selected city are stale.
+            if generation != self.fetch_generation or self.lookup is None or future.cancelled():
+                continue
+            self._apply_result(kind, future)
+
+        # A last-known forecast may still be on its way after the lookup failed.
+        if self.lookup is not None and not (self.lookup["done"] and self.lookup["last_known_done"]):
+            self.after(POLL_INTERVAL_MS, self._poll_results)
+        else:
+            self.polling = False
+
+    def _apply_result(self, kind, future):
+        lookup = self.lookup
+        error = future.exception()
+
+        if kind == "last_known":
+            lookup["last_known_done"] = True
+            last_known = future.result() if error is None else None
+            # Too late once the refresh has rendered; otherwise it fills the wait (or the failure).
+            if last_known is None or lookup["periods"] is not None:
+                return
+            if not self.show_last_known(lookup["city"], lookup["lat"], lookup["lon"], last_known):
+                return
+            lookup["last_known"] = last_known
+            if lookup["error"] is not None:
+                self._show_refresh_failed(lookup["error"], last_known)
+            else:
+                self.status_var.set(f"Showing the forecast from {_age_text(last_known['fetched_at'])}; refreshing...")
+            return
 
-            self.set_output("\n".join(lines))
-            self.status_var.set("Done")
+        if kind == "forecast":
+            lookup["forecast_done"] = True
+            if error is None and not future.result():
+                error = ValueError("No forecast periods returned.")
+            if error is not None:
+                lookup["done"] = True
+                lookup["error"] = error
+                lookup["handle"].cancel()
+                if lookup["last_known"] is not None:
+                    self._show_refresh_failed(error, lookup["last_known"])
+                    return
+                self.status_var.set("Error")
+                self.set_output(f"Error:\n{error}")
+                return
+            lookup["periods"] = future.result()
+        else:
+            lookup["humidity_done"] = True
+            # Humidity is optional; a failed observation chain just leaves it out.
+            lookup["humidity"] = future.result() if error is None else None
+
+        if lookup["periods"] is None:
+            return
 
+        try:
+            # Rendering joins the lookup's trace, so its time shows in the breakdown.
+            with tracing(lookup["handle"].trace):
+                self.render_forecast(lookup["city"], lookup["lat"], lookup["lon"], lookup["periods"], lookup["humidity"])
         except Exception as e:
+            lookup["done"] = True
             self.status_var.set("Error")
             self.set_output(f"Error:\n{e}")
+            return
+
+        if lookup["humidity_done"]:
+            lookup["done"] = True
+            self.prefetch.store(lookup["city"], lookup["periods"], lookup["humidity"])
+            self.status_var.set(f"Done ({lookup['handle'].trace.summary()})")
+        else:
+            self.status_var.set("Fetching humidity from nearby stations...")
+
+    def _show_refresh_failed(self, error, last_known):
+        # Offline (or NWS down): the last forecast on record stays up.
+        self.status_var.set(
+            f"Could not refresh ({error}); showing the forecast from {_age_text(last_known['fetched_at'])}"
+        )
+
+    def render_forecast(self, city, lat, lon, periods, humidity):
+        target_unit = self.temp_unit_var.get()
+
+        lines = []
+        lines.append(f"City: {city}")
+        lines.append(f"Coords: {lat:.4f}, {lon:.4f}")
+        lines.append("")
+        lines.append(format_now(periods[0], humidity, target_unit))
+
+        time_range = self.time_range_var.get().strip()
+        if time_range in ("1", "3", "7"):
+            days = int(time_range)
+            summaries = build_day_summaries(periods)
+            lines.append("")
+            lines.append(f"Forecast (next {days} day{'s' if days > 1 else ''}):")
+            lines.extend(
+                format_days(
+                    summaries,
+                    days,
+                    show_temp_range=self.show_temp_range.get(),
+                    show_weather=self.show_weather.get(),
+                    show_wind=self.show_wind.get(),
+                    target_unit=target_unit,
+                    font=self.output_font,
+                )
+            )
+
+        self.set_output("\n".join(lines))
 
 
 def main():
-    WeatherApp().mainloop()
+    app = WeatherApp()
+    try:
+        app.mainloop()
+    finally:
+        app.cancel_fetch()
+        if app.prefetch is not None:
+            app.prefetch.stop()
+        if app.history_reader is not None:
+            app.history_reader.shutdown(wait=False, cancel_futures=True)
+        if app.history is not None:
+            app.history.close()
+        if app.engine is not None:
+            app.engine.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,694 @@
+"""
+bench.py
+
+Offline benchmarks. Network benchmarks run against the local NWS stand-in
+(src/nws_standin.py), never the live API.
+
+Usage:
+  python -m src.bench handshake [--lookups 50] [--latency 0.0]
+  python -m src.bench search [--sizes 700,30000,100000]
+  python -m src.bench startup [--runs 5]
+  python -m src.bench memory
+  python -m src.bench hourly [--cities 500]
+  python -m src.bench model [--forecasts 500]
+  python -m src.bench format [--cities 500]
+  python -m src.bench e2e [--lookups 50] [--latency 0.0] [--error-rate 0.0] [--null-humidity 0.0]
+                          [--slow-rate 0.0 --slow-latency 1.0] [--down-stations 0.0] [--plain]
+                          [--fixtures recorded.json] [--json] [--check baseline.json]
+
+"e2e --check" compares the run against limits in a baseline file and exits
+with status 1 on any regression; tests/test_bench.py runs it against
+tests/fixtures/e2e_baseline.json.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from .city_index import CityIndex
+from .http_client import HEADERS_NWS, NWSClient
+from .nws_standin import POINTS_RE, Fixtures, start_standin
+
+SYLLABLES = ["ab", "an", "ber", "bur", "ca", "del", "e", "field", "ford", "ham", "lan", "ley", "lo",
+             "ma", "mont", "new", "or", "port", "ri", "ro", "san", "spring", "ta", "ton", "ville", "wood"]
+STATES = ["AL", "AZ", "CA", "CO", "FL", "GA", "IL", "MI", "NY", "OH", "PA", "TX", "WA"]
+
+
+def _lookup_chain(get: Callable[[str], requests.Response], base: str, lat: float, lon: float) -> None:
+    """The request chain of one city lookup: /points, forecast, stations, one observation."""
+    points = get(f"{base}/points/{lat:.4f},{lon:.4f}").json()["properties"]
+    get(points["forecast"]).json()
+    stations = get(points["observationStations"]).json()["features"]
+    station_id = stations[0]["properties"]["stationIdentifier"]
+    get(f"{base}/stations/{station_id}/observations/latest").json()
+
+
+def bench_handshake(lookups: int, latency: float) -> Dict[str, Dict[str, float]]:
+    server = start_standin(latency=latency)
+    base = server.base_url
+    coords = [(35.0 + i * 0.01, -80.0 - i * 0.01) for i in range(lookups)]
+    results: Dict[str, Dict[str, float]] = {}
+
+    def bare_get(url: str) -> requests.Response:
+        return requests.get(url, headers=HEADERS_NWS, timeout=20)
+
+    client = NWSClient(base_url=base)
+    try:
+        for name, get in (("bare requests.get", bare_get), ("pooled NWSClient", client.get)):
+            server.state.reset()
+            start = time.perf_counter()
+            for lat, lon in coords:
+                _lookup_chain(get, base, lat, lon)
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                "seconds": elapsed,
+                "ms_per_lookup": elapsed * 1000 / lookups,
+                "requests": server.state.requests,
+                "connections": server.state.connections,
+            }
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def synthetic_city_names(count: int, seed: int = 15113) -> List[str]:
+    """Gazetteer-like "Name city, ST" strings; real names first when count allows."""
+    from .cities import ALL_CITIES
+
+    rng = random.Random(seed)
+    names = set(ALL_CITIES[:count])
+    while len(names) < count:
+        stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        names.add(f"{stem} {rng.choice(['city', 'town', 'village'])}, {rng.choice(STATES)}")
+    return sorted(names)
+
+
+def bench_search(sizes: List[int], queries: int = 200) -> Dict[int, Dict[str, float]]:
+    """Per-keystroke latency of typing queries one character at a time."""
+    results: Dict[int, Dict[str, float]] = {}
+    for size in sizes:
+        names = synthetic_city_names(size)
+        rng = random.Random(size)
+        typed: List[str] = []
+        for _ in range(queries):
+            name = rng.choice(names).lower()
+            start = rng.randrange(max(len(name) - 6, 1))
+            word = name[start : start + rng.randint(3, 8)].strip()
+            # The controller strips what the user typed before searching.
+            typed.extend(word[: i + 1].strip() for i in range(len(word)) if word[i] != " ")
+
+        build_start = time.perf_counter()
+        index = CityIndex(names)
+        index.search("zz")
+        build = time.perf_counter() - build_start
+
+        scan_times: List[float] = []
+        index_times: List[float] = []
+        ranked_times: List[float] = []
+        for query in typed:
+            t0 = time.perf_counter()
+            expected = [c for c in names if query in c.lower()]
+            t1 = time.perf_counter()
+            got = index.search(query)
+            t2 = time.perf_counter()
+            index.ranked(query, 50)
+            t3 = time.perf_counter()
+            assert got == expected, query
+            scan_times.append(t1 - t0)
+            index_times.append(t2 - t1)
+            ranked_times.append(t3 - t2)
+
+        results[size] = {
+            "keystrokes": len(typed),
+            "build_ms": build * 1000,
+            "scan_ms": statistics.mean(scan_times) * 1000,
+            "scan_p95_ms": statistics.quantiles(scan_times, n=20)[-1] * 1000,
+            "index_ms": statistics.mean(index_times) * 1000,
+            "index_p95_ms": statistics.quantiles(index_times, n=20)[-1] * 1000,
+            "ranked_ms": statistics.mean(ranked_times) * 1000,
+            "ranked_p95_ms": statistics.quantiles(ranked_times, n=20)[-1] * 1000,
+        }
+    return results
+
+
+STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import src.app
+t1 = time.perf_counter()
+out = {"import_ms": (t1 - t0) * 1000, "requests_imported": "requests" in sys.modules, "window_ms": None}
+if sys.argv[1] == "window":
+    try:
+        app = src.app.WeatherApp()
+        app.update()
+        out["window_ms"] = (time.perf_counter() - t0) * 1000
+        app.destroy()
+    except Exception as e:
+        out["window_error"] = str(e).splitlines()[0]
+print(json.dumps(out))
+"""
+
+
+def _startup_probe(mode: str) -> Dict[str, Any]:
+    root = Path(__file__).resolve().parent.parent
+    proc = subprocess.run(
+        [sys.executable, "-c", STARTUP_PROBE, mode], cwd=root, capture_output=True, text=True, check=True
+    )
+    return json.loads(proc.stdout)
+
+
+def bench_startup(runs: int) -> Dict[str, Any]:
+    """Fresh-interpreter import time of src.app, time to first window, and city load time per source."""
+    from .cities import ARTIFACT_PATH, DATA_PATH, _load_city_db
+    from .city_store import CityStore
+
+    imports = [_startup_probe("import") for _ in range(runs)]
+    windows = [_startup_probe("window") for _ in range(runs)]
+    window_ms: List[float] = [w["window_ms"] for w in windows if w["window_ms"] is not None]
+
+    loads: Dict[str, Optional[float]] = {}
+    for name, loader, path in (("tsv", _load_city_db, DATA_PATH), ("artifact", CityStore.from_artifact, ARTIFACT_PATH)):
+        if not path.exists():
+            loads[name] = None
+            continue
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            loader(path)
+        loads[name] = (time.perf_counter() - t0) * 1000 / runs
+
+    return {
+        "import_ms": statistics.median(i["import_ms"] for i in imports),
+        "requests_imported": any(i["requests_imported"] for i in imports),
+        "window_ms": statistics.median(window_ms) if window_ms else None,
+        "window_error": next((w["window_error"] for w in windows if "window_error" in w), None),
+        "load_tsv_ms": loads["tsv"],
+        "load_artifact_ms": loads["artifact"],
+    }
+
+
+def national_gazetteer_records() -> List[Any]:
+    """Every place in the Census gazetteer as (name, lat, lon, aland), read from the zip."""
+    import csv
+
+    from .city_info_processor import INPUT_PATH, _record, open_gazetteer
+
+    by_name: Dict[str, Any] = {}
+    with open_gazetteer(INPUT_PATH) as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            record = _record(row)
+            if record is not None:
+                by_name[record[0]] = record
+    return list(by_name.values())
+
+
+def _allocated(build: Callable[[], Any]) -> Tuple[int, Any]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory() -> Dict[str, Dict[str, float]]:
+    """Bytes held by the dict layout (CITY_DB + CITY_ALAND + ALL_CITIES) vs a CityStore."""
+    from .cities import CITY_DB
+    from .city_store import CityStore
+
+    datasets = {
+        "filtered": [(n, *CITY_DB[n], 0) for n in CITY_DB],
+        "national": national_gazetteer_records(),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for label, records in datasets.items():
+        # Fresh string copies, so both layouts pay for their names.
+        def dict_layout() -> Any:
+            db = {name.encode().decode(): (lat, lon) for name, lat, lon, _ in records}
+            aland = {name: a for name, (_, _, _, a) in zip(db, records)}
+            return db, aland, sorted(db)
+
+        dict_bytes, layout = _allocated(dict_layout)
+        store_bytes, store = _allocated(lambda: CityStore.from_records(records))
+
+        probe = [r[0] for r in records[:: max(len(records) // 2000, 1)]]
+        t0 = time.perf_counter()
+        for name in probe:
+            layout[0][name]
+        t1 = time.perf_counter()
+        for name in probe:
+            store[name]
+        t2 = time.perf_counter()
+
+        results[label] = {
+            "cities": len(records),
+            "dict_bytes": dict_bytes,
+            "store_bytes": store_bytes,
+            "dict_lookup_us": (t1 - t0) * 1e6 / len(probe),
+            "store_lookup_us": (t2 - t1) * 1e6 / len(probe),
+        }
+    return results
+
+
+def bench_hourly(cities: int, repeat: int = 3) -> Dict[str, Any]:
+    """Day summaries for many cities: 12-hour periods vs hourly columns (per city and batched)."""
+    from . import hourly
+    from .forecast_model import decode_forecast
+    from .forecast_summary import build_day_summaries
+    from .nws_standin import _forecast_periods, _hourly_periods
+
+    rng = random.Random(15113)
+    cells = [(rng.randrange(10_000), rng.randrange(10_000)) for _ in range(cities)]
+    twelve = [decode_forecast({"properties": {"periods": _forecast_periods(x, y)}}) for x, y in cells]
+    hourly_periods = [_hourly_periods(x, y) for x, y in cells]
+    decoded = [hourly.decode_hourly(p) for p in hourly_periods]
+
+    def best(fn: Callable[[], Any]) -> float:
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times) * 1000
+
+    return {
+        "numpy": hourly.np is not None,
+        "cities": cities,
+        "hours_per_city": len(hourly_periods[0]),
+        "twelve_hour_ms": best(lambda: [build_day_summaries(p) for p in twelve]),
+        "decode_ms": best(lambda: [hourly.decode_hourly(p) for p in hourly_periods]),
+        "per_city_ms": best(lambda: [hourly.hourly_day_summaries(c) for c in decoded]),
+        "batched_ms": best(lambda: hourly.summarize_many(decoded)),
+    }
+
+
+def bench_model(forecasts: int) -> Dict[str, float]:
+    """Memory held by cached forecasts and summarize/format time: raw GeoJSON dicts vs ForecastPeriod records."""
+    from .forecast_format import format_days, format_now
+    from .forecast_model import decode_forecast
+    from .forecast_summary import build_day_summaries
+    from .nws_standin import _forecast_periods
+
+    rng = random.Random(15113)
+    # Serialized like a real response so every payload owns its strings.
+    payloads = [
+        json.dumps({"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[[-80.0, 40.0]] * 5]},
+                    "properties": {"units": "us", "updated": "2026-10-17T12:00:00+00:00",
+                                   "periods": _forecast_periods(rng.randrange(10_000), rng.randrange(10_000))}})
+        for _ in range(forecasts)
+    ]
+    raw_bytes, raw = _allocated(lambda: [json.loads(p) for p in payloads])
+    model_bytes, model = _allocated(lambda: [decode_forecast(json.loads(p)) for p in payloads])
+
+    def render(periods: List[Any]) -> None:
+        format_now(periods[0], 50.0, "C")
+        format_days(build_day_summaries(periods), 7, True, True, True, "C")
+
+    t0 = time.perf_counter()
+    for periods in model:
+        render(periods)
+    t1 = time.perf_counter()
+    for payload in raw:
+        decode_forecast(payload)
+    t2 = time.perf_counter()
+    return {
+        "forecasts": forecasts,
+        "raw_bytes": raw_bytes,
+        "model_bytes": model_bytes,
+        "render_us": (t1 - t0) * 1e6 / forecasts,
+        "decode_us": (t2 - t1) * 1e6 / forecasts,
+    }
+
+
+class _CountingFont:
+    """Wraps a font (or len()) and counts measure() calls, i.e. Tk round-trips."""
+
+    def __init__(self, font: Any = None):
+        self.font = font
+        self.calls = 0
+
+    def __str__(self) -> str:
+        return str(self.font) if self.font is not None else "len"
+
+    def measure(self, text: str) -> int:
+        self.calls += 1
+        return self.font.measure(text) if self.font is not None else len(text)
+
+
+def bench_format(cities: int) -> Dict[str, Any]:
+    """format_days for 7 days x many cities: time and font.measure calls, cold vs warm width cache."""
+    from .forecast_format import clear_measure_cache, format_days
+    from .forecast_model import decode_forecast
+    from .forecast_summary import build_day_summaries
+    from .nws_standin import _forecast_periods
+
+    rng = random.Random(15113)
+    summaries = [
+        build_day_summaries(decode_forecast({"properties": {"periods": _forecast_periods(rng.randrange(10_000), 0)}}))
+        for _ in range(cities)
+    ]
+
+    fonts: Dict[str, Any] = {"none": None, "counting": _CountingFont()}
+    tk_error = None
+    root = None
+    try:
+        import tkinter as tk
+        from tkinter import font as tkfont
+
+        root = tk.Tk()
+        root.withdraw()
+        fonts["tk"] = _CountingFont(tkfont.Font(root=root, family="Times New Roman", size=11))
+    except Exception as e:  # no display, or Tk missing
+        tk_error = f"{type(e).__name__}: {e}".splitlines()[0]
+
+    results: Dict[str, Any] = {"cities": cities, "tk_error": tk_error, "fonts": {}}
+    try:
+        for name, font in fonts.items():
+            row: Dict[str, float] = {}
+            for cache in ("cold", "warm"):
+                clear_measure_cache()
+                if cache == "warm":
+                    for days in summaries:
+                        format_days(days, 7, True, True, True, "F", font=font)
+                calls_before = getattr(font, "calls", 0)
+                t0 = time.perf_counter()
+                for days in summaries:
+                    if cache == "cold":
+                        clear_measure_cache()
+                    format_days(days, 7, True, True, True, "F", font=font)
+                row[f"{cache}_us"] = (time.perf_counter() - t0) * 1e6 / cities
+                row[f"{cache}_calls"] = (getattr(font, "calls", 0) - calls_before) / cities
+            results["fonts"][name] = row
+    finally:
+        if root is not None:
+            root.destroy()
+    return results
+
+
+E2E_STAGES = ("forecast", "humidity", "render")
+
+
+def _e2e_locations(lookups: int, fixtures: Optional[Fixtures]) -> List[Tuple[float, float]]:
+    if fixtures is None:
+        # About 0.07 degrees apart, so every location is its own grid cell.
+        return [(35.0 + i * 0.07, -80.0 - i * 0.05) for i in range(lookups)]
+    recorded = [m for m in map(POINTS_RE.match, fixtures.paths()) if m]
+    return [(float(m.group(1)), float(m.group(2))) for m in recorded]
+
+
+def bench_e2e(
+    lookups: int,
+    latency: float,
+    error_rate: float = 0.0,
+    null_humidity: float = 0.0,
+    fixtures_path: Optional[str] = None,
+    slow_rate: float = 0.0,
+    slow_latency: float = 1.0,
+    down_stations: float = 0.0,
+    resilient: bool = True,
+) -> Dict[str, Any]:
+    """
+    Whole city lookups against the stand-in, the way the app does them:
+    fetch_forecast_periods, fetch_latest_relative_humidity, build_day_summaries
+    and format_days. The cold pass starts with empty caches, the warm pass
+    repeats the same locations; each reports time, requests and bytes per lookup.
+    resilient=False turns off adaptive timeouts, hedging and circuit breakers.
+    """
+    # The cold pass clears the points and station caches, so they must live
+    # in a scratch directory rather than the user's own cache.
+    if "src.nws_cache" in sys.modules:
+        raise RuntimeError("bench_e2e must run before src.nws_cache is imported")
+    os.environ["NWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="nws-bench-")
+    from .forecast_format import format_days
+    from .forecast_summary import build_day_summaries
+    from .metrics import METRICS
+    from .nws_cache import FORECAST_CACHE, POINTS_CACHE
+    from .station_rank import STATION_RANKING
+    from .weather import fetch_forecast_periods, fetch_latest_relative_humidity
+
+    fixtures = Fixtures.load(Path(fixtures_path)) if fixtures_path else None
+    locations = _e2e_locations(lookups, fixtures)
+    server = start_standin(
+        latency=latency,
+        error_rate=error_rate,
+        null_humidity_rate=null_humidity,
+        fixtures=fixtures,
+        seed=15113,
+        slow_rate=slow_rate,
+        slow_latency=slow_latency,
+        down_stations=down_stations,
+    )
+    # Short backoff so injected errors cost retries, not seconds of sleep.
+    client = NWSClient(
+        base_url=server.base_url,
+        backoff=0.01,
+        max_backoff=0.1,
+        adaptive_timeouts=resilient,
+        hedge=resilient,
+        circuit_breakers=resilient,
+    )
+
+    def counter_total(name: str) -> float:
+        return sum(c["value"] for c in METRICS.snapshot()["counters"] if c["name"] == name)
+
+    POINTS_CACHE.clear()
+    FORECAST_CACHE.clear()
+    STATION_RANKING.clear()
+
+    results: Dict[str, Any] = {"lookups": len(locations), "passes": {}}
+    try:
+        for name in ("cold", "warm"):
+            server.state.reset()
+            hedges, skipped = counter_total("nws_hedges_total"), counter_total("nws_short_circuits_total")
+            walls: List[float] = []
+            stages = {stage: 0.0 for stage in E2E_STAGES}
+            failed = no_humidity = 0
+            for lat, lon in locations:
+                t0 = time.perf_counter()
+                try:
+                    periods = fetch_forecast_periods(lat, lon, client)
+                except Exception:
+                    failed += 1
+                    walls.append(time.perf_counter() - t0)
+                    continue
+                t1 = time.perf_counter()
+                humidity = fetch_latest_relative_humidity(lat, lon, client)
+                t2 = time.perf_counter()
+                format_days(build_day_summaries(periods), 7, True, True, True, "F")
+                t3 = time.perf_counter()
+                walls.append(t3 - t0)
+                stages["forecast"] += t1 - t0
+                stages["humidity"] += t2 - t1
+                stages["render"] += t3 - t2
+                no_humidity += humidity is None
+
+            counts = server.state.snapshot()
+            n = len(locations)
+            results["passes"][name] = {
+                "ms_per_lookup": statistics.fmean(walls) * 1000,
+                "p95_ms": sorted(walls)[int(0.95 * (n - 1))] * 1000,
+                "max_ms": max(walls) * 1000,
+                **{f"{stage}_ms": total * 1000 / n for stage, total in stages.items()},
+                "requests_per_lookup": counts["requests"] / n,
+                "kib_per_lookup": counts["bytes_sent"] / n / 1024,
+                "injected_errors": counts["errors"],
+                "hedges": counter_total("nws_hedges_total") - hedges,
+                "short_circuits": counter_total("nws_short_circuits_total") - skipped,
+                "failed": failed,
+                "no_humidity": no_humidity,
+            }
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        POINTS_CACHE.flush()
+        STATION_RANKING.flush()
+    return results
+
+
+def check_e2e(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Regressions of a bench_e2e result against baseline["limits"], a
+    {pass: {metric: maximum}} mapping; an empty list means it passed.
+    """
+    failures = []
+    for name, limits in baseline.get("limits", {}).items():
+        measured = results["passes"].get(name)
+        if measured is None:
+            failures.append(f"{name}: pass missing from the results")
+            continue
+        for metric, limit in limits.items():
+            value = measured.get(metric)
+            if value is None:
+                failures.append(f"{name}.{metric}: not measured")
+            elif value > limit:
+                failures.append(f"{name}.{metric}: {value:.2f} > {limit}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the NWS weather app")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("handshake", help="connection reuse: bare requests.get vs pooled session")
+    p.add_argument("--lookups", type=int, default=50)
+    p.add_argument("--latency", type=float, default=0.0)
+
+    p = sub.add_parser("search", help="autocomplete latency: linear scan vs CityIndex (plain and ranked top-50)")
+    p.add_argument("--sizes", default="700,30000,100000", help="comma-separated name counts")
+
+    p = sub.add_parser("startup", help="import time, time to first window, city load time")
+    p.add_argument("--runs", type=int, default=5)
+
+    sub.add_parser("memory", help="dict-of-tuples city table vs columnar CityStore")
+
+    p = sub.add_parser("model", help="cached forecast size: raw GeoJSON vs slotted ForecastPeriod records")
+    p.add_argument("--forecasts", type=int, default=500)
+
+    p = sub.add_parser("format", help="format_days layout: time and font.measure calls per city")
+    p.add_argument("--cities", type=int, default=500)
+
+    p = sub.add_parser("hourly", help="day summaries from 12-hour periods vs hourly columns")
+    p.add_argument("--cities", type=int, default=500)
+
+    p = sub.add_parser("e2e", help="end-to-end lookups: time, requests and bytes per lookup, cold and warm")
+    p.add_argument("--lookups", type=int, default=50)
+    p.add_argument("--latency", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of stand-in responses that are 503")
+    p.add_argument("--null-humidity", type=float, default=0.0, help="fraction of observations without RH")
+    p.add_argument("--fixtures", help="replay recorded responses (locations come from the file)")
+    p.add_argument("--slow-rate", type=float, default=0.0, help="fraction of stand-in responses that are slow")
+    p.add_argument("--slow-latency", type=float, default=1.0, help="seconds added to slow responses")
+    p.add_argument("--down-stations", type=float, default=0.0, help="fraction of stations that always fail")
+    p.add_argument("--plain", action="store_true", help="no adaptive timeouts, hedging or circuit breakers")
+    p.add_argument("--json", action="store_true", help="print the results as JSON")
+    p.add_argument("--check", metavar="BASELINE", help="fail (exit 1) if a metric exceeds the baseline's limits")
+
+    args = parser.parse_args()
+
+    if args.bench == "handshake":
+        results = bench_handshake(args.lookups, args.latency)
+        print(f"{args.lookups} lookups (4 requests each) against the local stand-in")
+        for name, r in results.items():
+            print(
+                f"  {name:<20} {r['seconds']:.3f}s  {r['ms_per_lookup']:.2f} ms/lookup  "
+                f"{r['requests']:.0f} requests over {r['connections']:.0f} connections"
+            )
+
+    elif args.bench == "search":
+        sizes = [int(n) for n in args.sizes.split(",")]
+        print("per-keystroke search latency (mean / p95)")
+        for size, r in bench_search(sizes).items():
+            print(
+                f"  {size:>7} names  scan {r['scan_ms']:.3f} / {r['scan_p95_ms']:.3f} ms   "
+                f"index {r['index_ms']:.3f} / {r['index_p95_ms']:.3f} ms   "
+                f"ranked {r['ranked_ms']:.3f} / {r['ranked_p95_ms']:.3f} ms   "
+                f"(index build {r['build_ms']:.0f} ms, {r['keystrokes']:.0f} keystrokes)"
+            )
+
+    elif args.bench == "startup":
+        r = bench_startup(args.runs)
+        print(f"median of {args.runs} fresh interpreters")
+        print(f"  import src.app          {r['import_ms']:.1f} ms (requests imported: {r['requests_imported']})")
+        if r["window_ms"] is not None:
+            print(f"  time to first window    {r['window_ms']:.1f} ms")
+        else:
+            print(f"  time to first window    n/a ({r['window_error']})")
+        for source in ("tsv", "artifact"):
+            ms = r[f"load_{source}_ms"]
+            print(f"  load cities ({source:<8}) " + (f"{ms:.2f} ms" if ms is not None else "n/a (file missing)"))
+
+    elif args.bench == "memory":
+        for label, r in bench_memory().items():
+            print(
+                f"  {label:<9} {r['cities']:>6.0f} cities  dict {r['dict_bytes'] / 1024:8.1f} KiB "
+                f"({r['dict_bytes'] / r['cities']:.0f} B/city, {r['dict_lookup_us']:.2f} us/lookup)   "
+                f"CityStore {r['store_bytes'] / 1024:8.1f} KiB "
+                f"({r['store_bytes'] / r['cities']:.0f} B/city, {r['store_lookup_us']:.2f} us/lookup)"
+            )
+
+    elif args.bench == "model":
+        r = bench_model(args.forecasts)
+        n = r["forecasts"]
+        print(f"{n:.0f} cached 7-day forecasts")
+        print(f"  raw GeoJSON dicts       {r['raw_bytes'] / 1024:8.1f} KiB ({r['raw_bytes'] / n / 1024:.1f} KiB each)")
+        print(f"  ForecastPeriod records  {r['model_bytes'] / 1024:8.1f} KiB ({r['model_bytes'] / n / 1024:.1f} KiB each)")
+        print(f"  decode {r['decode_us']:.0f} us/forecast, summarize + format {r['render_us']:.0f} us/forecast")
+
+    elif args.bench == "format":
+        r = bench_format(args.cities)
+        print(f"format_days, 7 days x {r['cities']} cities (cold = width cache cleared per city)")
+        for name, f in r["fonts"].items():
+            print(
+                f"  {name:<9} cold {f['cold_us']:7.1f} us/city, {f['cold_calls']:4.1f} measure calls   "
+                f"warm {f['warm_us']:7.1f} us/city, {f['warm_calls']:4.1f} measure calls"
+            )
+        if r["tk_error"]:
+            print(f"  tk        n/a ({r['tk_error']})")
+
+    elif args.bench == "hourly":
+        r = bench_hourly(args.cities)
+        print(f"{r['cities']} cities, {r['hours_per_city']} hours each (NumPy: {'yes' if r['numpy'] else 'no'})")
+        print(f"  build_day_summaries, 12-hour periods   {r['twelve_hour_ms']:8.1f} ms")
+        print(f"  decode_hourly (dicts -> columns)       {r['decode_ms']:8.1f} ms")
+        print(f"  hourly_day_summaries, one per city     {r['per_city_ms']:8.1f} ms")
+        print(f"  summarize_many, one batch              {r['batched_ms']:8.1f} ms")
+
+    elif args.bench == "e2e":
+        r = bench_e2e(
+            args.lookups,
+            args.latency,
+            args.error_rate,
+            args.null_humidity,
+            args.fixtures,
+            args.slow_rate,
+            args.slow_latency,
+            args.down_stations,
+            resilient=not args.plain,
+        )
+        failures = []
+        if args.check:
+            with open(args.check, "r", encoding="utf-8") as f:
+                failures = check_e2e(r, json.load(f))
+        if args.json:
+            print(json.dumps({**r, "regressions": failures}, indent=2))
+            sys.exit(1 if failures else 0)
+        print(
+            f"{r['lookups']} lookups (forecast + humidity + day summaries + format_days) against the "
+            f"{'recorded' if args.fixtures else 'synthetic'} stand-in, latency {args.latency * 1000:.0f} ms, "
+            f"{args.error_rate:.0%} errors, {args.null_humidity:.0%} null RH, "
+            f"{args.slow_rate:.0%} slow by {args.slow_latency:.1f}s, {args.down_stations:.0%} stations down"
+            + (" (plain client)" if args.plain else "")
+        )
+        for name, p in r["passes"].items():
+            print(
+                f"  {name:<5} {p['ms_per_lookup']:7.2f} ms/lookup (p95 {p['p95_ms']:.2f}, max {p['max_ms']:.0f})  "
+                f"forecast {p['forecast_ms']:.2f} / humidity {p['humidity_ms']:.2f} / render {p['render_ms']:.2f} ms   "
+                f"{p['requests_per_lookup']:.2f} requests, {p['kib_per_lookup']:.1f} KiB per lookup   "
+                f"{p['injected_errors']} injected errors, {p['hedges']:.0f} hedged, "
+                f"{p['short_circuits']:.0f} short-circuited, {p['failed']} failed, {p['no_humidity']} without RH"
+            )
+        if args.check:
+            for failure in failures:
+                print(f"  REGRESSION {failure}")
+            print(f"  baseline {args.check}: {'FAILED' if failures else 'ok'}")
+            sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
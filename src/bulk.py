@@ -0,0 +1,234 @@
+"""
+bulk.py
+
+Batch forecasts for many cities at once.
+
+fetch_many() takes city names (keys of CITY_DB) or "lat,lon" strings,
+fetches them concurrently through one rate-limited NWSClient and yields a
+result dict per target as soon as it completes. A failing target yields a
+result with "ok": False and the error message; the batch keeps going.
+
+Cities that share an NWS grid cell share one forecast download (see
+weather.fetch_forecast_from_points); --gridpoint-report shows how much
+that saves over a city list.
+
+Usage:
+  python -m src.bulk "Austin city, TX" "40.44,-79.99"
+  python -m src.bulk --all --limit 200 --workers 8 --rate 5 > forecasts.jsonl
+  python -m src.bulk --all --gridpoint-report
+  python -m src.bulk --all --hourly --days 3
+  python -m src.bulk --all --limit 100 --metrics metrics.prom > forecasts.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from .cities import ALL_CITIES, CITY_DB, nearest_cities
+from .forecast_summary import build_day_summaries
+from .http_client import NWSClient
+from .metrics import METRICS
+from .rate_limit import NWS_BURST, NWS_RATE_PER_SECOND, TokenBucket
+from .weather import (
+    fetch_forecast_from_points,
+    fetch_hourly_from_points,
+    fetch_points,
+    gridpoint_key,
+    summarize_now_and_tomorrow,
+)
+
+
+def resolve_target(target: str, city_db: Mapping[str, Tuple[float, float]] = CITY_DB) -> Tuple[float, float]:
+    """City name from city_db, or a literal "lat,lon" pair."""
+    if target in city_db:
+        return city_db[target]
+    parts = target.split(",")
+    if len(parts) == 2:
+        try:
+            return float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+    raise KeyError(f"Unknown city or coordinates: {target!r}")
+
+
+def _fetch_one(target: str, client: NWSClient, days: int, hourly: bool = False) -> Dict[str, Any]:
+    lat, lon = resolve_target(target)
+    points = fetch_points(lat, lon, client)
+    if hourly:
+        # Imported here: hourly pulls in NumPy when it is installed.
+        from .hourly import hourly_day_summaries, hourly_now_and_tomorrow
+
+        # The hourly forecast alone gives both the days and "now"; no 12-hour download.
+        columns = fetch_hourly_from_points(points, client)
+        summaries = hourly_day_summaries(columns)
+        now = hourly_now_and_tomorrow(columns, summaries)
+    else:
+        periods = fetch_forecast_from_points(points, client)
+        summaries = build_day_summaries(periods)
+        now = summarize_now_and_tomorrow(periods)
+    if target in CITY_DB:
+        city, distance_km = target, 0.0
+    else:
+        # Label raw coordinates with the closest known city.
+        city, distance_km = (nearest_cities(lat, lon, 1) or [(None, None)])[0]
+    return {
+        "target": target,
+        "lat": lat,
+        "lon": lon,
+        "city": city,
+        "city_distance_km": distance_km,
+        "ok": True,
+        "now": now,
+        "days": [s.as_dict() for s in summaries[:days]],
+    }
+
+
+def fetch_many(
+    targets: Iterable[str],
+    client: NWSClient | None = None,
+    workers: int = 8,
+    rate: float = NWS_RATE_PER_SECOND,
+    burst: int = NWS_BURST,
+    days: int = 7,
+    hourly: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Yield one result per target, in completion order. hourly=True builds days from forecastHourly."""
+    own_client = client is None
+    if client is None:
+        client = NWSClient(pool_size=workers, rate_limiter=TokenBucket(rate, burst))
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nws-bulk")
+    try:
+        futures = {pool.submit(_fetch_one, t, client, days, hourly): t for t in targets}
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"target": target, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        # A caller that stops iterating early must not wait for (or pay the
+        # rate limit for) the lookups still queued.
+        pool.shutdown(wait=False, cancel_futures=True)
+        if own_client:
+            client.close()
+
+
+def gridpoint_report(
+    targets: Iterable[str],
+    client: NWSClient | None = None,
+    workers: int = 8,
+    rate: float = NWS_RATE_PER_SECOND,
+    burst: int = NWS_BURST,
+) -> Dict[str, Any]:
+    """
+    Resolve every target to its forecast grid cell (one /points call each,
+    cached) and report how many forecast downloads the targets really need.
+    """
+    own_client = client is None
+    if client is None:
+        client = NWSClient(pool_size=workers, rate_limiter=TokenBucket(rate, burst))
+
+    def grid_of(target: str) -> str | None:
+        lat, lon = resolve_target(target)
+        return gridpoint_key(fetch_points(lat, lon, client))
+
+    groups: Dict[str, List[str]] = {}
+    failed: List[str] = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nws-bulk") as pool:
+            futures = {pool.submit(grid_of, t): t for t in targets}
+            for future in as_completed(futures):
+                target = futures[future]
+                try:
+                    key = future.result()
+                except Exception:
+                    failed.append(target)
+                    continue
+                groups.setdefault(key or f"?{target}", []).append(target)
+    finally:
+        if own_client:
+            client.close()
+
+    resolved = sum(len(members) for members in groups.values())
+    return {
+        "targets": resolved + len(failed),
+        "resolved": resolved,
+        "failed": failed,
+        "gridpoints": len(groups),
+        "downloads_saved": resolved - len(groups),
+        "dedup_ratio": resolved / len(groups) if groups else 1.0,
+        "shared": {key: sorted(members) for key, members in groups.items() if len(members) > 1},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch NWS forecasts for many cities (JSON lines on stdout)")
+    parser.add_argument("targets", nargs="*", help='city names like "Austin city, TX" or "lat,lon"')
+    parser.add_argument("--all", action="store_true", help="every city in CITY_DB")
+    parser.add_argument("--file", help="read targets from a file, one per line")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N targets")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=NWS_RATE_PER_SECOND, help="requests per second")
+    parser.add_argument("--burst", type=int, default=NWS_BURST)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--hourly", action="store_true", help="day highs/lows from the hourly forecast")
+    parser.add_argument("--gridpoint-report", action="store_true", help="only report grid-cell sharing, as JSON")
+    parser.add_argument("--metrics", help="write request/cache metrics here at the end (.prom: Prometheus, else JSON)")
+    args = parser.parse_args()
+
+    targets = list(args.targets)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            targets.extend(line.strip() for line in f if line.strip())
+    if args.all:
+        targets.extend(ALL_CITIES)
+    if args.limit:
+        targets = targets[: args.limit]
+    if not targets:
+        parser.error("no targets given")
+
+    if args.gridpoint_report:
+        report = gridpoint_report(targets, workers=args.workers, rate=args.rate, burst=args.burst)
+        print(json.dumps(report, indent=2))
+        print(
+            f"{report['resolved']} targets -> {report['gridpoints']} forecast grid cells "
+            f"(dedup ratio {report['dedup_ratio']:.2f}, {report['downloads_saved']} downloads saved)",
+            file=sys.stderr,
+        )
+        return
+
+    start = time.perf_counter()
+    ok = failed = 0
+    results = fetch_many(
+        targets, workers=args.workers, rate=args.rate, burst=args.burst, days=args.days, hourly=args.hourly
+    )
+    for result in results:
+        if result["ok"]:
+            ok += 1
+        else:
+            failed += 1
+            print(f"failed: {result['target']}: {result['error']}", file=sys.stderr)
+        print(json.dumps(result), flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"{ok} ok, {failed} failed in {elapsed:.1f}s", file=sys.stderr)
+    if args.metrics:
+        write_metrics(args.metrics)
+
+
+def write_metrics(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".prom"):
+            f.write(METRICS.prometheus())
+        else:
+            json.dump(METRICS.snapshot(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,36 @@ cities.py
 City database for the GUI app.
 Format:
   CITY_DB[name] = (lat, lon)
+  CITY_ALAND[name] = land area in m^2 (the gazetteer has no population;
+                     search ranking uses land area as a size proxy)
+
+Nothing is read at import time. The first access to CITY_DB, CITY_ALAND or
+ALL_CITIES loads a columnar CityStore from the compiled artifact
+(cities_compiled.bin, memory-mapped) written by city_info_processor.py,
+falling back to cities_filtered.tsv when the artifact is missing or older
+than the TSV.
+
+nearest_cities() and cities_within() answer coordinate -> city questions
+through a k-d tree (spatial_index.py) built on first use.
 """
 
 from __future__ import annotations
 
+import threading
 from pathlib import Path
-from typing import Dict, Tuple, List
+from typing import Callable, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from .city_store import CityStore
+from .spatial_index import SpatialIndex
 
 
 DATA_PATH = Path(__file__).with_name("cities_filtered.tsv")
+ARTIFACT_PATH = Path(__file__).with_name("cities_compiled.bin")
 
 
-def _load_city_db(path: Path) -> Dict[str, Tuple[float, float]]:
+def _load_city_db(path: Path) -> Tuple[Dict[str, Tuple[float, float]], Dict[str, int]]:
     if not path.exists():
-        return {}
+        return {}, {}
 
     import csv
 
@@ -30,6 +46,7 @@ def _load_city_db(path: Path) -> Dict[str, Tuple[float, float]]:
         return cleaned
 
     city_db: Dict[str, Tuple[float, float]] = {}
+    city_aland: Dict[str, int] = {}
     with path.open("r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f, delimiter="\t")
         for row in reader:
@@ -40,15 +57,121 @@ def _load_city_db(path: Path) -> Dict[str, Tuple[float, float]]:
             lon = (row.get("INTPTLONG") or "").strip()
             if not (name and state and lat and lon):
                 continue
+            key = f"{name}, {state}"
             try:
-                city_db[f"{name}, {state}"] = (float(lat), float(lon))
+                city_db[key] = (float(lat), float(lon))
             except ValueError:
                 continue
-    return city_db
+            try:
+                city_aland[key] = int(row.get("ALAND") or 0)
+            except ValueError:
+                city_aland[key] = 0
+    return city_db, city_aland
+
+
+def _artifact_is_current(artifact: Path, tsv: Path) -> bool:
+    if not artifact.exists():
+        return False
+    return not tsv.exists() or artifact.stat().st_mtime >= tsv.stat().st_mtime
+
+
+class _CityData:
+    """Loads the CityStore once, on first use, from whichever source is available."""
+
+    def __init__(self, tsv_path: Path, artifact_path: Path):
+        self.tsv_path = tsv_path
+        self.artifact_path = artifact_path
+        self.source: Path | None = None
+        self._store: CityStore | None = None
+        self._spatial: SpatialIndex | None = None
+        self._lock = threading.Lock()
+
+    def store(self) -> CityStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self._load()
+        return self._store
+
+    def _load(self) -> CityStore:
+        if _artifact_is_current(self.artifact_path, self.tsv_path):
+            try:
+                store = CityStore.from_artifact(self.artifact_path)
+                self.source = self.artifact_path
+                return store
+            except (OSError, ValueError):
+                pass
+        city_db, city_aland = _load_city_db(self.tsv_path)
+        self.source = self.tsv_path
+        return CityStore.from_records(
+            (name, lat, lon, city_aland.get(name, 0)) for name, (lat, lon) in city_db.items()
+        )
+
+    def spatial(self) -> SpatialIndex:
+        store = self.store()
+        if self._spatial is None:
+            with self._lock:
+                if self._spatial is None:
+                    self._spatial = SpatialIndex.from_store(store)
+        return self._spatial
+
+    @property
+    def loaded(self) -> bool:
+        return self._store is not None
+
 
+class _LazyMapping(Mapping):
+    def __init__(self, data: _CityData, view: Callable[[CityStore], Mapping]):
+        self._data = data
+        self._view = view
+
+    def _target(self) -> Mapping:
+        return self._view(self._data.store())
+
+    def __getitem__(self, key):
+        return self._target()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._target()
+
+    def __iter__(self) -> Iterator:
+        return iter(self._target())
+
+    def __len__(self) -> int:
+        return len(self._target())
+
+
+class _LazyCityList(Sequence):
+    def __init__(self, data: _CityData):
+        self._data = data
+
+    def __getitem__(self, index):
+        return self._data.store().names()[index]
+
+    def __len__(self) -> int:
+        return len(self._data.store())
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data.store())
+
+
+CITY_DATA = _CityData(DATA_PATH, ARTIFACT_PATH)
 
 # Main city lookup table
-CITY_DB: Dict[str, Tuple[float, float]] = _load_city_db(DATA_PATH)
+CITY_DB: Mapping[str, Tuple[float, float]] = _LazyMapping(CITY_DATA, lambda store: store)
+CITY_ALAND: Mapping[str, int] = _LazyMapping(CITY_DATA, CityStore.aland_map)
 
 # Sorted list for UI dropdown / autocomplete
-ALL_CITIES: List[str] = sorted(CITY_DB.keys())
+ALL_CITIES: Sequence[str] = _LazyCityList(CITY_DATA)
+
+
+def nearest_cities(lat: float, lon: float, k: int = 1) -> List[Tuple[str, float]]:
+    """The k known cities closest to (lat, lon), as (name, distance in km)."""
+    store = CITY_DATA.store()
+    return [(store.name(i), km) for i, km in CITY_DATA.spatial().nearest(lat, lon, k)]
+
+
+def cities_within(lat: float, lon: float, radius_km: float) -> List[Tuple[str, float]]:
+    """Known cities within radius_km of (lat, lon), closest first, as (name, distance in km)."""
+    store = CITY_DATA.store()
+    return [(store.name(i), km) for i, km in CITY_DATA.spatial().within(lat, lon, radius_km)]
@@ -0,0 +1,106 @@
+"""
+city_artifact.py
+
+Compact binary form of the filtered city list, written by
+city_info_processor.py next to cities_filtered.tsv.
+
+Layout (little-endian):
+  header   magic "CITYDB01", count (u32), name bytes (u32), reserved (u64)
+  lat      count x f64
+  lon      count x f64
+  aland    count x i64
+  offsets  (count + 1) x u32   start of each name in the string table
+  names    UTF-8 string table, "Name, ST" per city, sorted by name
+
+Every section starts on an 8-byte boundary, so the arrays can be read
+straight out of a memory map.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+MAGIC = b"CITYDB01"
+HEADER = struct.Struct("<8sIIQ")
+
+CityRecord = Tuple[str, float, float, int]
+
+
+def _native(arr: array) -> array:
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def encode_city_artifact(records: Iterable[CityRecord]) -> bytes:
+    rows = sorted(records, key=lambda r: r[0])
+    lat = array("d", (r[1] for r in rows))
+    lon = array("d", (r[2] for r in rows))
+    aland = array("q", (r[3] for r in rows))
+
+    names = bytearray()
+    offsets = array("I", [0])
+    for name, *_ in rows:
+        names += name.encode("utf-8")
+        offsets.append(len(names))
+    if len(offsets) % 2:
+        offsets.append(len(names))  # pad the u32 section to 8 bytes
+
+    parts = [HEADER.pack(MAGIC, len(rows), len(names), 0)]
+    for arr in (lat, lon, aland, offsets):
+        parts.append(_native(arr).tobytes())
+    parts.append(bytes(names))
+    return b"".join(parts)
+
+
+def write_city_artifact(path: Path, records: Iterable[CityRecord]) -> None:
+    data = encode_city_artifact(records)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+def section_offsets(count: int) -> Tuple[int, int, int, int, int]:
+    """Byte offsets of (lat, lon, aland, offsets, names) for `count` cities."""
+    lat = HEADER.size
+    lon = lat + 8 * count
+    aland = lon + 8 * count
+    offsets = aland + 8 * count
+    offsets_len = 4 * (count + 1 + (count + 1) % 2)
+    return lat, lon, aland, offsets, offsets + offsets_len
+
+
+def read_header(data: bytes | memoryview) -> Tuple[int, int]:
+    magic, count, names_len, _ = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a compiled city artifact.")
+    return count, names_len
+
+
+def decode_city_artifact(data: bytes) -> List[CityRecord]:
+    count, names_len = read_header(data)
+    lat_at, lon_at, aland_at, offsets_at, names_at = section_offsets(count)
+
+    def column(typecode: str, start: int, n: int) -> array:
+        arr = array(typecode)
+        arr.frombytes(data[start : start + n * arr.itemsize])
+        return _native(arr)
+
+    lat = column("d", lat_at, count)
+    lon = column("d", lon_at, count)
+    aland = column("q", aland_at, count)
+    offsets = column("I", offsets_at, count + 1)
+    names = data[names_at : names_at + names_len]
+
+    return [
+        (names[offsets[i] : offsets[i + 1]].decode("utf-8"), lat[i], lon[i], aland[i])
+        for i in range(count)
+    ]
+
+
+def read_city_artifact(path: Path) -> List[CityRecord]:
+    return decode_city_artifact(path.read_bytes())
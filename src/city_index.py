@@ -0,0 +1,217 @@
+"""
+city_index.py
+
+Substring search index over city names for the autocomplete box.
+
+Names are lowercased once. Every 2- and 3-character gram maps to the
+sorted ids of the names that contain it, so a query only looks at names
+sharing its rarest gram instead of scanning the whole list. When a query
+extends the previous one, the previous hits are narrowed instead.
+search() keeps the order of the names passed in (the app passes them sorted).
+
+ranked() is the autocomplete ranking: prefix and word-boundary matches
+first, typo-tolerant (edit distance) matches after them, bigger places
+ahead of smaller ones, and a trailing state abbreviation ("austin tx")
+restricting the state. Only the top k are kept, via a heap.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+GRAM_SIZES = (2, 3)
+
+# Score bands: any exact match outranks any fuzzy one. Bands are further
+# apart than the largest size boost (log10 of a land area, about 12).
+SCORE_PREFIX = 300.0
+SCORE_WORD_START = 200.0
+SCORE_SUBSTRING = 150.0
+SCORE_STATE_SUFFIX = 125.0
+SCORE_FUZZY = 100.0
+SCORE_PER_TYPO = 30.0
+FUZZY_CANDIDATES = 200
+
+
+def _grams(text: str, size: int) -> set:
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def max_typos(query: str) -> int:
+    if len(query) < 4:
+        return 0
+    return 1 if len(query) < 8 else 2
+
+
+def substring_edit_distance(query: str, text: str, limit: int) -> int:
+    """
+    Fewest edits turning `query` into some substring of `text` (Sellers'
+    algorithm); returns limit + 1 once it cannot be within `limit`.
+    """
+    prev = [0] * (len(text) + 1)
+    for i, qc in enumerate(query, 1):
+        cur = [i] + [0] * len(text)
+        best = i
+        for j, tc in enumerate(text, 1):
+            cost = prev[j - 1] + (qc != tc)
+            cur[j] = min(cost, prev[j] + 1, cur[j - 1] + 1)
+            if cur[j] < best:
+                best = cur[j]
+        if best > limit:
+            return limit + 1
+        prev = cur
+    return min(min(prev), limit + 1)
+
+
+def _split_name(lowered: str) -> Tuple[str, str]:
+    """ "austin city, tx" -> ("austin city", "tx") """
+    place, sep, state = lowered.rpartition(", ")
+    return (place, state) if sep else (lowered, "")
+
+
+class CityIndex:
+    def __init__(self, names: Sequence[str], weights: Optional[Sequence[float]] = None):
+        self.names = names
+        self.lowered: List[str] = [n.lower() for n in names]
+        self.places: List[str] = []
+        self.states: List[str] = []
+        for name in self.lowered:
+            place, state = _split_name(name)
+            self.places.append(place)
+            self.states.append(state)
+        self.known_states = set(self.states)
+        # Size boost, in score points: log10 of the weight (e.g. land area).
+        self.boosts: List[float] = [math.log10(w) if w and w > 1 else 0.0 for w in (weights or [])]
+        self._postings: Optional[Dict[str, array]] = None
+        self._by_prefix: Optional[List[int]] = None
+        self._prefix_keys: Optional[List[str]] = None
+        self._last_query = ""
+        self._last_ids: List[int] = []
+
+    def _build(self) -> Dict[str, array]:
+        # Built on first search so startup does not pay for it.
+        if self._postings is None:
+            postings: Dict[str, List[int]] = {}
+            for idx, name in enumerate(self.lowered):
+                for size in GRAM_SIZES:
+                    for gram in _grams(name, size):
+                        postings.setdefault(gram, []).append(idx)
+            self._postings = {gram: array("I", ids) for gram, ids in postings.items()}
+        return self._postings
+
+    def _candidates(self, query: str) -> Sequence[int]:
+        if len(query) == 1:
+            return range(len(self.lowered))
+        postings = self._build()
+        size = min(len(query), GRAM_SIZES[-1])
+        best: Sequence[int] = ()
+        for i, gram in enumerate(_grams(query, size)):
+            ids = postings.get(gram)
+            if ids is None:
+                return ()
+            if i == 0 or len(ids) < len(best):
+                best = ids
+        return best
+
+    def search_ids(self, query: str) -> List[int]:
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        candidates = self._candidates(query)
+        # Incremental narrowing: hits for "pit" contain every hit for "pitt".
+        if self._last_query and self._last_query in query and len(self._last_ids) < len(candidates):
+            candidates = self._last_ids
+
+        lowered = self.lowered
+        if len(query) in GRAM_SIZES and candidates is not self._last_ids:
+            ids = list(candidates)
+        else:
+            ids = [i for i in candidates if query in lowered[i]]
+
+        self._last_query = query
+        self._last_ids = ids
+        return ids
+
+    def search(self, query: str) -> List[str]:
+        """Names containing `query` (case-insensitive)."""
+        names = self.names
+        return [names[i] for i in self.search_ids(query)]
+
+    def prefix_ids(self, prefix: str) -> List[int]:
+        """Ids of names starting with `prefix`, by binary search over the sorted names."""
+        if self._by_prefix is None:
+            self._by_prefix = sorted(range(len(self.lowered)), key=self.lowered.__getitem__)
+            self._prefix_keys = [self.lowered[i] for i in self._by_prefix]
+        prefix = prefix.strip().lower()
+        lo = bisect.bisect_left(self._prefix_keys, prefix)
+        hi = bisect.bisect_left(self._prefix_keys, prefix + "￿")
+        return sorted(self._by_prefix[lo:hi])
+
+    def _parse_query(self, query: str) -> Tuple[str, Optional[str]]:
+        """Split a trailing state abbreviation off the query: "austin tx" -> ("austin", "tx")."""
+        query = query.strip().lower()
+        head, sep, tail = query.replace(",", " ").rpartition(" ")
+        if sep and head.strip() and tail in self.known_states:
+            return head.strip(), tail
+        return query, None
+
+    def _score_exact(self, idx: int, text: str) -> Optional[float]:
+        place = self.places[idx]
+        pos = place.find(text)
+        if pos < 0:
+            return None
+        if pos == 0:
+            return SCORE_PREFIX
+        if place[pos - 1] in " -.'":
+            return SCORE_WORD_START
+        return SCORE_SUBSTRING
+
+    def _fuzzy_candidates(self, text: str, exclude: set) -> List[int]:
+        postings = self._build()
+        grams = _grams(text, GRAM_SIZES[-1])
+        overlap: Counter = Counter()
+        for gram in grams:
+            overlap.update(postings.get(gram, ()))
+        # Each typo breaks at most three trigrams.
+        needed = max(len(grams) - 3 * max_typos(text), 1)
+        hits = [(n, i) for i, n in overlap.items() if n >= needed and i not in exclude]
+        return [i for _, i in heapq.nlargest(FUZZY_CANDIDATES, hits)]
+
+    def _scored(self, text: str, state: Optional[str], k: int) -> Iterator[Tuple[float, int]]:
+        boosts = self.boosts
+        exact = [i for i in self.search_ids(text) if state is None or self.states[i] == state]
+        for idx in exact:
+            score = self._score_exact(idx, text)
+            if score is None:
+                # Matched in the ", ST" suffix only, e.g. "tx".
+                score = SCORE_STATE_SUFFIX
+            # Ties go to the earlier (alphabetical) name.
+            yield score + (boosts[idx] if boosts else 0.0), -idx
+
+        limit = max_typos(text)
+        if not limit or len(exact) >= k:
+            return
+        for idx in self._fuzzy_candidates(text, set(exact)):
+            if state is not None and self.states[idx] != state:
+                continue
+            typos = substring_edit_distance(text, self.places[idx], limit)
+            if typos <= limit:
+                score = SCORE_FUZZY - SCORE_PER_TYPO * typos
+                yield score + (boosts[idx] if boosts else 0.0), -idx
+
+    def ranked_ids(self, query: str, k: int = 10) -> List[int]:
+        text, state = self._parse_query(query)
+        if not text:
+            return []
+        # nlargest over a generator keeps a k-sized heap, never the full match list.
+        return [-neg for _, neg in heapq.nlargest(k, self._scored(text, state, k))]
+
+    def ranked(self, query: str, k: int = 10) -> List[str]:
+        """Best `k` names for `query`, best first."""
+        names = self.names
+        return [names[i] for i in self.ranked_ids(query, k)]
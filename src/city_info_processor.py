@@ -1,42 +1,124 @@
 from __future__ import annotations
 
+import argparse
 import csv
+import io
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, TextIO
 
-INPUT_PATH = Path(__file__).with_name("2023_Gaz_place_national.txt")
+from .city_artifact import CityRecord, write_city_artifact
+
+INPUT_PATH = Path(__file__).resolve().parent.parent / "data" / "2023_Gaz_place_national.zip"
 OUTPUT_PATH = Path(__file__).with_name("cities_filtered.tsv")
+ARTIFACT_PATH = Path(__file__).with_name("cities_compiled.bin")
 
 LSAD_KEEP = {"25"}
 FUNCSTAT_KEEP = {"A"}
 MIN_ALAND = 75_000_000
 
 
-def filter_cities(input_path: Path, output_path: Path) -> None:
-    with input_path.open("r", encoding="utf-8", newline="") as f_in:
+@contextmanager
+def open_gazetteer(input_path: Path) -> Iterator[TextIO]:
+    """Open the gazetteer text, streaming it straight out of the Census zip when given one."""
+    if input_path.suffix.lower() != ".zip":
+        with input_path.open("r", encoding="utf-8", newline="") as f:
+            yield f
+        return
+
+    with zipfile.ZipFile(input_path) as archive:
+        members = [n for n in archive.namelist() if n.lower().endswith(".txt")]
+        if not members:
+            raise ValueError(f"No .txt member in {input_path}")
+        with archive.open(members[0]) as raw:
+            yield io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+
+def _record(row: Dict[str, str]) -> Optional[CityRecord]:
+    cleaned = {k.strip(): v.strip() for k, v in row.items() if isinstance(k, str) and isinstance(v, str)}
+    name = cleaned.get("NAME", "")
+    state = cleaned.get("USPS", "")
+    if not (name and state):
+        return None
+    try:
+        return f"{name}, {state}", float(cleaned["INTPTLAT"]), float(cleaned["INTPTLONG"]), int(cleaned["ALAND"])
+    except (KeyError, ValueError):
+        return None
+
+
+def filter_cities(
+    input_path: Path,
+    output_path: Path,
+    artifact_path: Optional[Path] = None,
+    lsad_keep: Set[str] = LSAD_KEEP,
+    funcstat_keep: Set[str] = FUNCSTAT_KEEP,
+    min_aland: int = MIN_ALAND,
+) -> int:
+    records: List[CityRecord] = []
+    kept = 0
+
+    with open_gazetteer(input_path) as f_in:
         reader = csv.DictReader(f_in, delimiter="\t")
         fieldnames = reader.fieldnames or []
 
         with output_path.open("w", encoding="utf-8", newline="") as f_out:
-            writer = csv.DictWriter(f_out, fieldnames=fieldnames, delimiter="\t")
+            writer = csv.DictWriter(f_out, fieldnames=fieldnames, delimiter="\t", lineterminator="\n")
             writer.writeheader()
 
             for row in reader:
-                if row.get("LSAD") not in LSAD_KEEP:
+                # An empty code set keeps every row (e.g. --lsad "" for all places).
+                if lsad_keep and row.get("LSAD") not in lsad_keep:
                     continue
-                if row.get("FUNCSTAT") not in FUNCSTAT_KEEP:
+                if funcstat_keep and row.get("FUNCSTAT") not in funcstat_keep:
                     continue
                 try:
                     aland = int(row.get("ALAND", "0"))
                 except ValueError:
                     continue
-                if aland < MIN_ALAND:
+                if aland < min_aland:
                     continue
                 writer.writerow(row)
+                kept += 1
+
+                if artifact_path is not None:
+                    record = _record(row)
+                    if record is not None:
+                        records.append(record)
+
+    if artifact_path is not None:
+        write_city_artifact(artifact_path, _dedupe(records))
+    return kept
+
+
+def _dedupe(records: List[CityRecord]) -> Iterator[CityRecord]:
+    # cities.py keys by "Name, ST" and the last row wins; do the same here.
+    by_name: Dict[str, CityRecord] = {}
+    for record in records:
+        by_name[record[0]] = record
+    return iter(by_name.values())
+
+
+def _codes(value: str) -> Set[str]:
+    return {v.strip() for v in value.split(",") if v.strip()}
 
 
 def main() -> None:
-    filter_cities(INPUT_PATH, OUTPUT_PATH)
-    print(f"Wrote: {OUTPUT_PATH}")
+    parser = argparse.ArgumentParser(description="Filter the Census place gazetteer into the app's city list")
+    parser.add_argument("--input", type=Path, default=INPUT_PATH, help="gazetteer .zip or extracted .txt")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH, help="filtered TSV")
+    parser.add_argument("--artifact", type=Path, default=ARTIFACT_PATH, help="compiled binary city list")
+    parser.add_argument("--no-artifact", action="store_true", help="only write the TSV")
+    parser.add_argument("--lsad", type=_codes, default=LSAD_KEEP, help='comma-separated LSAD codes to keep ("" = all)')
+    parser.add_argument("--funcstat", type=_codes, default=FUNCSTAT_KEEP, help='comma-separated FUNCSTAT codes ("" = all)')
+    parser.add_argument("--min-aland", type=int, default=MIN_ALAND, help="minimum land area in m^2")
+    args = parser.parse_args()
+
+    artifact = None if args.no_artifact else args.artifact
+    kept = filter_cities(args.input, args.output, artifact, args.lsad, args.funcstat, args.min_aland)
+    print(f"Wrote: {args.output} ({kept} cities)")
+    if artifact is not None:
+        print(f"Wrote: {artifact}")
 
 
 if __name__ == "__main__":
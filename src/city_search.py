@@ -1,14 +1,48 @@
 import tkinter as tk
 
+from .city_index import CityIndex
+
+DEBOUNCE_MS = 120
+# Only the visible rows plus OVERSCAN on each side live in the Listbox, so
+# the result count no longer costs Tk inserts.
+MAX_RESULTS = 500
+OVERSCAN = 5
+
 
 class CitySearchController:
-    def __init__(self, city_combo, suggest_list, city_var, all_cities, suggest_scroll=None, max_display=10):
+    def __init__(
+        self,
+        city_combo,
+        suggest_list,
+        city_var,
+        all_cities,
+        suggest_scroll=None,
+        max_display=10,
+        debounce_ms=DEBOUNCE_MS,
+        weights=None,
+        max_results=MAX_RESULTS,
+        overscan=OVERSCAN,
+    ):
         self.city_combo = city_combo
         self.suggest_list = suggest_list
         self.city_var = city_var
         self.all_cities = all_cities
         self.suggest_scroll = suggest_scroll
         self.max_display = max_display
+        self.debounce_ms = debounce_ms
+        self.max_results = max_results
+        self.overscan = overscan
+        self.index = CityIndex(all_cities, weights)
+        self._pending_filter = None
+
+        # Virtual list state: `results` is the full ranked list; the Listbox
+        # holds results[_buf_start:_buf_start + len(_buf)] and shows `top`
+        # as its first visible row. `selected` indexes `results`.
+        self.results = []
+        self.top = 0
+        self.selected = None
+        self._buf = []
+        self._buf_start = 0
 
     def bind(self, status_callback=None):
         self.city_combo.bind("<KeyRelease>", self.on_keyrelease_filter)
@@ -23,6 +57,12 @@ class CitySearchController:
         self.city_combo.bind("<Escape>", self.on_escape)
         self.suggest_list.bind("<ButtonRelease-1>", self.on_list_click)
         self.suggest_list.bind("<MouseWheel>", self.on_mousewheel)
+        # The dropdown gets the current matches only when it is opened.
+        self.city_combo.configure(postcommand=self._fill_dropdown)
+        # The scrollbar tracks the whole result list, not the Listbox contents.
+        self.suggest_list.configure(yscrollcommand="")
+        if self.suggest_scroll is not None:
+            self.suggest_scroll.configure(command=self.on_scrollbar)
 
     def _hide_suggestions(self):
         self.suggest_list.grid_remove()
@@ -30,21 +70,86 @@ class CitySearchController:
         if self.suggest_scroll is not None:
             self.suggest_scroll.grid_remove()
 
+    def _height(self):
+        return min(self.max_display, len(self.results))
+
+    def _replace_rows(self, rows):
+        """Diff-update the Listbox to `rows`: only the changed middle is deleted and inserted."""
+        old = self._buf
+        prefix = 0
+        limit = min(len(old), len(rows))
+        while prefix < limit and old[prefix] == rows[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == rows[-1 - suffix]:
+            suffix += 1
+        if prefix < len(old) - suffix:
+            self.suggest_list.delete(prefix, len(old) - suffix - 1)
+        middle = rows[prefix : len(rows) - suffix]
+        if middle:
+            self.suggest_list.insert(prefix, *middle)
+        self._buf = list(rows)
+
+    def _render(self):
+        """Materialize the rows around `top`, scroll to it and sync selection and scrollbar."""
+        height = self._height()
+        start, end = self._buf_start, self._buf_start + len(self._buf)
+        if self.top < start or self.top + height > end or not self._buf:
+            new_start = max(self.top - self.overscan, 0)
+            new_end = min(self.top + height + self.overscan, len(self.results))
+            if new_start != start:
+                # Rows shifted position; rebuild rather than diff.
+                self._buf = []
+                self.suggest_list.delete(0, tk.END)
+            self._buf_start = new_start
+            self._replace_rows(self.results[new_start:new_end])
+        self.suggest_list.yview(self.top - self._buf_start)
+
+        self.suggest_list.selection_clear(0, tk.END)
+        if self.selected is not None and 0 <= self.selected - self._buf_start < len(self._buf):
+            row = self.selected - self._buf_start
+            self.suggest_list.selection_set(row)
+            self.suggest_list.activate(row)
+
+        if self.suggest_scroll is not None and self.results:
+            total = len(self.results)
+            self.suggest_scroll.set(self.top / total, (self.top + height) / total)
+
+    def _scroll_to(self, top):
+        self.top = max(0, min(top, len(self.results) - self._height()))
+        self._render()
+
+    def _select(self, index):
+        self.selected = index
+        height = self._height()
+        if index < self.top:
+            self._scroll_to(index)
+        elif index >= self.top + height:
+            self._scroll_to(index - height + 1)
+        else:
+            self._render()
+
     def _show_suggestions(self, items):
-        self.suggest_list.delete(0, tk.END)
-        for item in items:
-            self.suggest_list.insert(tk.END, item)
-        height = min(self.max_display, len(items))
+        self.results = items
+        self.top = 0
+        self.selected = 0 if items else None
+        if self._buf_start != 0:
+            self._buf = []
+            self._buf_start = 0
+            self.suggest_list.delete(0, tk.END)
+        height = self._height()
         self.suggest_list.configure(height=height)
+        self._replace_rows(items[: height + self.overscan])
+        self._render()
         self.suggest_list.grid()
         if self.suggest_scroll is not None:
             if len(items) > self.max_display:
                 self.suggest_scroll.grid()
             else:
                 self.suggest_scroll.grid_remove()
-        if items:
-            self.suggest_list.selection_set(0)
-            self.suggest_list.activate(0)
+
+    def _fill_dropdown(self):
+        self.city_combo["values"] = self.results if self.results else self.all_cities
 
     def _restore_entry_focus(self):
         self.city_combo.focus_set()
@@ -52,56 +157,53 @@ class CitySearchController:
         self.city_combo.icursor(tk.END)
 
     def on_keyrelease_filter(self, event):
-        typed = self.city_var.get().strip().lower()
-
         if event.keysym in ("Up", "Down", "Left", "Right", "Return", "Escape", "Tab"):
             return
 
+        # Debounce: a burst of keystrokes runs one search after the last key.
+        if self._pending_filter is not None:
+            self.city_combo.after_cancel(self._pending_filter)
+        self._pending_filter = self.city_combo.after(self.debounce_ms, self._run_filter)
+
+    def _run_filter(self):
+        self._pending_filter = None
+        typed = self.city_var.get().strip().lower()
+
         if not typed:
-            self.city_combo["values"] = self.all_cities
+            self.results = []
             self._hide_suggestions()
             return
 
-        filtered = [c for c in self.all_cities if typed in c.lower()]
+        filtered = self.index.ranked(typed, self.max_results)
 
         if not filtered:
+            self.results = []
             self._hide_suggestions()
             return
 
-        self.city_combo["values"] = filtered
         self.city_combo.after_idle(self._restore_entry_focus)
         self._show_suggestions(filtered)
 
     def on_down(self, event):
         if not self.suggest_list.winfo_ismapped():
             return
-        cur = self.suggest_list.curselection()
-        index = 0 if not cur else min(cur[0] + 1, self.suggest_list.size() - 1)
-        self.suggest_list.selection_clear(0, tk.END)
-        self.suggest_list.selection_set(index)
-        self.suggest_list.activate(index)
-        self.suggest_list.see(index)
+        index = 0 if self.selected is None else min(self.selected + 1, len(self.results) - 1)
+        self._select(index)
         return "break"
 
     def on_up(self, event):
         if not self.suggest_list.winfo_ismapped():
             return
-        cur = self.suggest_list.curselection()
-        index = 0 if not cur else max(cur[0] - 1, 0)
-        self.suggest_list.selection_clear(0, tk.END)
-        self.suggest_list.selection_set(index)
-        self.suggest_list.activate(index)
-        self.suggest_list.see(index)
+        index = 0 if self.selected is None else max(self.selected - 1, 0)
+        self._select(index)
         return "break"
 
     def on_combo_return(self, event):
         if not self.suggest_list.winfo_ismapped():
             return
-        cur = self.suggest_list.curselection()
-        if not cur:
+        if self.selected is None:
             return "break"
-        choice = self.suggest_list.get(cur[0])
-        self.city_var.set(choice)
+        self.city_var.set(self.results[self.selected])
         self._hide_suggestions()
         self._restore_entry_focus()
         return "break"
@@ -115,13 +217,20 @@ class CitySearchController:
             return
         delta = int(-1 * (event.delta / 120)) if event.delta else 0
         if delta:
-            self.suggest_list.yview_scroll(delta, "units")
+            self._scroll_to(self.top + delta)
         return "break"
 
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * len(self.results)))
+        elif action == "scroll":
+            step = self._height() if unit == "pages" else 1
+            self._scroll_to(self.top + int(amount) * step)
+
     def on_list_click(self, event):
         if not self.suggest_list.curselection():
             return
-        choice = self.suggest_list.get(self.suggest_list.curselection()[0])
+        choice = self.results[self._buf_start + self.suggest_list.curselection()[0]]
         self.city_var.set(choice)
         self._hide_suggestions()
         self._restore_entry_focus()
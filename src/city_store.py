@@ -0,0 +1,180 @@
+"""
+city_store.py
+
+Columnar, memory-compact city table.
+
+CityStore keeps one row per city in parallel columns instead of a dict of
+tuples: latitude and longitude as 8-byte floats, land area as 8-byte ints,
+and every name in a single UTF-8 buffer addressed by a u32 offset column.
+Rows are sorted by name, so a name lookup is a binary search over the buffer.
+Loaded from a compiled artifact, the columns are views over the memory map
+and nothing is copied.
+
+CityStore is a Mapping (CITY_DB[name] -> (lat, lon)), so it drops in where
+the old Dict[str, Tuple[float, float]] was used.
+"""
+
+from __future__ import annotations
+
+import mmap
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+from .city_artifact import CityRecord, encode_city_artifact, read_header, section_offsets
+
+
+class CityStore(Mapping):
+    def __init__(
+        self,
+        names: bytes | memoryview,
+        offsets: Sequence[int],
+        lat: Sequence[float],
+        lon: Sequence[float],
+        aland: Optional[Sequence[int]] = None,
+        keepalive: object = None,
+    ):
+        self._names = names
+        self._offsets = offsets
+        self._lat = lat
+        self._lon = lon
+        self._aland = aland
+        self._count = len(lat)
+        # The mmap backing memoryview columns must outlive them.
+        self._keepalive = keepalive
+
+    @classmethod
+    def from_records(cls, records: Iterable[CityRecord]) -> "CityStore":
+        """Build from (name, lat, lon, aland) rows, e.g. parsed from the TSV."""
+        data = encode_city_artifact(records)
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, data: bytes | mmap.mmap, keepalive: object = None) -> "CityStore":
+        count, names_len = read_header(data)
+        lat_at, lon_at, aland_at, offsets_at, names_at = section_offsets(count)
+        view = memoryview(data)
+
+        def column(typecode: str, start: int, n: int) -> Sequence:
+            size = n * array(typecode).itemsize
+            if sys.byteorder == "little":
+                return view[start : start + size].cast(typecode)
+            arr = array(typecode)
+            arr.frombytes(view[start : start + size])
+            arr.byteswap()
+            return arr
+
+        return cls(
+            names=view[names_at : names_at + names_len],
+            offsets=column("I", offsets_at, count + 1),
+            lat=column("d", lat_at, count),
+            lon=column("d", lon_at, count),
+            aland=column("q", aland_at, count),
+            keepalive=keepalive,
+        )
+
+    @classmethod
+    def from_artifact(cls, path: Path) -> "CityStore":
+        with path.open("rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(mapped, keepalive=mapped)
+
+    def _name_bytes(self, i: int) -> bytes | memoryview:
+        return self._names[self._offsets[i] : self._offsets[i + 1]]
+
+    def name(self, i: int) -> str:
+        return bytes(self._name_bytes(i)).decode("utf-8")
+
+    def coords(self, i: int) -> Tuple[float, float]:
+        return self._lat[i], self._lon[i]
+
+    def aland(self, i: int) -> int:
+        return self._aland[i] if self._aland is not None else 0
+
+    def index_of(self, name: str) -> int:
+        """Row of `name`, or -1. UTF-8 byte order matches str order, so bytes compare correctly."""
+        key = name.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._name_bytes(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and bytes(self._name_bytes(lo)) == key:
+            return lo
+        return -1
+
+    def __getitem__(self, name: str) -> Tuple[float, float]:
+        i = self.index_of(name) if isinstance(name, str) else -1
+        if i < 0:
+            raise KeyError(name)
+        return self.coords(i)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.index_of(name) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.name(i) for i in range(self._count))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def names(self) -> "CityNames":
+        return CityNames(self)
+
+    def aland_map(self) -> "CityAland":
+        return CityAland(self)
+
+    @property
+    def latitudes(self) -> Sequence[float]:
+        return self._lat
+
+    @property
+    def longitudes(self) -> Sequence[float]:
+        return self._lon
+
+
+class CityNames(Sequence):
+    """Sorted city names, decoded from the store on access."""
+
+    def __init__(self, store: CityStore):
+        self._store = store
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.name(i) for i in range(*index.indices(len(self._store)))]
+        if index < 0:
+            index += len(self._store)
+        if not 0 <= index < len(self._store):
+            raise IndexError(index)
+        return self._store.name(index)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store)
+
+
+class CityAland(Mapping):
+    """CITY_ALAND view: name -> land area, read from the store's column."""
+
+    def __init__(self, store: CityStore):
+        self._store = store
+
+    def __getitem__(self, name: str) -> int:
+        i = self._store.index_of(name) if isinstance(name, str) else -1
+        if i < 0:
+            raise KeyError(name)
+        return self._store.aland(i)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._store
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store)
+
+    def __len__(self) -> int:
+        return len(self._store)
@@ -0,0 +1,170 @@
+"""
+fetch_engine.py
+
+Concurrent fetch engine for one city lookup.
+
+After /points is resolved, the forecast chain (forecast URL) and the
+observation chain (station list -> latest observations) run in parallel.
+The station that reported humidity last time (see station_rank.py) is
+tried alone first; if it fails, the remaining candidates are probed
+concurrently, the first non-null relative humidity in preference order
+wins and the remaining probes are cancelled.
+A lookup therefore takes about as long as its longest chain instead of the
+sum of all its requests.
+
+Each LookupHandle carries a metrics.Trace; every task of the lookup runs
+with it active, so the handle ends up with a span per NWS request.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .forecast_model import ForecastPeriod
+from .http_client import NWSClient, default_client
+from .metrics import Trace, traced
+from .station_rank import STATION_RANKING
+from .weather import (
+    STATION_PROBE_LIMIT,
+    fetch_forecast_from_points,
+    fetch_points,
+    fetch_station_humidity,
+    ranked_station_ids,
+)
+
+# How often a chain waiting on station probes checks whether its lookup was cancelled.
+CANCEL_POLL_SECONDS = 0.05
+
+
+class LookupHandle:
+    """Futures for one in-progress lookup: `forecast` (ForecastPeriod list) and `humidity` (float | None)."""
+
+    def __init__(self, lat: float, lon: float):
+        self.lat = lat
+        self.lon = lon
+        self.forecast: Future = Future()
+        self.humidity: Future = Future()
+        self.trace = Trace()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop the lookup; work that has not started yet is skipped."""
+        self._cancelled.set()
+        self.forecast.cancel()
+        self.humidity.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> Tuple[List[ForecastPeriod], float | None]:
+        return self.forecast.result(timeout), self.humidity.result(timeout)
+
+
+def _run_into(future: Future, fn: Callable[..., Any], *args: Any) -> None:
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(fn(*args))
+    except BaseException as e:
+        future.set_exception(e)
+
+
+class FetchEngine:
+    def __init__(
+        self,
+        client: NWSClient | None = None,
+        max_chains: int = 8,
+        max_probes: int = 16,
+        station_limit: int = STATION_PROBE_LIMIT,
+    ):
+        self.client = client or default_client()
+        self.station_limit = station_limit
+        # Chain tasks may wait on probe tasks, never the other way round,
+        # so the two pools cannot deadlock each other.
+        self._chains = ThreadPoolExecutor(max_workers=max_chains, thread_name_prefix="nws-chain")
+        self._probes = ThreadPoolExecutor(max_workers=max_probes, thread_name_prefix="nws-probe")
+
+    def start(self, lat: float, lon: float) -> LookupHandle:
+        handle = LookupHandle(lat, lon)
+        points_future = self._chains.submit(traced, handle.trace, fetch_points, lat, lon, self.client)
+
+        def on_points(f: Future) -> None:
+            if handle.cancelled:
+                handle.cancel()
+                return
+            try:
+                points = f.result()
+            except BaseException as e:
+                for target in (handle.forecast, handle.humidity):
+                    if target.set_running_or_notify_cancel():
+                        target.set_exception(e)
+                return
+            self._chains.submit(
+                traced, handle.trace, _run_into, handle.forecast, fetch_forecast_from_points, points, self.client
+            )
+            self._chains.submit(traced, handle.trace, _run_into, handle.humidity, self._humidity, points, handle)
+
+        points_future.add_done_callback(on_points)
+        return handle
+
+    def fetch(self, lat: float, lon: float) -> Tuple[List[ForecastPeriod], float | None]:
+        """Blocking lookup: (forecast periods, relative humidity)."""
+        return self.start(lat, lon).result()
+
+    def _probe(self, station_id: str, handle: LookupHandle) -> float | None:
+        # Probes still queued when their lookup is cancelled send no request.
+        if handle.cancelled:
+            return None
+        try:
+            return fetch_station_humidity(station_id, self.client)
+        except Exception:
+            # One unreachable station should not fail the lookup.
+            return None
+
+    def _humidity(self, points: Dict[str, Any], handle: LookupHandle) -> float | None:
+        stations_url = points.get("observationStations")
+        station_ids = ranked_station_ids(points, self.client)[: self.station_limit]
+        if not station_ids:
+            return None
+
+        # Usually the preferred station answers and one request is enough.
+        rh = self._probe(station_ids[0], handle)
+        if handle.cancelled:
+            return None
+        STATION_RANKING.record(stations_url, station_ids[0], rh is not None)
+        if rh is not None:
+            return rh
+        return self.first_humidity(station_ids[1:], handle, stations_url)
+
+    def first_humidity(
+        self, station_ids: List[str], handle: LookupHandle, stations_url: Optional[str] = None
+    ) -> float | None:
+        """Probe all stations at once; return the first non-null value in preference order."""
+        probes = [self._probes.submit(traced, handle.trace, self._probe, sid, handle) for sid in station_ids]
+        try:
+            for station_id, probe in zip(station_ids, probes):
+                # A cancelled lookup gives up at once instead of waiting out a slow station.
+                while not wait([probe], timeout=CANCEL_POLL_SECONDS).done:
+                    if handle.cancelled:
+                        return None
+                if handle.cancelled:
+                    return None
+                try:
+                    rh = probe.result()
+                except CancelledError:
+                    continue
+                if stations_url is not None:
+                    STATION_RANKING.record(stations_url, station_id, rh is not None)
+                if rh is not None:
+                    return rh
+            return None
+        finally:
+            for probe in probes:
+                probe.cancel()
+
+    def shutdown(self) -> None:
+        self._chains.shutdown(wait=False, cancel_futures=True)
+        self._probes.shutdown(wait=False, cancel_futures=True)
@@ -1,24 +1,59 @@
 ﻿from __future__ import annotations
 
 import math
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Tuple
+
+from .forecast_model import DaySummary, ForecastPeriod
+from .metrics import timed
 
 SPACE_FACTOR = 1
+# Text widths are remembered per (font, text); day labels, "N/A" and common
+# condition strings repeat across every city and render.
+MEASURE_CACHE_SIZE = 4096
 
-def _measure(text: str, font: Any | None) -> int:
-    if font is None:
-        return len(text)
-    return int(font.measure(text))
+_widths: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+# format_days also runs on bulk and server worker threads; the LRU
+# reorders on every hit, so every access holds the lock.
+_widths_lock = threading.Lock()
 
 
-def _pad_to_width(text: str, target_width: int, font: Any | None, space_width: int) -> str:
-    current = _measure(text, font)
-    pad_px = max(target_width - current, 0)
-    if space_width <= 0:
-        pad_spaces = 0
-    else:
-        pad_spaces = math.ceil(pad_px / space_width)
-    return text + (" " * (pad_spaces * SPACE_FACTOR))
+def _measurer(font: Any | None) -> Callable[[str], int]:
+    """Width function for `font` (character count when there is no font), memoized."""
+    if font is None:
+        return len
+    # A Tk font is identified by its name; call clear_measure_cache() after
+    # reconfiguring one.
+    font_name = str(font)
+
+    def measure(text: str) -> int:
+        key = (font_name, text)
+        with _widths_lock:
+            width = _widths.get(key)
+            if width is not None:
+                _widths.move_to_end(key)
+                return width
+        # Measured outside the lock: a Tk round-trip should not block other threads.
+        width = int(font.measure(text))
+        with _widths_lock:
+            _widths[key] = width
+            if len(_widths) > MEASURE_CACHE_SIZE:
+                _widths.popitem(last=False)
+        return width
+
+    return measure
+
+
+def clear_measure_cache() -> None:
+    with _widths_lock:
+        _widths.clear()
+
+
+def _pad_spaces(pad_px: int, space_width: int) -> str:
+    if space_width <= 0 or pad_px <= 0:
+        return ""
+    return " " * (math.ceil(pad_px / space_width) * SPACE_FACTOR)
 
 def _convert_temp(value: float | None, from_unit: str | None, to_unit: str) -> float | None:
     if value is None:
@@ -32,39 +67,35 @@ def _convert_temp(value: float | None, from_unit: str | None, to_unit: str) -> f
     return value
 
 
-def format_now(period: Dict[str, Any], humidity: float | None, target_unit: str) -> str:
-    temp = period.get("temperature")
-    from_unit = period.get("temperatureUnit", "F")
-    temp = _convert_temp(temp, from_unit, target_unit)
-    short = period.get("shortForecast", "")
+def format_now(period: ForecastPeriod, humidity: float | None, target_unit: str) -> str:
+    temp = _convert_temp(period.temperature, period.temperature_unit or "F", target_unit)
+    short = period.short_forecast
     base = f"Now: {temp:.0f} {target_unit} - {short}"
     if humidity is None:
         return base
     return f"{base} | Humidity: {humidity:.0f}%"
 
 
-def _format_detail_lines(
-    details: List[tuple[str, str]],
-    column_widths: List[int],
-    font: Any | None,
-    space_width: int,
-) -> str:
-    parts = []
-    for idx, (label, value) in enumerate(details):
-        segment = f"{label}: {value}"
-        seg_width = _measure(segment, font)
-        width = column_widths[idx] if idx < len(column_widths) else seg_width
-        pad_px = max(width - seg_width, 0)
-        if space_width <= 0:
-            pad_spaces = 0
-        else:
-            pad_spaces = math.ceil(pad_px / space_width)
-        parts.append(segment + (" " * (pad_spaces * SPACE_FACTOR)))
-    return " | ".join(parts)
+def _row_segments(
+    s: DaySummary, show_temp_range: bool, show_weather: bool, show_wind: bool, target_unit: str
+) -> List[str]:
+    segments: List[str] = []
+    if show_temp_range:
+        low = _convert_temp(s.temp_low, s.unit, target_unit)
+        high = _convert_temp(s.temp_high, s.unit, target_unit)
+        temp_value = "N/A" if low is None and high is None else f"{low:.0f}~{high:.0f} {target_unit}"
+        segments.append(f"Temp range: {temp_value}")
+    if show_weather:
+        segments.append(f"Conditions: {s.short_forecast}")
+    if show_wind:
+        wind = f"{s.wind_dir} {s.wind_speed}".strip()
+        segments.append(f"Wind: {wind or 'N/A'}")
+    return segments
 
 
+@timed("format_days")
 def format_days(
-    summaries: List[Dict[str, Any]],
+    summaries: List[DaySummary],
     days: int,
     show_temp_range: bool,
     show_weather: bool,
@@ -72,66 +103,39 @@ def format_days(
     target_unit: str,
     font: Any | None = None,
 ) -> List[str]:
-    lines: List[str] = []
-    enabled_labels: List[str] = []
-    if show_temp_range:
-        enabled_labels.append("Temp range")
-    if show_weather:
-        enabled_labels.append("Conditions")
-    if show_wind:
-        enabled_labels.append("Wind")
-
-    space_width = _measure(" ", font)
-    labels = [s.get("label", s.get("date", "Day")) for s in summaries[:days]]
-    max_label_width = max((_measure(label, font) for label in labels), default=0)
-    length_matrix: List[List[int]] = []
-    for s in summaries[:days]:
-        row_lengths: List[int] = []
-        if show_temp_range:
-            from_unit = s.get("unit")
-            low = _convert_temp(s.get("temp_low"), from_unit, target_unit)
-            high = _convert_temp(s.get("temp_high"), from_unit, target_unit)
-            temp_value = "N/A" if low is None and high is None else f"{low:.0f}~{high:.0f} {target_unit}"
-            row_lengths.append(_measure(f"Temp range: {temp_value}", font))
-        if show_weather:
-            cond_value = s.get("short_forecast", "")
-            row_lengths.append(_measure(f"Conditions: {cond_value}", font))
-        if show_wind:
-            wind_value = f"{s.get('wind_dir', '')} {s.get('wind_speed', '')}".strip() or "N/A"
-            row_lengths.append(_measure(f"Wind: {wind_value}", font))
-        length_matrix.append(row_lengths)
-
+    """
+    One line per day: the label padded to the widest label, then the enabled
+    details as columns padded to the widest entry plus a space. Each segment
+    is built and measured once; column widths accumulate in the same pass.
+    """
+    measure = _measurer(font)
+    space_width = measure(" ")
+
+    rows: List[Tuple[str, int, List[str], List[int]]] = []
+    label_width = 0
     column_widths: List[int] = []
-    if length_matrix:
-        col_count = max(len(row) for row in length_matrix)
-        for col in range(col_count):
-            max_len = max((row[col] for row in length_matrix if col < len(row)), default=0)
-            column_widths.append(max_len + space_width)
-
-    for idx, s in enumerate(summaries[:days]):
-        label = labels[idx] if idx < len(labels) else s.get("label", s.get("date", "Day"))
-        padded_label = _pad_to_width(label, max_label_width, font, space_width)
-        details: List[tuple[str, str]] = []
-        from_unit = s.get("unit")
-        if show_temp_range:
-            low = _convert_temp(s.get("temp_low"), from_unit, target_unit)
-            high = _convert_temp(s.get("temp_high"), from_unit, target_unit)
-            if low is None and high is None:
-                details.append(("Temp range", "N/A"))
-            else:
-                details.append(("Temp range", f"{low:.0f}~{high:.0f} {target_unit}"))
-        if show_weather:
-            details.append(("Conditions", s.get("short_forecast", "")))
-        if show_wind:
-            wind = f"{s.get('wind_dir', '')} {s.get('wind_speed', '')}".strip()
-            details.append(("Wind", wind or "N/A"))
-
-        if details:
-            lines.append(
-                f"{padded_label}: "
-                + _format_detail_lines(details, column_widths, font, space_width)
-            )
-        else:
-            lines.append(f"{s.get('label', s.get('date', 'Day'))}")
+    for s in summaries[:days]:
+        label = s.label or s.date or "Day"
+        width = measure(label)
+        label_width = max(label_width, width)
+        segments = _row_segments(s, show_temp_range, show_weather, show_wind, target_unit)
+        widths = [measure(segment) for segment in segments]
+        for col, seg_width in enumerate(widths):
+            if col == len(column_widths):
+                column_widths.append(seg_width)
+            elif seg_width > column_widths[col]:
+                column_widths[col] = seg_width
+        rows.append((label, width, segments, widths))
+    column_widths = [w + space_width for w in column_widths]
 
+    lines: List[str] = []
+    for label, width, segments, widths in rows:
+        if not segments:
+            lines.append(label)
+            continue
+        parts = [
+            segment + _pad_spaces(column_widths[col] - seg_width, space_width)
+            for col, (segment, seg_width) in enumerate(zip(segments, widths))
+        ]
+        lines.append(f"{label}{_pad_spaces(label_width - width, space_width)}: " + " | ".join(parts))
     return lines
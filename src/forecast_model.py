@@ -0,0 +1,164 @@
+"""
+forecast_model.py
+
+Compact records for forecast data.
+
+An NWS forecast response is a GeoJSON tree of nested dicts, most of which
+(geometry, elevation, detailed text, update times) the app never reads.
+decode_forecast() runs once when the response arrives and keeps only the
+fields we use, as __slots__ objects: no per-instance dict, plain attribute
+access instead of .get() calls, and repeated strings ("F", "NW",
+"Partly Cloudy") interned so many cached forecasts share one copy.
+
+DaySummary is the same kind of record for one day of
+forecast_summary.build_day_summaries / hourly.hourly_day_summaries output;
+as_dict() gives the JSON form used by bulk.py and server.py.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, List, Optional
+
+_intern = sys.intern
+
+
+def _text(value: Any) -> str:
+    return _intern(value) if isinstance(value, str) else ""
+
+
+class ForecastPeriod:
+    __slots__ = (
+        "name",
+        "start_time",
+        "date",
+        "is_daytime",
+        "temperature",
+        "temperature_unit",
+        "wind_speed",
+        "wind_direction",
+        "short_forecast",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        start_time: str,
+        is_daytime: Optional[bool],
+        temperature: Optional[float],
+        temperature_unit: Optional[str],
+        wind_speed: str,
+        wind_direction: str,
+        short_forecast: str,
+    ):
+        self.name = name
+        self.start_time = start_time
+        # Local calendar date, straight from the ISO timestamp ("2026-10-17T06:00:00-04:00").
+        self.date = start_time[:10] if len(start_time) >= 10 and start_time[4:5] == start_time[7:8] == "-" else None
+        self.is_daytime = is_daytime
+        self.temperature = temperature
+        self.temperature_unit = temperature_unit
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.short_forecast = short_forecast
+
+    @classmethod
+    def from_json(cls, raw: Dict[str, Any]) -> "ForecastPeriod":
+        temperature = raw.get("temperature")
+        if isinstance(temperature, dict):
+            temperature = temperature.get("value")
+        is_daytime = raw.get("isDaytime")
+        return cls(
+            name=_text(raw.get("name")),
+            start_time=raw.get("startTime") or "",
+            is_daytime=is_daytime if isinstance(is_daytime, bool) else None,
+            temperature=temperature if isinstance(temperature, (int, float)) else None,
+            # No unit means unknown: callers decide, as they did with the raw dicts.
+            temperature_unit=_text(raw.get("temperatureUnit")) or None,
+            wind_speed=_text(raw.get("windSpeed")),
+            wind_direction=_text(raw.get("windDirection")),
+            short_forecast=_text(raw.get("shortForecast")),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        """The NWS period fields this record keeps; from_json(p.to_json()) round-trips."""
+        return {
+            "name": self.name,
+            "startTime": self.start_time,
+            "isDaytime": self.is_daytime,
+            "temperature": self.temperature,
+            "temperatureUnit": self.temperature_unit,
+            "windSpeed": self.wind_speed,
+            "windDirection": self.wind_direction,
+            "shortForecast": self.short_forecast,
+        }
+
+    def __repr__(self) -> str:
+        return f"ForecastPeriod({self.name!r}, {self.start_time!r}, {self.temperature}{self.temperature_unit or ''})"
+
+
+def decode_forecast(payload: Dict[str, Any]) -> List[ForecastPeriod]:
+    """/forecast response -> periods, dropping everything else in the payload."""
+    return [ForecastPeriod.from_json(p) for p in payload["properties"]["periods"]]
+
+
+class DaySummary:
+    __slots__ = (
+        "date",
+        "label",
+        "short_forecast",
+        "wind_speed",
+        "wind_dir",
+        "temp_high",
+        "temp_low",
+        "unit",
+        # Only known when built from the hourly forecast.
+        "temp_mean",
+        "precip_max",
+        "humidity_mean",
+        "hours",
+    )
+
+    def __init__(
+        self,
+        date: str,
+        label: str,
+        short_forecast: str,
+        wind_speed: str,
+        wind_dir: str,
+        temp_high: Optional[float],
+        temp_low: Optional[float],
+        unit: Optional[str],
+        temp_mean: Optional[float] = None,
+        precip_max: Optional[float] = None,
+        humidity_mean: Optional[float] = None,
+        hours: Optional[int] = None,
+    ):
+        self.date = date
+        self.label = label
+        self.short_forecast = short_forecast
+        self.wind_speed = wind_speed
+        self.wind_dir = wind_dir
+        self.temp_high = temp_high
+        self.temp_low = temp_low
+        self.unit = unit
+        self.temp_mean = temp_mean
+        self.precip_max = precip_max
+        self.humidity_mean = humidity_mean
+        self.hours = hours
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON form; the hourly-only fields are left out when unknown."""
+        out = {name: getattr(self, name) for name in self.__slots__}
+        for name in ("temp_mean", "precip_max", "humidity_mean", "hours"):
+            if out[name] is None:
+                del out[name]
+        return out
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DaySummary):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"DaySummary({self.date!r}, {self.label!r}, {self.temp_low}~{self.temp_high} {self.unit})"
@@ -1,26 +1,18 @@
 ﻿from __future__ import annotations
 
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Dict, List
 
+from .forecast_model import DaySummary, ForecastPeriod
+from .metrics import timed
 
-def _parse_date(period: Dict[str, Any]) -> Optional[str]:
-    start = period.get("startTime")
-    if not start:
-        return None
-    try:
-        dt = datetime.fromisoformat(start)
-    except ValueError:
-        return None
-    return dt.date().isoformat()
 
-
-def build_day_summaries(periods: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    by_date: Dict[str, List[Dict[str, Any]]] = {}
+@timed("build_day_summaries")
+def build_day_summaries(periods: List[ForecastPeriod]) -> List[DaySummary]:
+    by_date: Dict[str, List[ForecastPeriod]] = {}
     order: List[str] = []
 
     for p in periods:
-        date = _parse_date(p)
+        date = p.date
         if not date:
             continue
         if date not in by_date:
@@ -28,26 +20,25 @@ def build_day_summaries(periods: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             order.append(date)
         by_date[date].append(p)
 
-    summaries: List[Dict[str, Any]] = []
+    summaries: List[DaySummary] = []
     for date in order:
         items = by_date[date]
-        day_period = next((p for p in items if p.get("isDaytime") is True), items[0])
-        temps = [p.get("temperature") for p in items if isinstance(p.get("temperature"), (int, float))]
+        day_period = next((p for p in items if p.is_daytime is True), items[0])
+        temps = [p.temperature for p in items if p.temperature is not None]
         temp_high = max(temps) if temps else None
         temp_low = min(temps) if temps else None
-        unit = day_period.get("temperatureUnit")
 
         summaries.append(
-            {
-                "date": date,
-                "label": day_period.get("name", date),
-                "short_forecast": day_period.get("shortForecast", ""),
-                "wind_speed": day_period.get("windSpeed", ""),
-                "wind_dir": day_period.get("windDirection", ""),
-                "temp_high": temp_high,
-                "temp_low": temp_low,
-                "unit": unit,
-            }
+            DaySummary(
+                date=date,
+                label=day_period.name or date,
+                short_forecast=day_period.short_forecast,
+                wind_speed=day_period.wind_speed,
+                wind_dir=day_period.wind_direction,
+                temp_high=temp_high,
+                temp_low=temp_low,
+                unit=day_period.temperature_unit,
+            )
         )
 
     return summaries
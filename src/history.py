@@ -0,0 +1,307 @@
+"""
+history.py
+
+Forecast history kept across runs, in SQLite.
+
+HistoryStore records every finished lookup (forecast periods, relative
+humidity, current temperature and conditions) per city with its fetch
+time. last(city) returns the most recent one in the same shape as
+PrefetchScheduler.get, so WeatherApp can show it at once while a refresh
+runs, or instead of one when NWS is unreachable. history(city, since,
+until) is a range query for trend views.
+
+Lookups are small rows keyed by (city, fetched_at) in a WITHOUT ROWID
+table, so both queries are a seek in the primary key; the forecast text
+lives in a separate table, and a forecast identical to the city's
+previous one is stored once and shared. The database is in WAL mode and
+writes are batched: record() only queues a row, and the queue is written
+in one transaction a second later, when it reaches `batch_size`, and at
+exit. Lookups older than `retention` are pruned (at most once per
+`prune_interval`, so a long-running server stays bounded too), except the
+newest of each city, and forecasts no lookup refers to go with them.
+
+Usage:
+  python -m src.history "Austin city, TX" [--days 7] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .forecast_model import ForecastPeriod
+from .nws_cache import CACHE_DIR, FLUSH_DELAY_SECONDS
+
+HISTORY_PATH = CACHE_DIR / "history.sqlite3"
+BATCH_SIZE = 64
+RETENTION_SECONDS = 90 * 24 * 3600
+PRUNE_INTERVAL_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    id INTEGER PRIMARY KEY,
+    periods TEXT NOT NULL  -- JSON list of ForecastPeriod.to_json()
+);
+CREATE TABLE IF NOT EXISTS lookups (
+    city TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    humidity REAL,
+    temperature REAL,
+    temperature_unit TEXT,
+    short_forecast TEXT,
+    forecast_id INTEGER NOT NULL REFERENCES forecasts (id),
+    PRIMARY KEY (city, fetched_at)
+) WITHOUT ROWID;
+"""
+
+# Queued lookup: (city, fetched_at, lat, lon, humidity, temperature, unit, short_forecast, periods JSON)
+Row = Tuple[str, float, float, float, Optional[float], Optional[float], Optional[str], Optional[str], str]
+
+UPSERT_LOOKUP = """
+INSERT INTO lookups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (city, fetched_at) DO UPDATE SET
+    lat = excluded.lat,
+    lon = excluded.lon,
+    humidity = excluded.humidity,
+    temperature = excluded.temperature,
+    temperature_unit = excluded.temperature_unit,
+    short_forecast = excluded.short_forecast,
+    forecast_id = excluded.forecast_id
+"""
+
+
+def _periods_json(periods: List[ForecastPeriod]) -> str:
+    return json.dumps([p.to_json() for p in periods], separators=(",", ":"))
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        path: Path = HISTORY_PATH,
+        delay: float = FLUSH_DELAY_SECONDS,
+        batch_size: int = BATCH_SIZE,
+        retention: float = RETENTION_SECONDS,
+        prune_interval: float = PRUNE_INTERVAL_SECONDS,
+    ):
+        self.path = Path(path)
+        self.delay = delay
+        self.batch_size = batch_size
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        # Guards the connection; SQLite work happens under it, from any thread.
+        self._lock = threading.Lock()
+        self._pending: List[Row] = []
+        self._pending_lock = threading.Lock()
+        # city -> (forecasts row id, periods JSON) of its newest written lookup, for
+        # de-duplication; under _lock.
+        self._last_forecast: Dict[str, Tuple[int, str]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._pruned_at: Optional[float] = None
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with self._lock held; the file is opened on first use.
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(
+        self,
+        city: str,
+        lat: float,
+        lon: float,
+        periods: List[ForecastPeriod],
+        humidity: Optional[float],
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Queue one finished lookup; it is written with the next batch."""
+        if not periods:
+            return
+        now = periods[0]
+        text = _periods_json(periods)
+        with self._pending_lock:
+            self._pending.append(
+                (
+                    city,
+                    fetched_at if fetched_at is not None else time.time(),
+                    lat,
+                    lon,
+                    humidity,
+                    now.temperature,
+                    now.temperature_unit,
+                    now.short_forecast,
+                    text,
+                )
+            )
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            try:
+                self._write(conn, rows)
+            except BaseException:
+                # Rolled back: forecast ids handed out in the transaction do not exist.
+                self._last_forecast.clear()
+                raise
+
+    def _write(self, conn: sqlite3.Connection, rows: List[Row]) -> None:
+        # Called with self._lock held.
+        with conn:
+            conn.execute("BEGIN")
+            lookups = []
+            replaced = []
+            # A lookup recorded twice at the same time keeps its last version.
+            for *fields, text in {row[:2]: row for row in rows}.values():
+                city, fetched_at = fields[0], fields[1]
+                last = self._last_forecast.get(city)
+                if last is not None and last[1] == text:
+                    forecast_id = last[0]
+                else:
+                    forecast_id = conn.execute("INSERT INTO forecasts (periods) VALUES (?)", (text,)).lastrowid
+                    self._last_forecast[city] = (forecast_id, text)
+                old = conn.execute(
+                    "SELECT forecast_id FROM lookups WHERE city = ? AND fetched_at = ?", (city, fetched_at)
+                ).fetchone()
+                if old is not None and old[0] != forecast_id:
+                    replaced.append((old[0], old[0]))
+                lookups.append((*fields, forecast_id))
+            conn.executemany(UPSERT_LOOKUP, lookups)
+            # Forecasts only the overwritten lookups referred to.
+            conn.executemany(
+                "DELETE FROM forecasts WHERE id = ? AND NOT EXISTS (SELECT 1 FROM lookups WHERE forecast_id = ?)",
+                replaced,
+            )
+            now = time.monotonic()
+            if self._pruned_at is None or now - self._pruned_at >= self.prune_interval:
+                self._prune(conn)
+                self._pruned_at = now
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        # The newest lookup of a city stays, however old, so last() still works.
+        conn.execute(
+            """
+            DELETE FROM lookups
+            WHERE fetched_at < ?
+              AND fetched_at < (SELECT MAX(l.fetched_at) FROM lookups AS l WHERE l.city = lookups.city)
+            """,
+            (time.time() - self.retention,),
+        )
+        conn.execute("DELETE FROM forecasts WHERE id NOT IN (SELECT forecast_id FROM lookups)")
+        for city, (forecast_id, _) in list(self._last_forecast.items()):
+            if conn.execute("SELECT 1 FROM forecasts WHERE id = ?", (forecast_id,)).fetchone() is None:
+                del self._last_forecast[city]
+
+    def last(self, city: str) -> Optional[Dict[str, Any]]:
+        """The newest lookup of `city`: {"periods", "humidity", "fetched_at"}, or None."""
+        with self._pending_lock:
+            queued = [row for row in self._pending if row[0] == city]
+        if queued:
+            newest = max(queued, key=lambda row: row[1])
+            return self._result(newest[8], newest[4], newest[1])
+
+        with self._lock:
+            if self._conn is None and not self.path.exists():
+                return None
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT l.fetched_at, l.humidity, f.periods, f.id FROM lookups AS l "
+                    "JOIN forecasts AS f ON f.id = l.forecast_id "
+                    "WHERE l.city = ? ORDER BY l.fetched_at DESC LIMIT 1",
+                    (city,),
+                )
+                .fetchone()
+            )
+            if row is None:
+                return None
+            # First sight of the city in this run: the next identical forecast reuses the stored row.
+            self._last_forecast.setdefault(city, (row[3], row[2]))
+        return self._result(row[2], row[1], row[0])
+
+    @staticmethod
+    def _result(periods_text: str, humidity: Optional[float], fetched_at: float) -> Dict[str, Any]:
+        periods = [ForecastPeriod.from_json(p) for p in json.loads(periods_text)]
+        return {"periods": periods, "humidity": humidity, "fetched_at": fetched_at}
+
+    def history(
+        self, city: str, since: Optional[float] = None, until: Optional[float] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Lookups of `city` with since <= fetched_at < until, oldest first (forecast periods left out)."""
+        self.flush()
+        with self._lock:
+            if self._conn is None and not self.path.exists():
+                return []
+            rows = self._connect().execute(
+                "SELECT fetched_at, humidity, temperature, temperature_unit, short_forecast FROM lookups "
+                "WHERE city = ? AND fetched_at >= ? AND fetched_at < ? ORDER BY fetched_at LIMIT ?",
+                (
+                    city,
+                    since if since is not None else float("-inf"),
+                    until if until is not None else float("inf"),
+                    limit if limit is not None else -1,
+                ),
+            ).fetchall()
+        return [
+            {"fetched_at": t, "humidity": rh, "temperature": temp, "unit": unit, "short_forecast": text}
+            for t, rh, temp, unit, text in rows
+        ]
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the recorded forecast history of a city")
+    parser.add_argument("city")
+    parser.add_argument("--days", type=float, default=7, help="how far back to look")
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args()
+
+    store = HistoryStore()
+    rows = store.history(args.city, since=time.time() - args.days * 24 * 3600)
+    if not rows:
+        print(f"No history for {args.city!r} in the last {args.days:g} days")
+    for row in rows:
+        if args.json:
+            print(json.dumps(row))
+            continue
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["fetched_at"]))
+        temp = f"{row['temperature']:.0f} {row['unit'] or 'F'}" if row["temperature"] is not None else "N/A"
+        rh = f"{row['humidity']:.0f}%" if row["humidity"] is not None else "N/A"
+        print(f"{when}  {temp:>6}  RH {rh:>4}  {row['short_forecast']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+hourly.py
+
+Hourly forecasts as columns, and day summaries computed from them.
+
+decode_hourly() turns the ~156 period dicts of a forecastHourly response
+into parallel columns: local day (YYYYMMDD int), local hour, UTC timestamp,
+temperature, wind speed, precipitation probability and relative humidity
+(floats, NaN when missing). Timestamps are parsed by slicing the fixed
+ISO-8601 layout NWS uses rather than calling datetime.fromisoformat per row.
+
+hourly_day_summaries() groups the hours by local day and takes min / max /
+mean of each column with one reduceat pass per column when NumPy is
+installed, or one pass over the rows without it. Highs and lows come from
+every hour of the day instead of the two 12-hour periods, and the result
+is the same DaySummary records forecast_summary.build_day_summaries
+returns (plus mean temperature, precipitation and humidity), so format_days
+renders it unchanged. summarize_many() does the same for many cities in a
+single pass over their concatenated columns.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the stdlib path gives the same results.
+    np = None
+
+from .forecast_model import DaySummary
+
+NAN = float("nan")
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Hour whose conditions describe the day, as in the daytime 12-hour period.
+REPRESENTATIVE_HOUR = 14
+
+
+class HourlyColumns:
+    """Parallel columns for one location's hourly forecast, in time order."""
+
+    def __init__(self):
+        self.day = array("l")
+        self.hour = array("b")
+        self.timestamp = array("q")
+        self.temperature = array("d")
+        self.wind_speed = array("d")
+        self.precip = array("d")
+        self.humidity = array("d")
+        self.wind_dir: List[str] = []
+        self.short_forecast: List[str] = []
+        self.unit: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def numeric(self, name: str):
+        """A numeric column as a NumPy array (zero-copy) if available, else the array itself."""
+        column = getattr(self, name)
+        if np is None:
+            return column
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.empty(0, dtype=column.typecode)
+
+
+def _value(field: Any) -> float:
+    # Hourly fields come as {"unitCode": ..., "value": n} or a bare number.
+    if isinstance(field, dict):
+        field = field.get("value")
+    return float(field) if isinstance(field, (int, float)) else NAN
+
+
+def _wind_mph(text: Any) -> float:
+    # "10 mph" or "5 to 10 mph": the upper figure.
+    if not isinstance(text, str):
+        return NAN
+    numbers = [float(token) for token in text.split() if token.isdigit()]
+    return max(numbers) if numbers else NAN
+
+
+def decode_hourly(periods: Sequence[Dict[str, Any]]) -> HourlyColumns:
+    cols = HourlyColumns()
+    # A forecast repeats a handful of dates, offsets and wind strings; parse each once.
+    days: Dict[str, Tuple[int, int]] = {}
+    offsets: Dict[str, int] = {}
+    winds: Dict[Any, float] = {}
+    append_day, append_hour, append_ts = cols.day.append, cols.hour.append, cols.timestamp.append
+    append_temp, append_wind = cols.temperature.append, cols.wind_speed.append
+    append_precip, append_rh = cols.precip.append, cols.humidity.append
+    for p in periods:
+        start = p.get("startTime")
+        # "2026-10-17T14:00:00-04:00"
+        if not isinstance(start, str) or len(start) < 19:
+            continue
+        day_text = start[:10]
+        day = days.get(day_text)
+        if day is None:
+            try:
+                ordinal = date.fromisoformat(day_text).toordinal()
+            except ValueError:
+                continue
+            day = days[day_text] = (int(day_text.replace("-", "")), ordinal - EPOCH_ORDINAL)
+        offset_text = start[19:]
+        offset = offsets.get(offset_text)
+        if offset is None:
+            offset = 0
+            if len(offset_text) == 6:
+                sign = -1 if offset_text[0] == "-" else 1
+                offset = sign * (int(offset_text[1:3]) * 60 + int(offset_text[4:6]))
+            offsets[offset_text] = offset
+        hour = int(start[11:13])
+        wind_text = p.get("windSpeed")
+        wind = winds.get(wind_text)
+        if wind is None:
+            wind = winds[wind_text] = _wind_mph(wind_text)
+
+        append_day(day[0])
+        append_hour(hour)
+        append_ts((day[1] * 1440 + hour * 60 + int(start[14:16]) - offset) * 60)
+        append_temp(_value(p.get("temperature")))
+        append_wind(wind)
+        append_precip(_value(p.get("probabilityOfPrecipitation")))
+        append_rh(_value(p.get("relativeHumidity")))
+        cols.wind_dir.append(p.get("windDirection") or "")
+        cols.short_forecast.append(p.get("shortForecast") or "")
+        if cols.unit is None:
+            cols.unit = p.get("temperatureUnit")
+    return cols
+
+
+def _group_starts(keys) -> List[int]:
+    """Row index where each run of equal keys begins (rows are in time order)."""
+    if np is not None:
+        keys = np.asarray(keys)
+        if not len(keys):
+            return []
+        return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))).tolist()
+    return [i for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1]]
+
+
+def _aggregate(columns: Dict[str, Any], starts: List[int], total: int) -> Dict[str, List[float]]:
+    """min/max/mean per group for each column; NaNs are ignored, all-NaN groups give NaN."""
+    if np is not None:
+        idx = np.asarray(starts, dtype=np.intp)
+        out: Dict[str, List[float]] = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for name, values in columns.items():
+                values = np.asarray(values, dtype=float)
+                valid = ~np.isnan(values)
+                sums = np.add.reduceat(np.where(valid, values, 0.0), idx)
+                counts = np.add.reduceat(valid.astype(np.int64), idx)
+                out[name + "_min"] = np.fmin.reduceat(values, idx).tolist()
+                out[name + "_max"] = np.fmax.reduceat(values, idx).tolist()
+                out[name + "_mean"] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan).tolist()
+        return out
+
+    out = {f"{name}_{stat}": [] for name in columns for stat in ("min", "max", "mean")}
+    bounds = list(zip(starts, starts[1:] + [total]))
+    for name, values in columns.items():
+        mins, maxes, means = out[name + "_min"], out[name + "_max"], out[name + "_mean"]
+        for lo, hi in bounds:
+            present = [v for v in values[lo:hi] if v == v]
+            if present:
+                mins.append(min(present))
+                maxes.append(max(present))
+                means.append(sum(present) / len(present))
+            else:
+                mins.append(NAN)
+                maxes.append(NAN)
+                means.append(NAN)
+    return out
+
+
+def _or_none(value: float, digits: int = 0) -> Optional[float]:
+    if math.isnan(value):
+        return None
+    return round(value, digits) if digits else round(value)
+
+
+def _day_summaries(
+    cols: HourlyColumns, starts: List[int], stats: Dict[str, List[float]], offset: int = 0
+) -> List[DaySummary]:
+    summaries = []
+    hour, wind = cols.hour, cols.wind_speed
+    ends = starts[1:] + [offset + len(cols)]
+    for g, (lo, hi) in enumerate(zip(starts, ends)):
+        lo, hi = lo - offset, hi - offset
+        day = cols.day[lo]
+        when = date(day // 10000, day // 100 % 100, day % 100)
+        # Conditions at mid-afternoon (or the last hour before it), wind
+        # direction at the windiest hour.
+        rep = windiest = lo
+        strongest = -1.0
+        for i in range(lo, hi):
+            if hour[i] <= REPRESENTATIVE_HOUR:
+                rep = i
+            if wind[i] > strongest:  # False for NaN
+                strongest, windiest = wind[i], i
+        wind_max = _or_none(stats["wind_speed_max"][g])
+        summaries.append(
+            DaySummary(
+                date=when.isoformat(),
+                label=when.strftime("%A"),
+                short_forecast=cols.short_forecast[rep],
+                wind_speed=f"{wind_max:.0f} mph" if wind_max is not None else "",
+                wind_dir=cols.wind_dir[windiest],
+                temp_high=_or_none(stats["temperature_max"][g]),
+                temp_low=_or_none(stats["temperature_min"][g]),
+                unit=cols.unit,
+                temp_mean=_or_none(stats["temperature_mean"][g], 1),
+                precip_max=_or_none(stats["precip_max"][g]),
+                humidity_mean=_or_none(stats["humidity_mean"][g], 1),
+                hours=hi - lo,
+            )
+        )
+    return summaries
+
+
+AGGREGATED = ("temperature", "wind_speed", "precip", "humidity")
+
+
+def hourly_day_summaries(periods: Sequence[Dict[str, Any]] | HourlyColumns) -> List[DaySummary]:
+    """Day summaries from hourly periods (or already decoded columns), like build_day_summaries."""
+    cols = periods if isinstance(periods, HourlyColumns) else decode_hourly(periods)
+    if not len(cols):
+        return []
+    starts = _group_starts(cols.numeric("day"))
+    stats = _aggregate({name: cols.numeric(name) for name in AGGREGATED}, starts, len(cols))
+    return _day_summaries(cols, starts, stats)
+
+
+def hourly_now_and_tomorrow(cols: HourlyColumns, summaries: Sequence[DaySummary]) -> Dict[str, Any]:
+    """
+    weather.summarize_now_and_tomorrow's dict from the hourly forecast, so
+    hourly callers need not fetch the 12-hour one too: "now" is the first
+    hour, tomorrow's high/low are the second day's hourly max/min.
+    """
+    if not len(cols):
+        raise ValueError("Forecast periods list is empty.")
+    tomorrow = summaries[1] if len(summaries) > 1 else None
+    return {
+        "now_label": "Now",
+        "now_temp": _or_none(cols.temperature[0]),
+        "now_unit": cols.unit,
+        "now_short": cols.short_forecast[0],
+        "tomorrow_label": tomorrow.label if tomorrow is not None else None,
+        "tomorrow_low": tomorrow.temp_low if tomorrow is not None else None,
+        "tomorrow_high": tomorrow.temp_high if tomorrow is not None else None,
+        "unit": cols.unit,
+    }
+
+
+def summarize_many(locations: Sequence[Sequence[Dict[str, Any]] | HourlyColumns]) -> List[List[DaySummary]]:
+    """
+    hourly_day_summaries for many locations at once: the columns are
+    concatenated and grouped by (location, day) so each statistic is one
+    vectorized pass over every row.
+    """
+    decoded = [loc if isinstance(loc, HourlyColumns) else decode_hourly(loc) for loc in locations]
+    offsets = [0]
+    for cols in decoded:
+        offsets.append(offsets[-1] + len(cols))
+    total = offsets[-1]
+    if not total:
+        return [[] for _ in decoded]
+
+    # Group key: location number and local day, e.g. 3_20261017.
+    if np is not None:
+        days = np.concatenate([cols.numeric("day") for cols in decoded]).astype(np.int64)
+        owner = np.repeat(np.arange(len(decoded), dtype=np.int64), [len(cols) for cols in decoded])
+        keys = owner * 100_000_000 + days
+        columns = {name: np.concatenate([cols.numeric(name) for cols in decoded]) for name in AGGREGATED}
+    else:
+        keys = [n * 100_000_000 + d for n, cols in enumerate(decoded) for d in cols.day]
+        columns = {name: [v for cols in decoded for v in getattr(cols, name)] for name in AGGREGATED}
+
+    starts = _group_starts(keys)
+    stats = _aggregate(columns, starts, total)
+
+    results = []
+    g = 0
+    for n, cols in enumerate(decoded):
+        lo, hi = offsets[n], offsets[n + 1]
+        first = g
+        while g < len(starts) and starts[g] < hi:
+            g += 1
+        mine = {name: values[first:g] for name, values in stats.items()}
+        results.append(_day_summaries(cols, starts[first:g], mine, offset=lo) if hi > lo else [])
+    return results
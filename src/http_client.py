@@ -0,0 +1,352 @@
+"""
+http_client.py
+
+Shared HTTP transport for every NWS call.
+
+NWSClient wraps a requests.Session so connections to api.weather.gov are
+kept alive and pooled instead of paying a new TCP+TLS handshake per request.
+Requests that fail with 429/5xx or a connection error are retried with
+exponential backoff, honoring the server's Retry-After header. A read
+timeout is not retried (a server that did not answer in `timeout` seconds
+rarely answers the next time), and one call never spends more than
+`max_call_seconds` across its attempts and backoff.
+
+Every attempt is timed as an "nws_request" span labelled with its
+endpoint (points, forecast, forecast_hourly, stations, observation) and
+counted with its status, retries and response bytes in metrics.METRICS.
+
+Timeouts adapt to the latency each endpoint has shown, a call that runs
+past its endpoint's p95 is hedged with a duplicate request (first answer
+wins), and endpoints or stations that keep failing are skipped for a
+while by a circuit breaker; see resilience.py.
+
+Concurrent GETs of the same URL (with the same headers) share one request
+through a singleflight.SingleFlight: the first caller sends it, the others
+get its response or its error. Each caller gets its own Response object
+(body already read, headers copied), so closing or changing one does not
+affect the others.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .metrics import METRICS
+from .rate_limit import TokenBucket
+from .resilience import CircuitBreaker, CircuitOpenError, HedgeBudget, LatencyTracker
+from .singleflight import SingleFlight
+
+APP_USER_AGENT = "15113-HW3-Explore-API (your_email@example.com)"
+
+HEADERS_NWS = {
+    "User-Agent": APP_USER_AGENT,
+    "Accept": "application/geo+json",
+}
+
+API_BASE = os.environ.get("NWS_API_BASE", "https://api.weather.gov").rstrip("/")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Upper bound on one get(), attempts and backoff included.
+MAX_CALL_SECONDS = 30.0
+
+ENDPOINT_PATTERNS = (
+    ("points", re.compile(r"/points/[^/]+$")),
+    ("forecast", re.compile(r"/gridpoints/[^/]+/[^/]+/forecast$")),
+    ("forecast_hourly", re.compile(r"/gridpoints/[^/]+/[^/]+/forecast/hourly$")),
+    ("stations", re.compile(r"/gridpoints/[^/]+/[^/]+/stations$")),
+    ("observation", re.compile(r"/stations/[^/]+/observations/latest$")),
+)
+STATION_RE = re.compile(r"/stations/([^/]+)/observations/latest$")
+
+
+def endpoint_of(url: str) -> str:
+    """Which NWS endpoint a URL calls, for metrics labels ("other" if unknown)."""
+    path = url.split("?", 1)[0]
+    for name, pattern in ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return name
+    return "other"
+
+
+def breaker_key(url: str, endpoint: str) -> str:
+    """Circuit breaker key: the endpoint, or the station for observations."""
+    if endpoint == "observation":
+        m = STATION_RE.search(url.split("?", 1)[0])
+        if m:
+            return f"station:{m.group(1)}"
+    return endpoint
+
+
+def _discard(future: Future) -> None:
+    # The losing request of a hedged pair; nobody reads its response.
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _private_copy(response: requests.Response) -> requests.Response:
+    """A Response of its own for one caller of a shared request; the body (read already) is shared, as bytes."""
+    copy = requests.Response()
+    copy.status_code = response.status_code
+    copy.headers = CaseInsensitiveDict(response.headers)
+    copy._content = response.content
+    copy._content_consumed = True
+    copy.encoding = response.encoding
+    copy.url = response.url
+    copy.reason = response.reason
+    copy.elapsed = response.elapsed
+    copy.request = response.request
+    copy.history = list(response.history)
+    copy.cookies = response.cookies.copy()
+    return copy
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class NWSClient:
+    def __init__(
+        self,
+        base_url: str = API_BASE,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: int = 10,
+        timeout: float = 20,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30,
+        max_call_seconds: float = MAX_CALL_SECONDS,
+        rate_limiter: Optional[TokenBucket] = None,
+        adaptive_timeouts: bool = True,
+        hedge: bool = True,
+        circuit_breakers: bool = True,
+        coalesce: bool = True,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_call_seconds = max_call_seconds
+        self.rate_limiter = rate_limiter
+        self.adaptive_timeouts = adaptive_timeouts
+        self.hedge = hedge
+        self.circuit_breakers = circuit_breakers
+        self.coalesce = coalesce
+        self.flights = SingleFlight("request")
+        self.latency = LatencyTracker()
+        self.hedge_budget = HedgeBudget()
+        self.breaker = CircuitBreaker()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        self._pool_size = pool_size
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or HEADERS_NWS)
+        # One pool per host; pool_size bounds concurrent connections to a host
+        # (twice that with hedging, which may have two requests per call out).
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size * (2 if hedge else 1), max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        delay = self.backoff * (2 ** attempt)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return min(delay, self.max_backoff)
+
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        """
+        GET with retries on 429/5xx and connection errors; returns the last
+        response. Raises CircuitOpenError without calling out while the
+        endpoint's (or station's) circuit is open. Callers asking for the
+        same URL at the same time share one request; each gets its own copy
+        of the response.
+        """
+        if not self.coalesce or set(kwargs) - {"headers"}:
+            return self._get(url, timeout, **kwargs)
+        # Conditional headers (If-None-Match, ...) change the answer, so they are part of the key.
+        key = (url, tuple(sorted((kwargs.get("headers") or {}).items())))
+        # The shared response itself goes to nobody, so no caller can close or change it under another.
+        return _private_copy(self.flights.do(key, self._get, url, timeout, **kwargs))
+
+    def _get(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        endpoint = endpoint_of(url)
+        key = breaker_key(url, endpoint)
+        # Checked once per call: a half-open trial call must not be stopped by its own trial marker on retry.
+        if self.circuit_breakers and not self.breaker.allow(key):
+            METRICS.count("nws_short_circuits_total", endpoint=endpoint)
+            raise CircuitOpenError(f"{key} keeps failing; not calling it for now")
+        deadline = time.monotonic() + self.max_call_seconds
+        attempt = 0
+        while True:
+            try:
+                response = self._send(url, endpoint, timeout, kwargs, deadline)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                METRICS.count("nws_requests_total", endpoint=endpoint, status=type(e).__name__)
+                delay = self._delay(attempt, None)
+                if (
+                    isinstance(e, requests.ReadTimeout)
+                    or attempt >= self.max_retries
+                    or time.monotonic() + delay >= deadline
+                ):
+                    self.breaker.record(key, False)
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                METRICS.count("nws_retries_total", endpoint=endpoint)
+                continue
+
+            METRICS.count("nws_requests_total", endpoint=endpoint, status=response.status_code)
+            METRICS.count("nws_response_bytes_total", len(response.content), endpoint=endpoint)
+            delay = self._delay(attempt, response)
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt >= self.max_retries
+                or time.monotonic() + delay >= deadline
+            ):
+                # The breaker counts calls, not attempts: a call fails once its retries are used up.
+                self.breaker.record(key, response.status_code < 500)
+                return response
+            time.sleep(delay)
+            attempt += 1
+            METRICS.count("nws_retries_total", endpoint=endpoint)
+
+    def _send(
+        self, url: str, endpoint: str, timeout: Optional[float], kwargs: Dict[str, Any], deadline: float
+    ) -> requests.Response:
+        """One attempt, hedged with a second request if it outlasts the endpoint's p95."""
+        if timeout is None:
+            timeout = self.latency.timeout(endpoint, self.timeout) if self.adaptive_timeouts else self.timeout
+        timeout = max(min(timeout, deadline - time.monotonic()), 0.1)
+        self.hedge_budget.count_request()
+        delay = self.latency.hedge_delay(endpoint) if self.hedge else None
+        if delay is None:
+            return self._attempt(url, endpoint, timeout, kwargs)
+
+        # The hedge clock starts when the first request goes out, not when it is
+        # queued: time spent waiting for a pool worker or the rate limiter is not
+        # the endpoint being slow. A cancelled or failed submission also ends the wait.
+        started = threading.Event()
+        first = self._submit(url, endpoint, timeout, kwargs, started)
+        first.add_done_callback(lambda _: started.set())
+        started.wait()
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not self.hedge_budget.try_hedge():
+            return first.result()
+        METRICS.count("nws_hedges_total", endpoint=endpoint)
+        second = self._submit(url, endpoint, timeout, kwargs)
+
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is None:
+                error = next(iter(done)).exception()
+                continue
+            for other in (first, second):
+                if other is not winner:
+                    other.add_done_callback(_discard)
+            if winner is second:
+                METRICS.count("nws_hedge_wins_total", endpoint=endpoint)
+            return winner.result()
+        raise error
+
+    def _submit(
+        self,
+        url: str,
+        endpoint: str,
+        timeout: float,
+        kwargs: Dict[str, Any],
+        started: Optional[threading.Event] = None,
+    ) -> Future:
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=self._pool_size * 2, thread_name_prefix="nws-hedge"
+                )
+        # copy_context keeps the caller's lookup trace on the pool thread.
+        return self._hedge_pool.submit(
+            contextvars.copy_context().run, self._attempt, url, endpoint, timeout, kwargs, started
+        )
+
+    def _attempt(
+        self,
+        url: str,
+        endpoint: str,
+        timeout: float,
+        kwargs: Dict[str, Any],
+        started: Optional[threading.Event] = None,
+    ) -> requests.Response:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if started is not None:
+            started.set()
+        start = time.perf_counter()
+        # One span per attempt: network time only, not rate limiting or backoff.
+        with METRICS.span("nws_request", endpoint=endpoint):
+            response = self.session.get(url, timeout=timeout, **kwargs)
+        if response.status_code < 500:
+            self.latency.add(endpoint, time.perf_counter() - start)
+        return response
+
+    def get_json(self, url: str, timeout: Optional[float] = None) -> Any:
+        response = self.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self) -> None:
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+_default_client: Optional[NWSClient] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> NWSClient:
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = NWSClient()
+        return _default_client
+
+
+def set_default_client(client: Optional[NWSClient]) -> None:
+    global _default_client
+    with _default_lock:
+        _default_client = client
@@ -0,0 +1,246 @@
+"""
+metrics.py
+
+Process-wide counters and timings for the fetch pipeline.
+
+METRICS holds two kinds of series, each identified by a name and labels:
+counters (requests, retries, cache hits, bytes) and timers, which keep a
+count, a sum, Prometheus histogram buckets and the most recent samples for
+percentiles. snapshot() returns everything as JSON-ready dicts and
+prometheus() as Prometheus text exposition.
+
+span() times a block into a timer. When a Trace is active (see tracing()
+and traced()), the span is also added to it, which is how one lookup's
+spans are collected across the FetchEngine worker threads; the app shows
+Trace.summary() in its status bar.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Recent samples kept per timer for percentiles.
+SAMPLES = 1024
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Timer:
+    __slots__ = ("count", "total", "buckets", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples: Deque[float] = deque(maxlen=SAMPLES)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._timers: Dict[Tuple[str, Labels], _Timer] = {}
+
+    def count(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                timer = self._timers[key] = _Timer()
+            timer.add(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(labels.get("endpoint") or name, seconds)
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[None]:
+        """Time the block into timer `name` (failures included)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def percentile(self, name: str, q: float, **labels: Any) -> Optional[float]:
+        """q-th percentile (0..1) of the recent samples of one timer, or None before any sample."""
+        with self._lock:
+            timer = self._timers.get((name, _labels(labels)))
+            samples = list(timer.samples) if timer is not None else []
+        return _percentile(samples, q) if samples else None
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            timers = [
+                (name, labels, t.count, t.total, list(t.samples)) for (name, labels), t in sorted(self._timers.items())
+            ]
+        return {
+            "counters": counters,
+            "timers": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": count,
+                    "sum_seconds": total,
+                    "p50_seconds": _percentile(samples, 0.5) if samples else None,
+                    "p95_seconds": _percentile(samples, 0.95) if samples else None,
+                    "max_seconds": max(samples) if samples else None,
+                }
+                for name, labels, count, total, samples in timers
+            ],
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text format; timers become <name>_seconds histograms."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = [(key, t.count, t.total, list(t.buckets)) for key, t in sorted(self._timers.items())]
+
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_prom_labels(labels)} {_prom_number(value)}")
+        for (name, labels), count, total, buckets in timers:
+            metric = f"{name}_seconds"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f"{metric}_bucket{_prom_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_prom_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {_prom_number(total)}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+
+def _prom_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _prom_number(value: float) -> str:
+    if isinstance(value, float) and not math.isfinite(value):
+        return "+Inf" if value > 0 else "NaN"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Trace:
+    """Spans of one lookup: (name, seconds) in completion order, from any thread."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans.append((name, seconds))
+
+    def breakdown(self) -> Dict[str, Tuple[int, float]]:
+        """name -> (span count, total seconds), in order of first appearance."""
+        out: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for name, seconds in self.spans:
+                n, total = out.get(name, (0, 0.0))
+                out[name] = (n + 1, total + seconds)
+        return out
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        """e.g. "points 120 ms, forecast 340 ms, observation x3 410 ms, total 760 ms"."""
+        parts = [f"{name}{f' x{n}' if n > 1 else ''} {_ms(total)}" for name, (n, total) in self.breakdown().items()]
+        parts.append(f"total {_ms(self.elapsed())}")
+        return ", ".join(parts)
+
+
+def _ms(seconds: float) -> str:
+    ms = seconds * 1000
+    return f"{ms:.0f} ms" if ms >= 10 else f"{ms:.1f} ms"
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("nws_trace", default=None)
+
+
+@contextmanager
+def tracing(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """Make `trace` the active trace of this thread for the block."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def traced(trace: Optional[Trace], fn: Callable[..., Any], *args: Any) -> Any:
+    """fn(*args) with `trace` active; for handing a lookup's trace to a pool thread."""
+    with tracing(trace):
+        return fn(*args)
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator: every call is a span called `name`."""
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with METRICS.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+METRICS = Metrics()
@@ -0,0 +1,450 @@
+"""
+nws_cache.py
+
+Caches for NWS API responses.
+
+PointsCache keeps the /points/{lat},{lon} metadata (forecast URL,
+observationStations URL, grid cell) for each location. A point's metadata
+effectively never changes, so it is kept in an in-memory LRU and mirrored
+to a JSON file on disk, both bounded in size and expired after a TTL.
+The file is rewritten behind the cache (at most once a second), so a burst
+of lookups costs one write instead of one per point.
+
+ResponseCache is an HTTP cache for forecast responses that follows the
+Cache-Control / Expires / ETag / Last-Modified headers NWS sends.
+
+Hits, misses and bytes of both caches are also counted in metrics.METRICS
+("nws_cache_total" by cache and result).
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import requests
+
+from .metrics import METRICS
+
+CACHE_DIR = Path(os.environ.get("NWS_CACHE_DIR") or Path(__file__).with_name(".cache"))
+
+POINTS_CACHE_PATH = CACHE_DIR / "points.json"
+POINTS_TTL_SECONDS = 30 * 24 * 3600
+POINTS_MEMORY_ENTRIES = 256
+POINTS_DISK_ENTRIES = 50_000
+# Disk mirrors are rewritten at most this often; updates in between coalesce.
+FLUSH_DELAY_SECONDS = 1.0
+
+# Only the parts of the /points response the app uses are kept.
+POINTS_FIELDS = (
+    "forecast",
+    "forecastHourly",
+    "forecastGridData",
+    "observationStations",
+    "gridId",
+    "gridX",
+    "gridY",
+    "timeZone",
+)
+
+
+def point_key(lat: float, lon: float) -> str:
+    """Normalize coordinates the way NWS does (4 decimal places)."""
+    return f"{round(lat, 4):.4f},{round(lon, 4):.4f}"
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def read_json(path: Path) -> Any:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class DeferredWrite:
+    """
+    Write-behind for a JSON file mirroring in-memory state. schedule() marks
+    the state dirty; one write happens `delay` seconds later (and at exit),
+    however many updates arrived in between. `snapshot` is called under
+    `lock`, the lock that guards the state.
+    """
+
+    def __init__(
+        self, path: Path, snapshot: Callable[[], Any], lock: threading.Lock, delay: float = FLUSH_DELAY_SECONDS
+    ):
+        self.path = path
+        self.snapshot = snapshot
+        self.lock = lock
+        self.delay = delay
+        self._timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def schedule(self) -> None:
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def cancel(self) -> None:
+        with self._timer_lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def flush(self) -> None:
+        with self._timer_lock:
+            timer, self._timer = self._timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        with self.lock:
+            write_json_atomic(self.path, self.snapshot())
+
+
+class PointsCache:
+    def __init__(
+        self,
+        path: Optional[Path] = POINTS_CACHE_PATH,
+        ttl: float = POINTS_TTL_SECONDS,
+        max_memory: int = POINTS_MEMORY_ENTRIES,
+        max_disk: int = POINTS_DISK_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._disk: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._writer = DeferredWrite(path, self._disk_snapshot, self._lock) if path is not None else None
+
+    def _load_disk(self) -> Dict[str, Dict[str, Any]]:
+        if self._disk is None:
+            data = read_json(self.path) if self.path is not None else None
+            self._disk = data if isinstance(data, dict) else {}
+        return self._disk
+
+    def _fresh(self, entry: Dict[str, Any], base: Optional[str]) -> bool:
+        # Entries from a different API base (e.g. a local stand-in) hold URLs
+        # that are useless here.
+        if entry.get("base") != base:
+            return False
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def get(self, lat: float, lon: float, base: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        properties = self._get(point_key(lat, lon), base)
+        METRICS.count("nws_cache_total", cache="points", result="misses" if properties is None else "hits")
+        return properties
+
+    def _get(self, key: str, base: Optional[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry, base):
+                    self._memory.move_to_end(key)
+                    return entry["properties"]
+                del self._memory[key]
+
+            entry = self._load_disk().get(key)
+            if entry is None or not self._fresh(entry, base):
+                return None
+            self._remember(key, entry)
+            return entry["properties"]
+
+    def put(
+        self, lat: float, lon: float, properties: Dict[str, Any], base: Optional[str] = None
+    ) -> Dict[str, Any]:
+        key = point_key(lat, lon)
+        kept = {name: properties[name] for name in POINTS_FIELDS if name in properties}
+        entry = {"fetched_at": time.time(), "base": base, "properties": kept}
+        with self._lock:
+            self._remember(key, entry)
+            if self._writer is not None:
+                self._load_disk()[key] = entry
+                self._writer.schedule()
+        return kept
+
+    def flush(self) -> None:
+        """Write pending entries to disk now instead of after FLUSH_DELAY_SECONDS."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def _disk_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        disk = self._load_disk()
+        self._evict_disk(disk)
+        return disk
+
+    def _evict_disk(self, disk: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+        for key in [k for k, e in disk.items() if now - e.get("fetched_at", 0) >= self.ttl]:
+            del disk[key]
+        overflow = len(disk) - self.max_disk
+        if overflow > 0:
+            oldest = sorted(disk, key=lambda k: disk[k].get("fetched_at", 0))[:overflow]
+            for key in oldest:
+                del disk[key]
+
+    def clear(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+        with self._lock:
+            self._memory.clear()
+            self._disk = {}
+            if self.path is not None and self.path.exists():
+                self.path.unlink()
+
+
+POINTS_CACHE = PointsCache()
+
+
+FORECAST_MEMORY_ENTRIES = 512
+# How long an expired response may still be served while a refresh runs,
+# and how long it may stand in for NWS when the refresh fails. These are
+# local policy, used when the response has no stale-while-revalidate /
+# stale-if-error directive of its own; a no-cache response gets no
+# stale-while-revalidate window unless the server sends one.
+STALE_WHILE_REVALIDATE_SECONDS = 600
+STALE_IF_ERROR_SECONDS = 6 * 3600
+
+
+def _count_metric(name: str, amount: int = 1) -> None:
+    if name.startswith("bytes_"):
+        METRICS.count(f"nws_cache_{name}_total", amount, cache="forecast")
+    else:
+        METRICS.count("nws_cache_total", amount, cache="forecast", result=name)
+
+
+def _parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def _as_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> Tuple[float, bool, Optional[float]]:
+    """
+    (seconds the response stays fresh, whether it may be stored,
+    stale-while-revalidate window). The window is None when the response
+    leaves it to the cache, and 0 for no-cache without the directive.
+    """
+    cc = _parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in cc:
+        return 0.0, False, None
+    swr = _as_seconds(cc.get("stale-while-revalidate"))
+    if "no-cache" in cc:
+        # Must be revalidated before every use; never served stale on our own say-so.
+        return 0.0, True, swr if swr is not None else 0.0
+
+    max_age = _as_seconds(cc.get("s-maxage"))
+    if max_age is None:
+        max_age = _as_seconds(cc.get("max-age"))
+    if max_age is None:
+        expires = _http_date(headers.get("Expires"))
+        if expires is not None:
+            date = _http_date(headers.get("Date")) or time.time()
+            max_age = expires - date
+    age = _as_seconds(headers.get("Age")) or 0.0
+    return max((max_age or 0.0) - age, 0.0), True, swr
+
+
+class ResponseCache:
+    """
+    HTTP cache for NWS JSON responses, keyed by URL.
+
+    Fresh entries (Cache-Control max-age / Expires) are served without a
+    request. Expired entries are revalidated with If-None-Match /
+    If-Modified-Since; while that runs, and when NWS fails, the stale body is
+    served. Without a stale-while-revalidate directive the window is
+    `stale_while_revalidate`, a local default; no-cache responses are always
+    revalidated first. Counters in stats() show how much traffic the cache saved.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = FORECAST_MEMORY_ENTRIES,
+        stale_while_revalidate: float = STALE_WHILE_REVALIDATE_SECONDS,
+        stale_if_error: float = STALE_IF_ERROR_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "refreshed": 0,
+            "stale": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+        }
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+        _count_metric(name, amount)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def _store(self, url: str, response: Any, body: Any) -> Dict[str, Any]:
+        lifetime, storable, swr = freshness_lifetime(response.headers)
+        entry = {
+            "body": body,
+            "size": len(response.content),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "expires_at": time.time() + lifetime,
+            "swr": self.stale_while_revalidate if swr is None else swr,
+        }
+        if storable:
+            with self._lock:
+                self._entries[url] = entry
+                self._entries.move_to_end(url)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _revalidate(
+        self, client: Any, url: str, entry: Optional[Dict[str, Any]], decode: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = client.get(url, headers=headers)
+        except requests.RequestException:
+            if self._usable_on_error(entry):
+                self._count("stale")
+                return entry["body"]
+            raise
+
+        if response.status_code == 304 and entry is not None:
+            lifetime, _, swr = freshness_lifetime(response.headers)
+            with self._lock:
+                entry["expires_at"] = time.time() + lifetime
+                if swr is not None:
+                    entry["swr"] = swr
+            self._count("revalidated")
+            self._count("bytes_saved", entry["size"])
+            return entry["body"]
+
+        if response.status_code >= 500 or response.status_code == 429:
+            if self._usable_on_error(entry):
+                self._count("stale")
+                return entry["body"]
+
+        response.raise_for_status()
+        body = response.json()
+        if decode is not None:
+            body = decode(body)
+        self._count("bytes_downloaded", len(response.content))
+        self._count("refreshed" if entry is not None else "misses")
+        self._store(url, response, body)
+        return body
+
+    def _usable_on_error(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and time.time() - entry["expires_at"] < self.stale_if_error
+
+    def _background_revalidate(
+        self, client: Any, url: str, entry: Dict[str, Any], decode: Optional[Callable[[Any], Any]]
+    ) -> None:
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def run() -> None:
+            try:
+                self._revalidate(client, url, entry, decode)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        threading.Thread(target=run, name="nws-revalidate", daemon=True).start()
+
+    def get_json(self, client: Any, url: str, decode: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        GET url through `client`, answering from the cache where HTTP caching
+        rules allow. `decode` turns a fresh JSON body into what is cached and
+        returned (e.g. forecast_model.decode_forecast), so the raw payload is
+        dropped right away; use the same decode for every call on one URL.
+        """
+        entry = self._lookup(url)
+        if entry is not None:
+            now = time.time()
+            if now < entry["expires_at"]:
+                self._count("hits")
+                self._count("bytes_saved", entry["size"])
+                return entry["body"]
+            if now < entry["expires_at"] + entry["swr"]:
+                self._count("stale")
+                self._background_revalidate(client, url, entry, decode)
+                return entry["body"]
+        return self._revalidate(client, url, entry, decode)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+FORECAST_CACHE = ResponseCache()
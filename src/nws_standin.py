@@ -0,0 +1,449 @@
+"""
+nws_standin.py
+
+A small local stand-in for api.weather.gov, used by benchmarks.
+
+It serves synthetic responses for the endpoints the app calls:
+  /points/{lat},{lon}
+  /gridpoints/{office}/{x},{y}/forecast
+  /gridpoints/{office}/{x},{y}/forecast/hourly
+  /gridpoints/{office}/{x},{y}/stations
+  /stations/{id}/observations/latest
+
+Responses recorded from the live API (--record) can be replayed with
+--fixtures; recorded paths are served verbatim, with api.weather.gov URLs
+rewritten to the stand-in, and everything else falls back to synthetic
+data. Latency, a rate of injected 503 errors, a rate of observations
+with null humidity, a rate of slow responses (a latency tail) and a share
+of stations that are down (always 503) are configurable, and StandinState
+counts requests, connections, injected errors and response bytes.
+
+Run it with "python -m src.nws_standin --port 8765" and point the app at it
+with NWS_API_BASE=http://127.0.0.1:8765.
+  python -m src.nws_standin --latency 0.05 --error-rate 0.02 --null-humidity 0.3
+  python -m src.nws_standin --slow-rate 0.05 --slow-latency 2 --down-stations 0.2
+  python -m src.nws_standin --record fixtures.json 40.4406,-79.9959 30.2672,-97.7431
+  python -m src.nws_standin --fixtures fixtures.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+OFFICE = "TST"
+STATIONS_PER_POINT = 10
+FORECAST_MAX_AGE = 60
+HOURLY_PERIODS = 156
+LIVE_API_BASE = "https://api.weather.gov"
+RECORD_STATIONS = 3
+
+POINTS_RE = re.compile(r"^/points/(-?[\d.]+),(-?[\d.]+)$")
+GRID_RE = re.compile(r"^/gridpoints/(\w+)/(\d+),(\d+)/(forecast|forecast/hourly|stations)$")
+LATEST_RE = re.compile(r"^/stations/(\w+)/observations/latest$")
+
+
+def _grid_cell(lat: float, lon: float) -> Tuple[int, int]:
+    # Roughly 2.5 km cells, like the real NWS grid.
+    return int((lon + 180) * 40), int((lat + 90) * 40)
+
+
+def _forecast_periods(x: int, y: int) -> List[Dict[str, Any]]:
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0, hour=6)
+    periods = []
+    for i in range(14):
+        is_day = i % 2 == 0
+        begin = start + timedelta(hours=12 * i)
+        periods.append(
+            {
+                "number": i + 1,
+                "name": begin.strftime("%A") + ("" if is_day else " Night"),
+                "startTime": begin.isoformat(),
+                "endTime": (begin + timedelta(hours=12)).isoformat(),
+                "isDaytime": is_day,
+                "temperature": 50 + (x + y + i) % 20 + (10 if is_day else 0),
+                "temperatureUnit": "F",
+                "windSpeed": f"{5 + i % 10} mph",
+                "windDirection": "NW",
+                "shortForecast": "Partly Cloudy" if is_day else "Mostly Clear",
+                "detailedForecast": "Synthetic forecast from the local NWS stand-in.",
+            }
+        )
+    return periods
+
+
+def _observation(humidity: Optional[float]) -> Dict[str, Any]:
+    return {"properties": {"relativeHumidity": {"unitCode": "wmoUnit:percent", "value": humidity}}}
+
+
+def _hourly_periods(x: int, y: int, hours: int = HOURLY_PERIODS) -> List[Dict[str, Any]]:
+    # Local time at a fixed UTC-5 offset, starting at the current hour.
+    local = timezone(timedelta(hours=-5))
+    start = datetime.now(local).replace(minute=0, second=0, microsecond=0)
+    periods = []
+    for i in range(hours):
+        begin = start + timedelta(hours=i)
+        # Coolest around 05:00, warmest around 17:00.
+        swing = math.cos((begin.hour - 17) * math.pi / 12)
+        is_day = 6 <= begin.hour < 18
+        periods.append(
+            {
+                "number": i + 1,
+                "name": "",
+                "startTime": begin.isoformat(),
+                "endTime": (begin + timedelta(hours=1)).isoformat(),
+                "isDaytime": is_day,
+                "temperature": round(58 + (x + y) % 15 + 9 * swing),
+                "temperatureUnit": "F",
+                "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": (x + y + i * 7) % 60},
+                "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": round(65 - 20 * swing)},
+                "windSpeed": f"{4 + (i + x) % 12} mph",
+                "windDirection": ("N", "NE", "E", "SE", "S", "SW", "W", "NW")[(i // 6 + y) % 8],
+                "shortForecast": "Sunny" if is_day else "Clear",
+            }
+        )
+    return periods
+
+
+class StandinState:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        null_humidity_rate: float = 0.0,
+        fixtures: Optional["Fixtures"] = None,
+        seed: Optional[int] = None,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        down_stations: float = 0.0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.null_humidity_rate = null_humidity_rate
+        self.fixtures = fixtures
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.down_stations = down_stations
+        self.lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self.errors = 0
+        self.bytes_sent = 0
+
+    def chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self._rng.random() < rate
+
+    def station_down(self, station_id: str) -> bool:
+        """The same stations are down on every request (a stable share of ids)."""
+        if self.down_stations <= 0:
+            return False
+        return hashlib.md5(station_id.encode("ascii")).digest()[0] < self.down_stations * 256
+
+    def count_request(self) -> None:
+        with self.lock:
+            self.requests += 1
+
+    def count_connection(self) -> None:
+        with self.lock:
+            self.connections += 1
+
+    def count_error(self) -> None:
+        with self.lock:
+            self.errors += 1
+
+    def count_bytes(self, n: int) -> None:
+        with self.lock:
+            self.bytes_sent += n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "errors": self.errors,
+                "bytes_sent": self.bytes_sent,
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = 0
+            self.connections = 0
+            self.errors = 0
+            self.bytes_sent = 0
+
+
+class Fixtures:
+    """
+    Recorded responses keyed by URL path. The file is JSON:
+      {"base": "https://api.weather.gov", "responses": {"/points/40.4406,-79.9959": {...}, ...}}
+    """
+
+    def __init__(self, responses: Dict[str, Any], base: str = LIVE_API_BASE):
+        self.base = base.rstrip("/")
+        # Serialized once; only the base URL is swapped per server.
+        self._text = {path: json.dumps(body) for path, body in responses.items()}
+
+    @classmethod
+    def load(cls, path: Path) -> "Fixtures":
+        with Path(path).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("responses", {}), data.get("base", LIVE_API_BASE))
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def paths(self) -> List[str]:
+        return list(self._text)
+
+    def payload(self, path: str, base: str) -> Optional[bytes]:
+        text = self._text.get(path)
+        if text is None:
+            return None
+        return text.replace(self.base, base).encode("utf-8")
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in one segment; otherwise Nagle's algorithm
+    # stalls every keep-alive response on the client's delayed ACK.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    server: "StandinServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.state.count_connection()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _send_json(self, status: int, body: Any, cacheable: bool = False, payload: Optional[bytes] = None) -> None:
+        if payload is None:
+            payload = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/geo+json"}
+        if cacheable:
+            etag = '"' + hashlib.sha1(payload).hexdigest()[:16] + '"'
+            headers["ETag"] = etag
+            headers["Cache-Control"] = f"public, max-age={FORECAST_MAX_AGE}"
+            if self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.state.count_bytes(len(payload))
+
+    def do_GET(self) -> None:
+        state = self.server.state
+        state.count_request()
+        if state.latency:
+            time.sleep(state.latency)
+        if state.chance(state.slow_rate):
+            time.sleep(state.slow_latency)
+
+        path = self.path.split("?", 1)[0]
+        latest = LATEST_RE.match(path)
+        if state.chance(state.error_rate) or (latest and state.station_down(latest.group(1))):
+            state.count_error()
+            self._send_json(503, {"title": "Service Unavailable", "status": 503})
+            return
+
+        if latest and state.chance(state.null_humidity_rate):
+            # A station that is up but not reporting humidity, recorded or not.
+            self._send_json(200, _observation(None))
+            return
+
+        cacheable = "/forecast" in path
+        if state.fixtures is not None:
+            payload = state.fixtures.payload(path, self._base())
+            if payload is not None:
+                self._send_json(200, None, cacheable=cacheable, payload=payload)
+                return
+        status, body = self.route(path)
+        self._send_json(status, body, cacheable=status == 200 and cacheable)
+
+    def route(self, path: str) -> Tuple[int, Any]:
+        base = self._base()
+
+        m = POINTS_RE.match(path)
+        if m:
+            lat, lon = float(m.group(1)), float(m.group(2))
+            x, y = _grid_cell(lat, lon)
+            grid = f"{base}/gridpoints/{OFFICE}/{x},{y}"
+            return 200, {
+                "properties": {
+                    "forecast": f"{grid}/forecast",
+                    "forecastHourly": f"{grid}/forecast/hourly",
+                    "forecastGridData": grid,
+                    "observationStations": f"{grid}/stations",
+                    "gridId": OFFICE,
+                    "gridX": x,
+                    "gridY": y,
+                    "timeZone": "America/New_York",
+                }
+            }
+
+        m = GRID_RE.match(path)
+        if m:
+            x, y = int(m.group(2)), int(m.group(3))
+            if m.group(4) == "forecast":
+                return 200, {"properties": {"periods": _forecast_periods(x, y)}}
+            if m.group(4) == "forecast/hourly":
+                return 200, {"properties": {"periods": _hourly_periods(x, y)}}
+            features = []
+            for i in range(STATIONS_PER_POINT):
+                station_id = f"K{x % 100:02d}{y % 100:02d}{i}"
+                features.append(
+                    {
+                        "id": f"{base}/stations/{station_id}",
+                        "properties": {"stationIdentifier": station_id},
+                    }
+                )
+            return 200, {"features": features}
+
+        m = LATEST_RE.match(path)
+        if m:
+            return 200, _observation(float(40 + sum(map(ord, m.group(1))) % 50))
+
+        return 404, {"title": "Not Found", "status": 404}
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], state: Optional[StandinState] = None):
+        super().__init__(address, StandinHandler)
+        self.state = state or StandinState()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_standin(
+    port: int = 0,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    null_humidity_rate: float = 0.0,
+    fixtures: Optional[Fixtures] = None,
+    seed: Optional[int] = None,
+    slow_rate: float = 0.0,
+    slow_latency: float = 0.0,
+    down_stations: float = 0.0,
+) -> StandinServer:
+    """Start a stand-in server on a background thread (port 0 = any free port)."""
+    state = StandinState(
+        latency, error_rate, null_humidity_rate, fixtures, seed, slow_rate, slow_latency, down_stations
+    )
+    server = StandinServer(("127.0.0.1", port), state)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def record_fixtures(
+    locations: Sequence[Tuple[float, float]], out_path: Path, base: str = LIVE_API_BASE, stations: int = RECORD_STATIONS
+) -> int:
+    """Fetch every endpoint the app uses for `locations` from the live API and save them as fixtures."""
+    from .http_client import NWSClient
+    from .nws_cache import point_key
+
+    client = NWSClient(base_url=base)
+    responses: Dict[str, Any] = {}
+
+    def fetch(url: str) -> Any:
+        body = client.get_json(url)
+        responses[urlsplit(url).path] = body
+        return body
+
+    try:
+        for lat, lon in locations:
+            props = fetch(client.url(f"/points/{point_key(lat, lon)}")).get("properties", {})
+            for name in ("forecast", "forecastHourly"):
+                if props.get(name):
+                    fetch(props[name])
+            if props.get("observationStations"):
+                features = fetch(props["observationStations"]).get("features", [])
+                for feature in features[:stations]:
+                    station_id = feature.get("properties", {}).get("stationIdentifier")
+                    if station_id:
+                        fetch(client.url(f"/stations/{station_id}/observations/latest"))
+    finally:
+        client.close()
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump({"base": base, "responses": responses}, f)
+    return len(responses)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for api.weather.gov")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--null-humidity", type=float, default=0.0, help="fraction of observations with null RH")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of responses delayed further")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="seconds added to slow responses")
+    parser.add_argument("--down-stations", type=float, default=0.0, help="fraction of stations that always 503")
+    parser.add_argument("--seed", type=int, help="seed for injected errors and null humidity")
+    parser.add_argument("--fixtures", help="replay responses recorded with --record")
+    parser.add_argument("--record", metavar="OUT", help="record live responses for the given locations and exit")
+    parser.add_argument("locations", nargs="*", help='"lat,lon" pairs for --record')
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.locations:
+            parser.error("--record needs at least one lat,lon")
+        locations = [tuple(float(v) for v in loc.split(",")) for loc in args.locations]
+        count = record_fixtures(locations, Path(args.record))
+        print(f"Recorded {count} responses to {args.record}")
+        return
+
+    fixtures = Fixtures.load(Path(args.fixtures)) if args.fixtures else None
+    state = StandinState(
+        args.latency,
+        args.error_rate,
+        args.null_humidity,
+        fixtures,
+        args.seed,
+        args.slow_rate,
+        args.slow_latency,
+        args.down_stations,
+    )
+    server = StandinServer(("127.0.0.1", args.port), state)
+    print(f"Serving NWS stand-in on {server.base_url}" + (f" ({len(fixtures)} recorded responses)" if fixtures else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
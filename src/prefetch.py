@@ -0,0 +1,222 @@
+"""
+prefetch.py
+
+Background refresh of recently used and pinned cities.
+
+PrefetchScheduler remembers the last few cities looked up plus any the
+user pinned, and keeps a finished lookup (forecast periods and humidity)
+for each of them. A worker thread refreshes every tracked city before its
+result ages out, so WeatherApp.on_fetch can usually render from memory
+without touching the network. Refresh times are jittered so tracked
+cities do not all come due together, and at most `max_concurrent`
+refreshes run at once to leave the engine free for foreground lookups.
+The tracked-city list (not the forecasts) is kept in a JSON file under the
+cache directory, so pinned cities are warm again soon after the first
+lookup of a new session starts the scheduler. The file is written behind
+(nws_cache.DeferredWrite), never on the Tk thread that calls touch/pin.
+Every stored lookup, foreground or background, is also recorded in the
+HistoryStore when one is given.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .fetch_engine import FetchEngine
+from .forecast_model import ForecastPeriod
+from .history import HistoryStore
+from .nws_cache import CACHE_DIR, DeferredWrite, read_json
+
+PREFETCH_PATH = CACHE_DIR / "prefetch.json"
+REFRESH_INTERVAL_SECONDS = 15 * 60
+MAX_AGE_SECONDS = 45 * 60
+RETRY_SECONDS = 2 * 60
+JITTER = 0.2
+MAX_RECENT = 8
+MAX_CONCURRENT = 2
+TICK_SECONDS = 1.0
+
+
+class PrefetchScheduler:
+    def __init__(
+        self,
+        engine: FetchEngine,
+        path: Optional[Path] = PREFETCH_PATH,
+        refresh_interval: float = REFRESH_INTERVAL_SECONDS,
+        max_age: float = MAX_AGE_SECONDS,
+        retry_interval: float = RETRY_SECONDS,
+        jitter: float = JITTER,
+        max_recent: int = MAX_RECENT,
+        max_concurrent: int = MAX_CONCURRENT,
+        tick: float = TICK_SECONDS,
+        history: Optional[HistoryStore] = None,
+    ):
+        self.engine = engine
+        self.history = history
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.jitter = jitter
+        self.max_recent = max_recent
+        self.max_concurrent = max_concurrent
+        self.tick = tick
+
+        # city -> {"lat", "lon", "pinned", "used_at"}; persisted.
+        self._tracked: Dict[str, Dict[str, Any]] = {}
+        # city -> {"periods", "humidity", "fetched_at"}; memory only.
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._due: Dict[str, float] = {}
+        self._in_flight: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="nws-prefetch")
+        self._thread: Optional[threading.Thread] = None
+        self._writer = DeferredWrite(path, lambda: self._tracked, self._lock) if path is not None else None
+        self._load()
+
+    def _load(self) -> None:
+        data = read_json(self.path) if self.path is not None else None
+        if not isinstance(data, dict):
+            return
+        for city, info in data.items():
+            try:
+                self._tracked[city] = {
+                    "lat": float(info["lat"]),
+                    "lon": float(info["lon"]),
+                    "pinned": bool(info.get("pinned")),
+                    "used_at": float(info.get("used_at", 0)),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+            # Everything loaded from disk is due now.
+            self._due[city] = 0.0
+
+    def _save(self) -> None:
+        if self._writer is not None:
+            self._writer.schedule()
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def _next_due(self, interval: float) -> float:
+        # Jitter only ever brings a refresh forward, never past max_age.
+        return time.time() + interval * (1 - random.uniform(0, self.jitter))
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="nws-prefetch-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def get(self, city: str) -> Optional[Dict[str, Any]]:
+        """The prefetched lookup for `city` if it is younger than max_age, else None."""
+        with self._lock:
+            result = self._results.get(city)
+        if result is None or time.time() - result["fetched_at"] > self.max_age:
+            return None
+        return result
+
+    def touch(self, city: str, lat: float, lon: float) -> None:
+        """Record a foreground lookup; the city joins the recent set."""
+        with self._lock:
+            info = self._tracked.get(city)
+            if info is None:
+                info = self._tracked[city] = {"lat": lat, "lon": lon, "pinned": False, "used_at": 0.0}
+                self._due.setdefault(city, self._next_due(self.refresh_interval))
+            info["used_at"] = time.time()
+            self._evict()
+            self._save()
+
+    def store(self, city: str, periods: List[ForecastPeriod], humidity: float | None) -> None:
+        """Keep a finished lookup for a tracked city (foreground or background)."""
+        with self._lock:
+            info = self._tracked.get(city)
+            if info is None:
+                return
+            self._results[city] = {"periods": periods, "humidity": humidity, "fetched_at": time.time()}
+            self._due[city] = self._next_due(self.refresh_interval)
+        if self.history is not None:
+            self.history.record(city, info["lat"], info["lon"], periods, humidity)
+
+    def pin(self, city: str, lat: float, lon: float) -> None:
+        with self._lock:
+            info = self._tracked.setdefault(city, {"lat": lat, "lon": lon, "pinned": False, "used_at": time.time()})
+            info["pinned"] = True
+            self._due.setdefault(city, 0.0)
+            self._save()
+        self._wake.set()
+
+    def unpin(self, city: str) -> None:
+        with self._lock:
+            info = self._tracked.get(city)
+            if info is None:
+                return
+            info["pinned"] = False
+            self._evict()
+            self._save()
+
+    def is_pinned(self, city: str) -> bool:
+        with self._lock:
+            info = self._tracked.get(city)
+            return bool(info and info["pinned"])
+
+    def tracked(self) -> List[str]:
+        with self._lock:
+            return sorted(self._tracked)
+
+    def _evict(self) -> None:
+        recent = sorted(
+            (info["used_at"], city) for city, info in self._tracked.items() if not info["pinned"]
+        )
+        for _, city in recent[: max(len(recent) - self.max_recent, 0)]:
+            del self._tracked[city]
+            self._results.pop(city, None)
+            self._due.pop(city, None)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._dispatch_due()
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+    def _dispatch_due(self) -> None:
+        now = time.time()
+        with self._lock:
+            slots = self.max_concurrent - len(self._in_flight)
+            due = sorted(
+                (when, city)
+                for city, when in self._due.items()
+                if when <= now and city not in self._in_flight and city in self._tracked
+            )
+            batch = [(city, self._tracked[city]["lat"], self._tracked[city]["lon"]) for _, city in due[: max(slots, 0)]]
+            self._in_flight.update(city for city, _, _ in batch)
+        for city, lat, lon in batch:
+            try:
+                self._pool.submit(self._refresh, city, lat, lon)
+            except RuntimeError:
+                # Pool shut down while dispatching.
+                return
+
+    def _refresh(self, city: str, lat: float, lon: float) -> None:
+        try:
+            periods, humidity = self.engine.fetch(lat, lon)
+        except Exception:
+            periods, humidity = None, None
+        with self._lock:
+            self._in_flight.discard(city)
+            if not periods and city in self._tracked:
+                self._due[city] = self._next_due(self.retry_interval)
+        if periods:
+            self.store(city, periods, humidity)
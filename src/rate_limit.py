@@ -0,0 +1,46 @@
+"""
+rate_limit.py
+
+Token-bucket rate limiter shared by every request an NWSClient sends.
+
+NWS does not publish an exact limit; it asks for "a reasonable amount" of
+traffic and answers bursts with 429s. The defaults below (5 requests per
+second, bursts of 10) stay well clear of that for bulk jobs.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+NWS_RATE_PER_SECOND = 5.0
+NWS_BURST = 10
+
+
+class TokenBucket:
+    def __init__(self, rate: float = NWS_RATE_PER_SECOND, burst: int = NWS_BURST):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,159 @@
+"""
+resilience.py
+
+Keeps NWS tail latency bounded when the API or single stations degrade.
+
+LatencyTracker remembers recent successful response times per endpoint
+and derives two numbers from them: a timeout (a multiple of p99, between
+a floor and the client's fixed timeout) and a hedge delay (p95). Until
+an endpoint has enough samples the fixed timeout applies and nothing is
+hedged.
+
+HedgeBudget caps duplicate requests to a fraction of all requests, so a
+slow API is not hit with twice the traffic.
+
+CircuitBreaker counts consecutive failed calls (connection errors,
+timeouts, 5xx once retries are used up) per key: per endpoint, and per
+station for observations. After `threshold` failures the circuit opens
+and calls fail at once with CircuitOpenError for `cooldown` seconds; then
+one trial call is let through, which closes the circuit again or re-opens
+it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import requests
+
+MIN_SAMPLES = 20
+LATENCY_SAMPLES = 200
+# Quantiles are recomputed after this many new samples, not on every request.
+RECOMPUTE_EVERY = 16
+TIMEOUT_MULTIPLIER = 4.0
+MIN_TIMEOUT_SECONDS = 2.0
+HEDGE_QUANTILE = 0.95
+HEDGE_RATIO = 0.1
+HEDGE_BURST = 10
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30.0
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling an endpoint or station whose circuit is open."""
+
+
+class LatencyTracker:
+    def __init__(
+        self,
+        min_samples: int = MIN_SAMPLES,
+        multiplier: float = TIMEOUT_MULTIPLIER,
+        min_timeout: float = MIN_TIMEOUT_SECONDS,
+        hedge_quantile: float = HEDGE_QUANTILE,
+    ):
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.hedge_quantile = hedge_quantile
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._pending: Dict[str, int] = {}
+        # endpoint -> (hedge quantile, p99)
+        self._quantiles: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=LATENCY_SAMPLES)
+            samples.append(seconds)
+            pending = self._pending.get(endpoint, 0) + 1
+            if len(samples) >= self.min_samples and (pending >= RECOMPUTE_EVERY or endpoint not in self._quantiles):
+                ordered = sorted(samples)
+                last = len(ordered) - 1
+                self._quantiles[endpoint] = (
+                    ordered[min(int(self.hedge_quantile * len(ordered)), last)],
+                    ordered[min(int(0.99 * len(ordered)), last)],
+                )
+                pending = 0
+            self._pending[endpoint] = pending
+
+    def timeout(self, endpoint: str, default: float) -> float:
+        """Timeout for the next call: multiplier x p99, within [min_timeout, default]."""
+        quantiles = self._quantiles.get(endpoint)
+        if quantiles is None:
+            return default
+        return min(max(quantiles[1] * self.multiplier, self.min_timeout), default)
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """How long to wait before sending a duplicate request, or None to not hedge yet."""
+        quantiles = self._quantiles.get(endpoint)
+        return quantiles[0] if quantiles is not None else None
+
+
+class HedgeBudget:
+    def __init__(self, ratio: float = HEDGE_RATIO, burst: int = HEDGE_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.ratio * self.requests + self.burst:
+                return False
+            self.hedges += 1
+            return True
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        # key -> {"failures", "opened_at", "trial" (start of the half-open trial call, 0 if none)}
+        self._state: Dict[str, Dict[str, float]] = {}
+
+    def allow(self, key: str) -> bool:
+        """True if a call may go out; in the half-open state only one trial call is allowed."""
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or state["failures"] < self.threshold:
+                return True
+            now = time.monotonic()
+            if now - state["opened_at"] < self.cooldown:
+                return False
+            # A trial that never reported back (it raised something else) expires.
+            if state["trial"] and now - state["trial"] < self.cooldown:
+                return False
+            state["trial"] = now
+            return True
+
+    def record(self, key: str, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._state.pop(key, None)
+                return
+            state = self._state.setdefault(key, {"failures": 0, "opened_at": 0.0, "trial": 0})
+            state["failures"] += 1
+            state["trial"] = 0
+            if state["failures"] >= self.threshold:
+                # Opening, or a failed trial: wait a full cooldown again.
+                state["opened_at"] = time.monotonic()
+
+    def open_keys(self) -> List[str]:
+        with self._lock:
+            now = time.monotonic()
+            return sorted(
+                key
+                for key, state in self._state.items()
+                if state["failures"] >= self.threshold and now - state["opened_at"] < self.cooldown
+            )
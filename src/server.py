@@ -0,0 +1,313 @@
+"""
+server.py
+
+Headless JSON service for city search, current conditions and day forecasts.
+
+One asyncio event loop accepts every client connection (HTTP/1.1 with
+keep-alive); NWS work runs on the shared FetchEngine and a small thread
+pool, so a slow upstream request never blocks other clients. Search
+ranking and day aggregation run on the same pool, off the event loop. All requests
+share one pooled NWSClient and the process-wide points and forecast caches.
+
+Endpoints (GET, JSON responses):
+  /health
+  /search?q=aus&limit=10
+  /now?city=Austin city, TX          (or ?lat=30.27&lon=-97.74)
+  /forecast?city=Austin city, TX&days=7   (&hourly=1: days from forecastHourly)
+  /metrics                           (?format=prometheus for Prometheus text)
+
+Usage:
+  python -m src.server --port 8080
+  python -m src.server --standin           # against a local NWS stand-in
+  python -m src.server --api-base http://127.0.0.1:8765
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .cities import ALL_CITIES, CITY_ALAND, CITY_DB
+from .city_index import CityIndex
+from .fetch_engine import FetchEngine
+from .forecast_model import DaySummary
+from .forecast_summary import build_day_summaries
+from .hourly import hourly_day_summaries
+from .http_client import API_BASE, NWSClient
+from .metrics import METRICS
+from .weather import fetch_forecast_periods, fetch_hourly_periods, summarize_now_and_tomorrow
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 16
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+MAX_HEADER_BYTES = 16 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    502: "Bad Gateway",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class WeatherService:
+    def __init__(self, client: NWSClient | None = None, workers: int = DEFAULT_WORKERS):
+        self.client = client or NWSClient(pool_size=workers)
+        self.engine = FetchEngine(self.client, max_chains=workers, max_probes=workers * 2)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nws-server")
+        self._index: Optional[CityIndex] = None
+        self.routes = {
+            "/health": self.health,
+            "/search": self.search,
+            "/now": self.now,
+            "/forecast": self.forecast,
+            "/metrics": self.metrics,
+        }
+
+    def _city_index(self) -> CityIndex:
+        if self._index is None:
+            names = list(ALL_CITIES)
+            self._index = CityIndex(names, weights=[CITY_ALAND.get(c, 0) for c in names])
+        return self._index
+
+    async def warm_up(self) -> None:
+        """Load the city table and search index before the first client arrives."""
+        await asyncio.get_running_loop().run_in_executor(self._pool, self._city_index)
+
+    async def dispatch(self, method: str, target: str) -> Tuple[int, Dict[str, Any] | str]:
+        parts = urlsplit(target)
+        handler = self.routes.get(parts.path.rstrip("/") or "/")
+        try:
+            if handler is None:
+                raise HTTPError(404, f"No such endpoint: {parts.path}")
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405, "Only GET is supported")
+            params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            return 200, await handler(params)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            # Anything else came from the NWS side (HTTP errors, bad payloads).
+            return 502, {"error": f"{type(e).__name__}: {e}"}
+
+    async def health(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "ok": True,
+            "api_base": self.client.base_url,
+            "cities": len(CITY_DB),
+            # Endpoints and stations currently skipped after repeated failures.
+            "open_circuits": self.client.breaker.open_keys(),
+        }
+
+    async def search(self, params: Dict[str, str]) -> Dict[str, Any]:
+        query = params.get("q", "").strip().lower()
+        limit = min(_int_param(params, "limit", SEARCH_LIMIT), MAX_SEARCH_LIMIT)
+        # Ranking scans posting lists and scores candidates; keep it off the event loop.
+        results = await asyncio.get_running_loop().run_in_executor(self._pool, self._search, query, limit)
+        return {"query": query, "results": results}
+
+    def _search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        names = self._city_index().ranked(query, limit) if query else []
+        results = []
+        for name in names:
+            lat, lon = CITY_DB[name]
+            results.append({"city": name, "lat": lat, "lon": lon})
+        return results
+
+    async def now(self, params: Dict[str, str]) -> Dict[str, Any]:
+        city, lat, lon = _location(params)
+        handle = self.engine.start(lat, lon)
+        periods = await asyncio.wrap_future(handle.forecast)
+        try:
+            humidity = await asyncio.wrap_future(handle.humidity)
+        except Exception:
+            # Humidity is optional, as in the app.
+            humidity = None
+        return {"city": city, "lat": lat, "lon": lon, **summarize_now_and_tomorrow(periods), "humidity": humidity}
+
+    async def forecast(self, params: Dict[str, str]) -> Dict[str, Any]:
+        city, lat, lon = _location(params)
+        days = _int_param(params, "days", 7)
+        hourly = params.get("hourly") in ("1", "true", "yes")
+        # Aggregating ~156 hourly periods is CPU work, so it runs on the pool with the fetch.
+        summaries = await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._day_summaries, lat, lon, hourly
+        )
+        return {"city": city, "lat": lat, "lon": lon, "days": [s.as_dict() for s in summaries[:days]]}
+
+    def _day_summaries(self, lat: float, lon: float, hourly: bool) -> List[DaySummary]:
+        if hourly:
+            return hourly_day_summaries(fetch_hourly_periods(lat, lon, self.client))
+        return build_day_summaries(fetch_forecast_periods(lat, lon, self.client))
+
+    async def metrics(self, params: Dict[str, str]) -> Dict[str, Any] | str:
+        """Counters and timings of this process; text for format=prometheus."""
+        if params.get("format") == "prometheus":
+            return METRICS.prometheus()
+        return METRICS.snapshot()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                status, payload = await self.dispatch(method, target)
+                _write_response(writer, status, payload, keep_alive, head_only=method == "HEAD")
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            _write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.engine.shutdown()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bool]]:
+    """Read one request head; returns (method, target, keep_alive) or None at EOF."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HTTPError(400, "Incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request head too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    # Request bodies are not used; read and drop one so keep-alive stays in sync.
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HTTPError(400, "Malformed Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Negative Content-Length")
+    if length:
+        await reader.readexactly(length)
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method, target, keep_alive
+
+
+def _write_response(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Dict[str, Any] | str,
+    keep_alive: bool,
+    head_only: bool = False,
+) -> None:
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), "application/json; charset=utf-8"
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    ).encode("ascii")
+    writer.write(head if head_only else head + body)
+
+
+def _int_param(params: Dict[str, str], name: str, default: int) -> int:
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+    if number < 1:
+        raise HTTPError(400, f"{name} must be positive")
+    return number
+
+
+def _location(params: Dict[str, str]) -> Tuple[Optional[str], float, float]:
+    city = params.get("city")
+    if city is not None:
+        if city not in CITY_DB:
+            raise HTTPError(404, f"Unknown city: {city!r}")
+        lat, lon = CITY_DB[city]
+        return city, lat, lon
+    try:
+        lat, lon = float(params["lat"]), float(params["lon"])
+    except KeyError:
+        raise HTTPError(400, "Pass city=... or lat=...&lon=...")
+    except ValueError:
+        raise HTTPError(400, "lat and lon must be numbers")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPError(400, "lat/lon out of range")
+    return None, lat, lon
+
+
+async def serve(service: WeatherService, host: str, port: int) -> None:
+    await service.warm_up()
+    server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    bound = server.sockets[0].getsockname()
+    print(f"Serving forecasts on http://{bound[0]}:{bound[1]} (NWS API: {service.client.base_url})", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve city search and NWS forecasts as JSON")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent NWS requests")
+    parser.add_argument("--api-base", help="NWS API base URL (default: NWS_API_BASE or api.weather.gov)")
+    parser.add_argument("--standin", action="store_true", help="start a local NWS stand-in and use it")
+    parser.add_argument("--standin-latency", type=float, default=0.0, help="seconds added by the stand-in")
+    args = parser.parse_args()
+
+    api_base = args.api_base
+    if args.standin:
+        from .nws_standin import start_standin
+
+        api_base = start_standin(latency=args.standin_latency).base_url
+
+    client = NWSClient(base_url=api_base or API_BASE, pool_size=args.workers)
+    service = WeatherService(client, workers=args.workers)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+singleflight.py
+
+Collapses concurrent identical calls into one.
+
+SingleFlight.do(key, fn, *args) runs fn for the first caller of a key (the
+leader); callers that arrive with the same key while it runs wait for the
+leader's outcome instead of repeating the work, and get the same return
+value or the same exception. The very same object goes to every caller,
+so fn should return something immutable, or callers should copy it
+before changing it (NWSClient.get hands each caller its own Response).
+Once the call finishes the key is forgotten, so later callers start a
+new call. Nothing is cached here; that is the job of nws_cache.
+
+Each group counts its leaders and collapsed callers, in stats() and in
+metrics.METRICS as "nws_singleflight_total" by group and role.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+from .metrics import METRICS
+
+
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = {"leaders": 0, "collapsed": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["leaders"] += 1
+            else:
+                flight.waiters += 1
+                self._stats["collapsed"] += 1
+        METRICS.count("nws_singleflight_total", group=self.name, role="leader" if leader else "collapsed")
+        if not leader:
+            return flight.future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            flight.future.set_exception(e)
+            raise
+        self._finish(key)
+        flight.future.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable) -> None:
+        # Forgotten before waiters are woken: a caller arriving after this
+        # point starts a fresh call rather than reusing a finished one.
+        with self._lock:
+            del self._flights[key]
+
+    def in_flight(self) -> Dict[Hashable, int]:
+        """Keys being fetched right now -> number of callers waiting on each."""
+        with self._lock:
+            return {key: flight.waiters for key, flight in self._flights.items()}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,154 @@
+"""
+spatial_index.py
+
+Nearest-city and radius queries over city coordinates.
+
+Each city becomes a point on the unit sphere (x, y, z). Straight-line
+(chord) distance between those points grows with great-circle distance, so
+a plain 3-d k-d tree answers nearest-k and within-radius queries exactly,
+with no special cases at the poles or the antimeridian. The tree is
+implicit: one permutation array, each subrange split at its median on the
+axis with the widest spread, leaves scanned directly.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from typing import List, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 8
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class SpatialIndex:
+    def __init__(self, lats: Sequence[float], lons: Sequence[float]):
+        self._coords = [array("d"), array("d"), array("d")]
+        for lat, lon in zip(lats, lons):
+            for axis, value in enumerate(_unit_vector(lat, lon)):
+                self._coords[axis].append(value)
+        self._order = array("I", range(len(self._coords[0])))
+        # Split axis of each internal node, keyed by the node's median position.
+        self._axes = array("b", [0]) * len(self._order)
+        self._build()
+
+    @classmethod
+    def from_store(cls, store) -> "SpatialIndex":
+        """Index a CityStore; results are store row numbers."""
+        return cls(store.latitudes, store.longitudes)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _build(self) -> None:
+        order, coords = self._order, self._coords
+        stack = [(0, len(order))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            ids = order[lo:hi]
+            spreads = []
+            for axis in range(3):
+                values = [coords[axis][i] for i in ids]
+                spreads.append(max(values) - min(values))
+            axis = spreads.index(max(spreads))
+            ids = sorted(ids, key=coords[axis].__getitem__)
+            order[lo:hi] = array("I", ids)
+            mid = (lo + hi) // 2
+            self._axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def _dist2(self, i: int, q: Tuple[float, float, float]) -> float:
+        x, y, z = self._coords
+        return (x[i] - q[0]) ** 2 + (y[i] - q[1]) ** 2 + (z[i] - q[2]) ** 2
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[int, float]]:
+        """The k closest points as (index, distance in km), closest first."""
+        if k <= 0 or not self._order:
+            return []
+        q = _unit_vector(lat, lon)
+        heap: List[Tuple[float, int]] = []  # max-heap of (-dist2, index)
+        order, coords, axes = self._order, self._coords, self._axes
+
+        def visit(lo: int, hi: int) -> None:
+            if hi - lo <= LEAF_SIZE:
+                for pos in range(lo, hi):
+                    i = order[pos]
+                    d2 = self._dist2(i, q)
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, i))
+                    elif d2 < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2, i))
+                return
+            mid = (lo + hi) // 2
+            i = order[mid]
+            axis = axes[mid]
+            diff = q[axis] - coords[axis][i]
+            d2 = self._dist2(i, q)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, i))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, i))
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(*far)
+
+        visit(0, len(order))
+        found = sorted((-neg, i) for neg, i in heap)
+        return [(i, _chord_to_km(math.sqrt(d2))) for d2, i in found]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """All points within radius_km as (index, distance in km), closest first."""
+        q = _unit_vector(lat, lon)
+        limit2 = _km_to_chord(radius_km) ** 2
+        hits: List[Tuple[float, int]] = []
+        order, coords, axes = self._order, self._coords, self._axes
+
+        stack = [(0, len(order))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                for pos in range(lo, hi):
+                    d2 = self._dist2(order[pos], q)
+                    if d2 <= limit2:
+                        hits.append((d2, order[pos]))
+                continue
+            mid = (lo + hi) // 2
+            i = order[mid]
+            axis = axes[mid]
+            diff = q[axis] - coords[axis][i]
+            d2 = self._dist2(i, q)
+            if d2 <= limit2:
+                hits.append((d2, i))
+            if diff < 0 or diff * diff <= limit2:
+                stack.append((lo, mid))
+            if diff >= 0 or diff * diff <= limit2:
+                stack.append((mid + 1, hi))
+
+        hits.sort()
+        return [(i, _chord_to_km(math.sqrt(d2))) for d2, i in hits]
@@ -0,0 +1,135 @@
+"""
+station_rank.py
+
+Learned observation-station preference for humidity lookups.
+
+For each observationStations URL (one per NWS grid cell) StationRanking
+keeps the station list, the station that last returned a relative
+humidity, and a score per station. Lookups try stations best-first, so a
+typical lookup needs a single observation request and no station-list
+request. Stations that answer non-200 or null are demoted; the list itself
+is re-fetched after a TTL so new or retired stations are picked up (an
+empty list, as NWS returns during outages, is never kept). At most
+`max_entries` grid cells are kept, the most recently fetched ones.
+State is mirrored to a JSON file under the cache directory, written behind
+like the points cache.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .nws_cache import CACHE_DIR, DeferredWrite, read_json
+
+STATIONS_PATH = CACHE_DIR / "stations.json"
+STATION_LIST_TTL_SECONDS = 7 * 24 * 3600
+STATIONS_MAX_ENTRIES = 20_000
+SCORE_MIN, SCORE_MAX = -5, 5
+
+
+class StationRanking:
+    def __init__(
+        self,
+        path: Optional[Path] = STATIONS_PATH,
+        ttl: float = STATION_LIST_TTL_SECONDS,
+        max_entries: int = STATIONS_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._writer = DeferredWrite(path, self._load, self._lock) if path is not None else None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            data = read_json(self.path) if self.path is not None else None
+            self._entries = data if isinstance(data, dict) else {}
+        return self._entries
+
+    def _evict(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        overflow = len(entries) - self.max_entries
+        if overflow > 0:
+            for key in sorted(entries, key=lambda k: entries[k]["fetched_at"])[:overflow]:
+                del entries[key]
+
+    def _save(self) -> None:
+        if self._writer is not None:
+            self._writer.schedule()
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def ordered(self, stations_url: str, fetch_station_ids: Callable[[], List[str]]) -> List[str]:
+        """
+        Station ids for `stations_url`, best first: the last station that
+        reported humidity, then by score, then in NWS (distance) order.
+        `fetch_station_ids` is called only when the cached list is missing or stale.
+        """
+        with self._lock:
+            entry = self._load().get(stations_url)
+            fresh = entry is not None and time.time() - entry["fetched_at"] < self.ttl
+
+        if not fresh:
+            station_ids = fetch_station_ids()
+            # An empty list is not kept: the stale one (if any) is used and the next lookup asks again.
+            if station_ids:
+                with self._lock:
+                    old = self._load().get(stations_url) or {}
+                    old_scores = old.get("scores", {})
+                    entry = {
+                        "fetched_at": time.time(),
+                        "stations": station_ids,
+                        # Keep what was learned about stations that are still listed.
+                        "scores": {sid: old_scores.get(sid, 0) for sid in station_ids},
+                        "last_good": old.get("last_good") if old.get("last_good") in station_ids else None,
+                    }
+                    self._entries[stations_url] = entry
+                    self._evict(self._entries)
+                    self._save()
+
+        with self._lock:
+            entry = self._load().get(stations_url)
+            if entry is None:
+                return []
+            # record() updates these from other threads; sort a copy.
+            stations = list(entry["stations"])
+            scores = dict(entry["scores"])
+            last_good = entry["last_good"]
+        position = {sid: i for i, sid in enumerate(stations)}
+        return sorted(stations, key=lambda sid: (sid != last_good, -scores.get(sid, 0), position[sid]))
+
+    def record(self, stations_url: str, station_id: str, reported: bool) -> None:
+        """Promote a station that returned humidity; demote one that did not."""
+        with self._lock:
+            entry = self._load().get(stations_url)
+            if entry is None:
+                return
+            score = entry["scores"].get(station_id, 0)
+            if reported:
+                entry["scores"][station_id] = min(score + 1, SCORE_MAX)
+                changed = entry["last_good"] != station_id
+                entry["last_good"] = station_id
+            else:
+                entry["scores"][station_id] = max(score - 1, SCORE_MIN)
+                changed = True
+                if entry["last_good"] == station_id:
+                    entry["last_good"] = None
+            # Repeat successes from the preferred station need no disk write.
+            if changed or score < SCORE_MAX:
+                self._save()
+
+    def clear(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+        with self._lock:
+            self._entries = {}
+            if self.path is not None and self.path.exists():
+                self.path.unlink()
+
+
+STATION_RANKING = StationRanking()
@@ -1,77 +1,166 @@
 from __future__ import annotations
 
+from typing import Any, Callable, Dict, List
+
 import requests
-from typing import Any, Dict, List, Tuple
 
-APP_USER_AGENT = "15113-HW3-Explore-API (your_email@example.com)"
+from .forecast_model import ForecastPeriod, decode_forecast
+from .http_client import NWSClient, default_client
+from .nws_cache import FORECAST_CACHE, POINTS_CACHE, point_key
+from .resilience import CircuitOpenError
+from .singleflight import SingleFlight
+from .station_rank import STATION_RANKING
+
+
+def fetch_points(lat: float, lon: float, client: NWSClient | None = None) -> Dict[str, Any]:
+    """
+    NWS: /points metadata (forecast URL, observationStations URL, grid cell).
+    Served from POINTS_CACHE when possible, so repeat lookups cost no request.
+    """
+    client = client or default_client()
+    cached = POINTS_CACHE.get(lat, lon, client.base_url)
+    if cached is not None:
+        return cached
+
+    points = client.get_json(client.url(f"/points/{point_key(lat, lon)}"))
+
+    return POINTS_CACHE.put(lat, lon, points.get("properties", {}), client.base_url)
+
+
+STATION_PROBE_LIMIT = 10
+
+# Forecast downloads in progress, keyed by gridpoint; callers for the same
+# grid cell wait on the first caller's result instead of downloading and
+# decoding again. (The client collapses identical requests on its own too.)
+FORECAST_FLIGHTS = SingleFlight("forecast")
 
-HEADERS_NWS = {
-    "User-Agent": APP_USER_AGENT,
-    "Accept": "application/geo+json",
-}
 
+def gridpoint_key(points: Dict[str, Any]) -> str | None:
+    """NWS forecast grid cell of a point, e.g. "PBZ/77,65"."""
+    office, x, y = points.get("gridId"), points.get("gridX"), points.get("gridY")
+    if office is None or x is None or y is None:
+        return None
+    return f"{office}/{x},{y}"
+
+
+def _fetch_once(key: str, url: str, client: NWSClient, decode: Callable[[Any], Any]) -> Any:
+    return FORECAST_FLIGHTS.do(key, FORECAST_CACHE.get_json, client, url, decode)
+
+
+def fetch_forecast_from_points(points: Dict[str, Any], client: NWSClient | None = None) -> List[ForecastPeriod]:
+    """NWS: forecast URL (from /points metadata) -> periods list, via FORECAST_CACHE."""
+    client = client or default_client()
+    forecast_url = points["forecast"]
+    return _fetch_once(gridpoint_key(points) or forecast_url, forecast_url, client, decode_forecast)
 
-def fetch_forecast_periods(lat: float, lon: float) -> List[Dict[str, Any]]:
+
+def fetch_forecast_periods(lat: float, lon: float, client: NWSClient | None = None) -> List[ForecastPeriod]:
     """NWS: /points -> forecast URL -> periods list."""
-    points_url = f"https://api.weather.gov/points/{lat},{lon}"
-    r1 = requests.get(points_url, headers=HEADERS_NWS, timeout=20)
-    r1.raise_for_status()
-    points = r1.json()
+    client = client or default_client()
+    points = fetch_points(lat, lon, client)
+    return fetch_forecast_from_points(points, client)
+
 
-    forecast_url = points["properties"]["forecast"]
-    r2 = requests.get(forecast_url, headers=HEADERS_NWS, timeout=20)
-    r2.raise_for_status()
-    forecast = r2.json()
+def _decode_hourly(payload: Dict[str, Any]) -> Any:
+    # Imported here: hourly pulls in NumPy when it is installed.
+    from .hourly import decode_hourly
 
-    return forecast["properties"]["periods"]
+    return decode_hourly(payload["properties"]["periods"])
 
 
-def fetch_latest_relative_humidity(lat: float, lon: float) -> float | None:
+def fetch_hourly_from_points(points: Dict[str, Any], client: NWSClient | None = None) -> Any:
     """
-    NWS: /points -> observationStations -> try multiple stations -> latest observation.
-    Returns relative humidity percent (float) or None if unavailable.
+    NWS: forecastHourly URL -> hourly.HourlyColumns (about 156 hours),
+    deduplicated per grid cell like the forecast.
     """
-    points_url = f"https://api.weather.gov/points/{lat},{lon}"
-    r1 = requests.get(points_url, headers=HEADERS_NWS, timeout=20)
-    r1.raise_for_status()
-    points = r1.json()
-
-    stations_url = points.get("properties", {}).get("observationStations")
+    client = client or default_client()
+    hourly_url = points["forecastHourly"]
+    key = gridpoint_key(points)
+    return _fetch_once(f"{key}/hourly" if key else hourly_url, hourly_url, client, _decode_hourly)
+
+
+def fetch_hourly_periods(lat: float, lon: float, client: NWSClient | None = None) -> Any:
+    """NWS: /points -> forecastHourly URL -> hourly.HourlyColumns."""
+    client = client or default_client()
+    points = fetch_points(lat, lon, client)
+    return fetch_hourly_from_points(points, client)
+
+
+def fetch_station_ids(
+    points: Dict[str, Any],
+    client: NWSClient | None = None,
+    limit: int = STATION_PROBE_LIMIT,
+) -> List[str]:
+    """NWS: observationStations URL (from /points metadata) -> nearest station ids, in NWS order."""
+    stations_url = points.get("observationStations")
     if not stations_url:
-        return None
-
-    r2 = requests.get(stations_url, headers=HEADERS_NWS, timeout=20)
-    r2.raise_for_status()
-    stations = r2.json()
+        return []
 
-    features = stations.get("features", [])
-    if not features:
-        return None
+    client = client or default_client()
+    stations = client.get_json(stations_url)
 
-    # Try several nearby stations; first one may not report RH
-    for feat in features[:10]:
+    station_ids: List[str] = []
+    for feat in stations.get("features", []):
         station_id = feat.get("properties", {}).get("stationIdentifier")
         if not station_id:
             station_ref = feat.get("id", "")
             station_id = station_ref.rsplit("/", 1)[-1] if station_ref else None
-        if not station_id:
-            continue
+        if station_id:
+            station_ids.append(station_id)
+        if len(station_ids) >= limit:
+            break
+    return station_ids
+
+
+def fetch_station_humidity(station_id: str, client: NWSClient | None = None) -> float | None:
+    """
+    NWS: latest observation of one station -> relative humidity, or None if
+    not reported. A station that times out, cannot be reached or whose
+    circuit is open counts as "no reading", so the caller moves on to the
+    next station.
+    """
+    client = client or default_client()
+    latest_url = client.url(f"/stations/{station_id}/observations/latest")
+    try:
+        r3 = client.get(latest_url)
+    except (CircuitOpenError, requests.RequestException):
+        return None
+    if r3.status_code != 200:
+        return None
+
+    obs = r3.json()
+    rh = obs.get("properties", {}).get("relativeHumidity", {}).get("value")
+    return float(rh) if rh is not None else None
+
+
+def ranked_station_ids(points: Dict[str, Any], client: NWSClient | None = None) -> List[str]:
+    """Nearby station ids, best first per STATION_RANKING; the list is fetched only when stale."""
+    stations_url = points.get("observationStations")
+    if not stations_url:
+        return []
+    return STATION_RANKING.ordered(stations_url, lambda: fetch_station_ids(points, client))
 
-        latest_url = f"https://api.weather.gov/stations/{station_id}/observations/latest"
-        r3 = requests.get(latest_url, headers=HEADERS_NWS, timeout=20)
-        if r3.status_code != 200:
-            continue
 
-        obs = r3.json()
-        rh = obs.get("properties", {}).get("relativeHumidity", {}).get("value")
+def fetch_latest_relative_humidity(lat: float, lon: float, client: NWSClient | None = None) -> float | None:
+    """
+    NWS: /points -> observationStations -> try multiple stations -> latest observation.
+    Returns relative humidity percent (float) or None if unavailable.
+    """
+    client = client or default_client()
+    points = fetch_points(lat, lon, client)
+    stations_url = points.get("observationStations")
+
+    # Try several nearby stations, the one that last reported RH first
+    for station_id in ranked_station_ids(points, client):
+        rh = fetch_station_humidity(station_id, client)
+        STATION_RANKING.record(stations_url, station_id, rh is not None)
         if rh is not None:
-            return float(rh)
+            return rh
 
     return None
 
 
-
-def summarize_now_and_tomorrow(periods: List[Dict[str, Any]]) -> Dict[str, Any]:
+def summarize_now_and_tomorrow(periods: List[ForecastPeriod]) -> Dict[str, Any]:
     """
     "Now" = first period (closest period, not real-time observation).
     Tomorrow high = first isDaytime=True after index 0
@@ -81,15 +170,15 @@ def summarize_now_and_tomorrow(periods: List[Dict[str, Any]]) -> Dict[str, Any]:
         raise ValueError("Forecast periods list is empty.")
 
     now_p = periods[0]
-    now_label = now_p.get("name", "Now")
-    now_temp = now_p.get("temperature")
-    now_unit = now_p.get("temperatureUnit", "F")
-    now_short = now_p.get("shortForecast", "")
+    now_label = now_p.name or "Now"
+    now_temp = now_p.temperature
+    now_unit = now_p.temperature_unit or "F"
+    now_short = now_p.short_forecast
 
     # find tomorrow daytime
     day_idx = None
     for i in range(1, len(periods)):
-        if periods[i].get("isDaytime") is True:
+        if periods[i].is_daytime is True:
             day_idx = i
             break
 
@@ -106,20 +195,20 @@ def summarize_now_and_tomorrow(periods: List[Dict[str, Any]]) -> Dict[str, Any]:
         }
 
     day_p = periods[day_idx]
-    tomorrow_label = day_p.get("name", "Tomorrow")
-    tomorrow_high = day_p.get("temperature")
-    unit = day_p.get("temperatureUnit", now_unit)
+    tomorrow_label = day_p.name or "Tomorrow"
+    tomorrow_high = day_p.temperature
+    unit = day_p.temperature_unit or now_unit
 
     # find following night
     night_p = None
     for j in range(day_idx + 1, len(periods)):
-        if periods[j].get("isDaytime") is False:
+        if periods[j].is_daytime is False:
             night_p = periods[j]
             break
 
     tomorrow_low = None
-    if night_p is not None and night_p.get("temperatureUnit", unit) == unit:
-        tomorrow_low = night_p.get("temperature")
+    if night_p is not None and (night_p.temperature_unit or unit) == unit:
+        tomorrow_low = night_p.temperature
 
     return {
         "now_label": now_label,
@@ -133,6 +222,6 @@ def summarize_now_and_tomorrow(periods: List[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
 
-def get_weather_by_latlon(lat: float, lon: float) -> Dict[str, Any]:
-    periods = fetch_forecast_periods(lat, lon)
+def get_weather_by_latlon(lat: float, lon: float, client: NWSClient | None = None) -> Dict[str, Any]:
+    periods = fetch_forecast_periods(lat, lon, client)
     return summarize_now_and_tomorrow(periods)
@@ -0,0 +1,47 @@
+"""
+Shared fixtures. The cache directory is pointed at a scratch directory
+before anything under src/ is imported, so tests never touch the user's
+cache files.
+"""
+
+import json
+import os
+import tempfile
+
+os.environ["NWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="nws-tests-")
+
+import pytest
+import requests
+
+from src.nws_standin import start_standin
+
+
+@pytest.fixture
+def standin():
+    """start_standin(**options) -> a running stand-in server, shut down after the test."""
+    servers = []
+
+    def start(**options):
+        server = start_standin(seed=15113, **options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_response():
+    """make_response(status, headers, body) -> a requests.Response with its body already read."""
+
+    def make(status=200, headers=None, body=None):
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers or {})
+        response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+        response.url = "http://test/"
+        return response
+
+    return make
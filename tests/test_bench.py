@@ -0,0 +1,59 @@
+"""
+Offline regression gate: the end-to-end benchmark replays the recorded
+fixtures through the stand-in and must stay within the checked-in
+baseline's limits (tests/fixtures/e2e_baseline.json).
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import requests
+
+from src.bench import check_e2e
+from src.http_client import NWSClient
+from src.nws_standin import Fixtures
+from src.weather import fetch_forecast_periods, fetch_latest_relative_humidity
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ROOT / "tests" / "fixtures" / "recorded.json"
+BASELINE = ROOT / "tests" / "fixtures" / "e2e_baseline.json"
+
+
+def test_fixtures_are_replayed_with_the_standin_base(standin):
+    fixtures = Fixtures.load(FIXTURES)
+    server = standin(fixtures=fixtures)
+    points = requests.get(f"{server.base_url}/points/40.4406,-79.9959", timeout=5).json()["properties"]
+    assert points["forecast"].startswith(server.base_url + "/gridpoints/")
+
+    client = NWSClient(base_url=server.base_url)
+    periods = fetch_forecast_periods(40.4406, -79.9959, client)
+    humidity = fetch_latest_relative_humidity(40.4406, -79.9959, client)
+    client.close()
+    recorded = json.loads(fixtures.payload(points["forecast"][len(server.base_url) :], server.base_url))
+    assert [p.name for p in periods] == [p["name"] for p in recorded["properties"]["periods"]]
+    assert humidity is not None
+
+
+def test_check_e2e_reports_each_exceeded_limit():
+    results = {"passes": {"cold": {"requests_per_lookup": 4.0, "failed": 1}, "warm": {"requests_per_lookup": 1.0}}}
+    baseline = {"limits": {"cold": {"requests_per_lookup": 5.0, "failed": 0}, "warm": {"kib_per_lookup": 1.0}}}
+    assert check_e2e(results, baseline) == ["cold.failed: 1.00 > 0", "warm.kib_per_lookup: not measured"]
+    assert check_e2e(results, {"limits": {"cold": {"requests_per_lookup": 5.0}}}) == []
+
+
+def test_e2e_benchmark_stays_within_the_baseline():
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8"))
+    # A fresh interpreter: bench_e2e needs its own scratch cache directory.
+    run = subprocess.run(
+        [sys.executable, "-m", "src.bench", "e2e", *baseline["args"], "--json", "--check", str(BASELINE)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert run.returncode in (0, 1), run.stderr
+    results = json.loads(run.stdout)
+    assert results["lookups"] == 3
+    assert results["regressions"] == []
@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import src.bulk
+from src.bulk import fetch_many, gridpoint_report
+from src.http_client import NWSClient
+from src.weather import fetch_forecast_periods
+
+# The first three share one stand-in grid cell (TST/4000,5217).
+PITTSBURGH = ["40.4406,-79.9959", "40.4410,-79.9950", "40.4400,-79.9955"]
+AUSTIN = "30.2672,-97.7431"
+
+
+def test_gridpoint_report_counts_shared_cells(standin):
+    server = standin()
+    client = NWSClient(base_url=server.base_url)
+    report = gridpoint_report(PITTSBURGH + [AUSTIN], client=client)
+    client.close()
+
+    assert report["resolved"] == 4 and report["failed"] == []
+    assert report["gridpoints"] == 2
+    assert report["downloads_saved"] == 2
+    assert report["dedup_ratio"] == 2.0
+    assert report["shared"] == {"TST/4000,5217": sorted(PITTSBURGH)}
+
+
+def test_concurrent_lookups_in_one_cell_download_its_forecast_once(standin):
+    server = standin(latency=0.2)
+    client = NWSClient(base_url=server.base_url)
+    coords = [tuple(float(v) for v in target.split(",")) for target in PITTSBURGH]
+    with ThreadPoolExecutor(len(coords)) as pool:
+        forecasts = list(pool.map(lambda c: fetch_forecast_periods(*c, client), coords))
+    client.close()
+
+    assert forecasts[0] == forecasts[1] == forecasts[2]
+    # One /points call per location, one forecast for the shared cell.
+    assert server.state.requests == len(coords) + 1
+
+
+def test_stopping_early_cancels_the_queued_lookups(monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def fetch_one(target, *args):
+        started.append(target)
+        if target != "0":
+            release.wait(1)
+        return {"target": target, "ok": True}
+
+    monkeypatch.setattr(src.bulk, "_fetch_one", fetch_one)
+    results = fetch_many([str(i) for i in range(20)], client=NWSClient(), workers=2)
+    assert next(results)["target"] == "0"
+    start = time.perf_counter()
+    results.close()
+    assert time.perf_counter() - start < 0.5
+    release.set()
+    time.sleep(0.1)
+    # Only the lookups already running when iteration stopped were made.
+    assert len(started) <= 3
@@ -0,0 +1,217 @@
+import random
+
+from src.city_index import CityIndex
+from src.city_search import CitySearchController
+
+NAMES = sorted(
+    [
+        "Austin city, TX",
+        "Boston city, MA",
+        "Houston city, TX",
+        "Mount Pleasant city, MI",
+        "Pittsburgh city, PA",
+        "Pittsfield city, MA",
+        "Pittston city, PA",
+        "Springfield city, IL",
+        "Springfield city, MA",
+        "West Pittston borough, PA",
+    ]
+)
+
+
+def scan(names, query):
+    query = query.strip().lower()
+    return [n for n in names if query in n.lower()] if query else []
+
+
+def test_search_matches_a_linear_scan_while_typing():
+    index = CityIndex(NAMES)
+    # Extending, then shortening, then replacing the query exercises the narrowing shortcut.
+    for query in ["p", "pi", "pit", "pitt", "pitts", "pittst", "pitts", "pi", "ton", "ton city, ", " BOS ", "zz", ""]:
+        assert index.search(query) == scan(NAMES, query), query
+
+
+def test_search_matches_a_linear_scan_on_random_names():
+    rng = random.Random(15113)
+    letters = "abcdeilnorst "
+    names = sorted({"".join(rng.choice(letters) for _ in range(rng.randint(3, 12))) for _ in range(500)})
+    index = CityIndex(names)
+    for _ in range(300):
+        word = rng.choice(names)
+        start = rng.randrange(len(word))
+        query = word[start : start + rng.randint(1, 4)]
+        assert index.search(query) == scan(names, query), query
+
+
+def test_prefix_ids():
+    index = CityIndex(NAMES)
+    assert [NAMES[i] for i in index.prefix_ids("pitts")] == [n for n in NAMES if n.lower().startswith("pitts")]
+    assert index.prefix_ids("q") == []
+
+
+def test_ranking_bands_outweigh_size():
+    # Each later name is a thousand times bigger, yet ranks by match kind.
+    names = [
+        "Pittsburgh city, PA",
+        "West Pittston borough, PA",
+        "Uppittsville town, PA",
+        "Pitsfield town, MA",
+    ]
+    index = CityIndex(names, weights=[1e3, 1e6, 1e9, 1e12])
+    assert index.ranked("pitts") == names
+
+    # A match in the ", ST" suffix only still beats a typo match.
+    index = CityIndex(["Austin city, TX", "City Tower, PA"], weights=[10, 1e12])
+    assert index.ranked("city, t") == ["Austin city, TX", "City Tower, PA"]
+
+
+class FakeCombo:
+    """Just enough of a combobox for scheduling and focus handling."""
+
+    def __init__(self):
+        self.timers = {}
+        self._next = 0
+
+    def after(self, ms, callback):
+        self._next += 1
+        self.timers[self._next] = (ms, callback)
+        return self._next
+
+    def after_cancel(self, timer):
+        del self.timers[timer]
+
+    def after_idle(self, callback):
+        pass
+
+    def focus_set(self):
+        pass
+
+    def selection_clear(self):
+        pass
+
+    def icursor(self, index):
+        pass
+
+
+class FakeListbox:
+    """A Listbox that keeps its rows in a list and counts the rows inserted."""
+
+    def __init__(self):
+        self.rows = []
+        self.inserted = 0
+        self.first_visible = 0
+        self.selection = []
+        self.mapped = False
+
+    def _index(self, index):
+        return len(self.rows) if index == "end" else index
+
+    def delete(self, first, last=None):
+        first = self._index(first)
+        last = first if last is None else self._index(last)
+        del self.rows[first : last + 1]
+
+    def insert(self, index, *items):
+        index = self._index(index)
+        self.rows[index:index] = items
+        self.inserted += len(items)
+
+    def configure(self, **options):
+        pass
+
+    def yview(self, index):
+        self.first_visible = index
+
+    def selection_clear(self, first, last=None):
+        self.selection = []
+
+    def selection_set(self, index):
+        self.selection = [index]
+
+    def activate(self, index):
+        pass
+
+    def curselection(self):
+        return tuple(self.selection)
+
+    def grid(self):
+        self.mapped = True
+
+    def grid_remove(self):
+        self.mapped = False
+
+    def winfo_ismapped(self):
+        return self.mapped
+
+
+class Var:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class Event:
+    def __init__(self, keysym):
+        self.keysym = keysym
+
+
+def test_a_burst_of_keys_runs_one_search():
+    combo = FakeCombo()
+    search = CitySearchController(combo, None, None, NAMES, debounce_ms=120)
+    runs = []
+    search._run_filter = lambda: runs.append(1)
+    for key in "pitts":
+        search.on_keyrelease_filter(Event(key))
+    search.on_keyrelease_filter(Event("Down"))
+    assert [ms for ms, _ in combo.timers.values()] == [120]
+    for _, callback in combo.timers.values():
+        callback()
+    assert runs == [1]
+
+
+def visible(search, listbox):
+    """The rows the user sees, checked against the full result list."""
+    start = search._buf_start
+    assert listbox.rows == search.results[start : start + len(listbox.rows)]
+    first = start + listbox.first_visible
+    return search.results[first : first + search._height()]
+
+
+def test_only_visible_rows_are_materialized():
+    results = [f"City {i:03d}, ST" for i in range(500)]
+    listbox = FakeListbox()
+    search = CitySearchController(FakeCombo(), listbox, Var(), results, max_display=10, overscan=5)
+    search._show_suggestions(results)
+    assert visible(search, listbox) == results[:10]
+    assert len(listbox.rows) <= 10 + 5
+
+    for _ in range(30):
+        search.on_down(None)
+    assert search.selected == 30
+    assert visible(search, listbox) == results[21:31]
+    assert search._buf_start + listbox.selection[0] == 30
+    # Rows are inserted as they scroll into view, not all 500 up front.
+    assert listbox.inserted < 100
+
+    search.on_scrollbar("moveto", "0.5")
+    assert visible(search, listbox) == results[250:260]
+    search.on_scrollbar("moveto", "1.0")
+    assert visible(search, listbox) == results[490:500]
+    assert len(listbox.rows) <= 10 + 2 * 5
+
+
+def test_return_picks_the_selected_result():
+    results = [f"City {i:03d}, ST" for i in range(50)]
+    city_var = Var()
+    search = CitySearchController(FakeCombo(), FakeListbox(), city_var, results)
+    search._show_suggestions(results)
+    for _ in range(12):
+        search.on_down(None)
+    search.on_up(None)
+    search.on_combo_return(None)
+    assert city_var.get() == "City 011, ST"
@@ -0,0 +1,44 @@
+import pytest
+
+from src.cities import ARTIFACT_PATH, DATA_PATH, _load_city_db
+from src.city_artifact import write_city_artifact
+from src.city_store import CityStore
+
+RECORDS = [
+    ("Pittsburgh city, PA", 40.4406, -79.9959, 143_000_000),
+    ("Austin city, TX", 30.2672, -97.7431, 827_000_000),
+    ("Española city, NM", 35.9911, -106.0806, 22_000_000),
+    ("Erie city, PA", 42.1292, -80.0851, 50_000_000),
+]
+
+
+def check(store):
+    assert len(store) == len(RECORDS)
+    # Rows come back sorted by name, non-ASCII names included.
+    assert list(store.names()) == sorted(r[0] for r in RECORDS)
+    for name, lat, lon, aland in RECORDS:
+        assert store[name] == (lat, lon)
+        assert name in store
+        assert store.aland_map()[name] == aland
+    assert "Nowhere city, ZZ" not in store
+    with pytest.raises(KeyError):
+        store["Nowhere city, ZZ"]
+
+
+def test_store_built_from_records():
+    check(CityStore.from_records(RECORDS))
+
+
+def test_store_mapped_from_an_artifact(tmp_path):
+    path = tmp_path / "cities.bin"
+    write_city_artifact(path, RECORDS)
+    check(CityStore.from_artifact(path))
+
+
+def test_shipped_artifact_matches_the_tsv():
+    city_db, city_aland = _load_city_db(DATA_PATH)
+    store = CityStore.from_artifact(ARTIFACT_PATH)
+    assert dict(store.items()) == city_db
+    assert dict(store.aland_map().items()) == city_aland
+    names = store.names()
+    assert names[0] == min(city_db) and names[-1] == max(city_db)
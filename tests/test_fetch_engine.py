@@ -0,0 +1,35 @@
+import threading
+import time
+
+from src.fetch_engine import FetchEngine, LookupHandle
+from src.http_client import NWSClient
+
+
+def test_probes_of_a_cancelled_lookup_send_nothing():
+    engine = FetchEngine(NWSClient(base_url="http://test"))
+    sent = []
+    engine.client.get = lambda url, **kwargs: sent.append(url)
+    handle = LookupHandle(40.0, -80.0)
+    handle.cancel()
+    assert engine.first_humidity(["A", "B"], handle) is None
+    engine.shutdown()
+    assert sent == []
+
+
+def test_cancel_ends_the_wait_for_a_slow_station():
+    engine = FetchEngine(NWSClient(base_url="http://test"))
+    release = threading.Event()
+    engine._probe = lambda station_id, handle: release.wait(5) and 50.0
+    handle = LookupHandle(40.0, -80.0)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(engine.first_humidity(["A", "B"], handle)))
+    waiter.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    handle.cancel()
+    waiter.join(1)
+    elapsed = time.perf_counter() - start
+    release.set()
+    engine.shutdown()
+    assert result == [None]
+    assert elapsed < 0.5
@@ -0,0 +1,101 @@
+import random
+import sys
+import threading
+
+import pytest
+
+from src import forecast_format
+from src.forecast_format import clear_measure_cache, format_days
+from src.forecast_model import DaySummary
+
+SUMMARIES = [
+    DaySummary("2026-10-17", "Today", "Sunny", "10 mph", "NW", 68, 50, "F"),
+    DaySummary("2026-10-18", "Sunday", "Chance Rain Showers", "5 to 10 mph", "SW", 61, 47, "F"),
+    DaySummary("2026-10-19", "Monday", "Cloudy", "", "", None, None, "F"),
+]
+
+
+class Font:
+    """Tk font stand-in: two pixels per character, counting measure() calls."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def measure(self, text):
+        self.calls += 1
+        return 2 * len(text)
+
+    def __str__(self):
+        return self.name
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_measure_cache()
+    yield
+    clear_measure_cache()
+
+
+def test_columns_line_up():
+    lines = format_days(SUMMARIES, 3, True, True, True, "F")
+    assert lines[0].startswith("Today : Temp range: 50~68 F")
+    assert lines[2].startswith("Monday: Temp range: N/A")
+    assert len({line.index(":") for line in lines}) == 1
+    for col in range(2):
+        assert len({[i for i, c in enumerate(line) if c == "|"][col] for line in lines}) == 1
+
+
+def test_widths_are_measured_once_per_font_and_text():
+    font = Font("TkDefaultFont")
+    first = format_days(SUMMARIES, 3, True, True, True, "F", font)
+    calls = font.calls
+    assert calls > 0
+    assert format_days(SUMMARIES, 3, True, True, True, "F", font) == first
+    assert font.calls == calls
+
+    # Another font is measured on its own.
+    other = Font("TkFixedFont")
+    format_days(SUMMARIES, 3, True, True, True, "F", other)
+    assert other.calls == calls
+
+    clear_measure_cache()
+    format_days(SUMMARIES, 3, True, True, True, "F", font)
+    assert font.calls == 2 * calls
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(forecast_format, "MEASURE_CACHE_SIZE", 4)
+    font = Font("TkDefaultFont")
+    format_days(SUMMARIES, 3, True, True, True, "F", font)
+    assert len(forecast_format._widths) == 4
+
+
+def test_cache_survives_concurrent_renders(monkeypatch):
+    monkeypatch.setattr(forecast_format, "MEASURE_CACHE_SIZE", 8)
+    # Switch threads as often as possible so unguarded get/move_to_end pairs interleave.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    measure = forecast_format._measurer(Font("TkDefaultFont"))
+    texts = [f"text {i}" for i in range(16)]
+    errors = []
+
+    def render(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(5000):
+                text = rng.choice(texts)
+                assert measure(text) == 2 * len(text)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=render, args=(seed,)) for seed in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert len(forecast_format._widths) <= 8
@@ -0,0 +1,89 @@
+from datetime import date
+
+from src.forecast_format import format_now
+from src.forecast_model import ForecastPeriod, decode_forecast
+from src.forecast_summary import build_day_summaries
+from src.nws_standin import _forecast_periods
+
+RAW = {
+    "number": 1,
+    "name": "Tonight",
+    "startTime": "2026-10-17T18:00:00-04:00",
+    "endTime": "2026-10-18T06:00:00-04:00",
+    "isDaytime": False,
+    "temperature": {"unitCode": "wmoUnit:degF", "value": 48},
+    "temperatureUnit": "F",
+    "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": 20},
+    "windSpeed": "5 to 10 mph",
+    "windDirection": "NW",
+    "icon": "https://api.weather.gov/icons/land/night/few?size=medium",
+    "shortForecast": "Mostly Clear",
+    "detailedForecast": "Mostly clear, with a low around 48.",
+}
+
+
+def legacy_day_summaries(periods):
+    """build_day_summaries as it was on raw period dicts."""
+    by_date = {}
+    for p in periods:
+        try:
+            day = date.fromisoformat(p["startTime"][:10]).isoformat()
+        except (KeyError, ValueError):
+            continue
+        by_date.setdefault(day, []).append(p)
+    summaries = []
+    for day, items in by_date.items():
+        day_period = next((p for p in items if p.get("isDaytime") is True), items[0])
+        temps = [p.get("temperature") for p in items if isinstance(p.get("temperature"), (int, float))]
+        summaries.append(
+            {
+                "date": day,
+                "label": day_period.get("name", day),
+                "short_forecast": day_period.get("shortForecast", ""),
+                "wind_speed": day_period.get("windSpeed", ""),
+                "wind_dir": day_period.get("windDirection", ""),
+                "temp_high": max(temps) if temps else None,
+                "temp_low": min(temps) if temps else None,
+                "unit": day_period.get("temperatureUnit"),
+            }
+        )
+    return summaries
+
+
+def test_from_json_keeps_only_what_the_app_reads():
+    p = ForecastPeriod.from_json(RAW)
+    assert (p.name, p.start_time, p.date, p.is_daytime) == ("Tonight", RAW["startTime"], "2026-10-17", False)
+    assert (p.temperature, p.temperature_unit) == (48, "F")
+    assert (p.wind_speed, p.wind_direction, p.short_forecast) == ("5 to 10 mph", "NW", "Mostly Clear")
+    assert not hasattr(p, "__dict__")
+
+
+def test_malformed_fields_become_empty():
+    p = ForecastPeriod.from_json({"startTime": "soon", "temperature": "warm", "isDaytime": "yes"})
+    assert p.date is None and p.temperature is None and p.is_daytime is None
+    assert p.name == p.wind_speed == p.short_forecast == ""
+
+
+def test_missing_unit_stays_unknown():
+    raw = {k: v for k, v in RAW.items() if k != "temperatureUnit"}
+    raw["temperature"] = 48
+    p = ForecastPeriod.from_json(raw)
+    assert p.temperature_unit is None
+    assert ForecastPeriod.from_json(p.to_json()).temperature_unit is None
+    assert build_day_summaries([p])[0].unit is None
+    assert build_day_summaries([p])[0].as_dict() == legacy_day_summaries([raw])[0]
+    # format_now assumes Fahrenheit, as it did for a period dict without the key.
+    assert format_now(p, None, "C") == "Now: 9 C - Mostly Clear"
+
+
+def test_repeated_strings_are_shared():
+    a = ForecastPeriod.from_json(dict(RAW, shortForecast="".join(["Mostly ", "Clear"])))
+    b = ForecastPeriod.from_json(dict(RAW, shortForecast="".join(["Mostly ", "Cle", "ar"])))
+    assert a.short_forecast is b.short_forecast
+
+
+def test_day_summaries_match_the_dict_version():
+    raw = _forecast_periods(4000, 5217)
+    payload = {"properties": {"periods": raw}}
+    summaries = build_day_summaries(decode_forecast(payload))
+    assert [s.as_dict() for s in summaries] == legacy_day_summaries(raw)
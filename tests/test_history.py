@@ -0,0 +1,121 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.forecast_model import ForecastPeriod
+from src.history import HistoryStore
+
+
+def periods(temperature, forecast="Sunny"):
+    return [
+        ForecastPeriod("Today", "2026-10-17T06:00:00-05:00", True, temperature, "F", "5 mph", "N", forecast),
+        ForecastPeriod("Tonight", "2026-10-17T18:00:00-05:00", False, temperature - 15, "F", "3 mph", "N", "Clear"),
+    ]
+
+
+# Recent enough that the default retention keeps everything.
+T = time.time() - 24 * 3600
+
+
+@pytest.fixture
+def store(tmp_path):
+    stores = []
+
+    def open_store(**options):
+        s = HistoryStore(tmp_path / "history.sqlite3", **options)
+        stores.append(s)
+        return s
+
+    yield open_store
+    for s in stores:
+        s.close()
+
+
+def _count(store, table):
+    with sqlite3.connect(str(store.path)) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_last_sees_queued_and_written_lookups(store):
+    s = store(delay=60)
+    assert s.last("Austin") is None
+    s.record("Austin", 30.27, -97.74, periods(80), 55.0, fetched_at=T + 1000)
+    queued = s.last("Austin")
+    assert queued["humidity"] == 55.0 and queued["fetched_at"] == T + 1000
+    assert [p.temperature for p in queued["periods"]] == [80, 65]
+    s.flush()
+    written = s.last("Austin")
+    assert written["fetched_at"] == T + 1000
+    assert [(p.name, p.short_forecast) for p in written["periods"]] == [("Today", "Sunny"), ("Tonight", "Clear")]
+
+
+def test_last_survives_a_restart(store):
+    s = store()
+    s.record("Austin", 30.27, -97.74, periods(80), 55.0)
+    s.close()
+    again = store()
+    assert again.last("Austin")["humidity"] == 55.0
+    assert again.last("Denver") is None
+
+
+def test_unchanged_forecasts_are_stored_once(store):
+    s = store()
+    s.record("Austin", 30.27, -97.74, periods(80), 55.0, fetched_at=T + 1000)
+    s.record("Austin", 30.27, -97.74, periods(80), 50.0, fetched_at=T + 2000)
+    s.flush()
+    assert (_count(s, "lookups"), _count(s, "forecasts")) == (2, 1)
+    s.record("Austin", 30.27, -97.74, periods(82), 50.0, fetched_at=T + 3000)
+    s.close()
+    # A new run reuses the stored forecast too.
+    again = store()
+    again.last("Austin")
+    again.record("Austin", 30.27, -97.74, periods(82), 45.0, fetched_at=T + 4000)
+    again.flush()
+    assert (_count(again, "lookups"), _count(again, "forecasts")) == (4, 2)
+
+
+def test_overwritten_lookup_leaves_no_orphan_forecast(store):
+    s = store()
+    s.record("Austin", 30.27, -97.74, periods(80), 55.0, fetched_at=T + 1000)
+    s.flush()
+    s.record("Austin", 30.27, -97.74, periods(90), 40.0, fetched_at=T + 1000)
+    s.flush()
+    assert (_count(s, "lookups"), _count(s, "forecasts")) == (1, 1)
+    assert s.last("Austin")["periods"][0].temperature == 90
+
+
+def test_history_range_query(store):
+    s = store()
+    for i, t in enumerate([T + 1000, T + 2000, T + 3000, T + 4000]):
+        s.record("Austin", 30.27, -97.74, periods(70 + i), 50.0 + i, fetched_at=t)
+    s.record("Denver", 39.74, -104.99, periods(60), 30.0, fetched_at=2500.0)
+    rows = s.history("Austin", since=T + 2000, until=T + 4000)
+    assert [r["fetched_at"] for r in rows] == [T + 2000, T + 3000]
+    assert [r["temperature"] for r in rows] == [71, 72]
+    assert [r["fetched_at"] for r in s.history("Austin", limit=2)] == [T + 1000, T + 2000]
+    assert s.history("Nowhere") == []
+
+
+def test_full_batch_is_written_at_once(store):
+    s = store(delay=60, batch_size=3)
+    for i in range(3):
+        s.record("Austin", 30.27, -97.74, periods(70), 50.0, fetched_at=T + i)
+    assert _count(s, "lookups") == 3
+
+
+def test_old_lookups_are_pruned_but_each_city_keeps_its_newest(store):
+    s = store(retention=3600, prune_interval=0)
+    old = time.time() - 7200
+    s.record("Austin", 30.27, -97.74, periods(70), 50.0, fetched_at=old)
+    s.record("Austin", 30.27, -97.74, periods(71), 50.0, fetched_at=old + 1)
+    s.record("Denver", 39.74, -104.99, periods(60), 30.0, fetched_at=old)
+    s.flush()
+    # Pruned on the next write: Austin keeps its newest, Denver its only lookup.
+    assert [r["fetched_at"] for r in s.history("Austin")] == [old + 1]
+    assert [r["fetched_at"] for r in s.history("Denver")] == [old]
+    assert _count(s, "forecasts") == 2
+    s.record("Austin", 30.27, -97.74, periods(72), 50.0)
+    s.flush()
+    assert len(s.history("Austin")) == 1
+    assert _count(s, "forecasts") == 2
@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src import hourly
+from src.hourly import decode_hourly, hourly_day_summaries, summarize_many
+
+
+def make_periods(seed, hours=80):
+    """Hourly periods starting in the evening, crossing a DST change, with gaps."""
+    rng = random.Random(seed)
+    start = datetime(2026, 10, 31, 20, tzinfo=timezone(timedelta(hours=-4)))
+    periods = []
+    for i in range(hours):
+        when = start + timedelta(hours=i)
+        # Standard time from Nov 1, 02:00 local onwards.
+        if when >= datetime(2026, 11, 1, 6, tzinfo=timezone.utc):
+            when = when.astimezone(timezone(timedelta(hours=-5)))
+        low = rng.randint(0, 5)
+        periods.append(
+            {
+                "startTime": when.isoformat(),
+                "temperature": None if rng.random() < 0.05 else rng.randint(30, 70),
+                "temperatureUnit": "F",
+                "windSpeed": f"{low} to {low + rng.randint(0, 10)} mph" if rng.random() < 0.5 else f"{low} mph",
+                "windDirection": rng.choice(["N", "NW", "SW"]),
+                "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": rng.randint(0, 100)},
+                "relativeHumidity": None if rng.random() < 0.1 else {"value": rng.randint(20, 100)},
+                "shortForecast": rng.choice(["Sunny", "Cloudy", "Rain"]),
+            }
+        )
+    return periods
+
+
+def value(field):
+    if isinstance(field, dict):
+        field = field.get("value")
+    return field
+
+
+def reference(periods):
+    """The per-row computation hourly_day_summaries replaces."""
+    days = {}
+    for p in periods:
+        days.setdefault(datetime.fromisoformat(p["startTime"]).date(), []).append(p)
+    summaries = []
+    for day, rows in days.items():
+        temps = [value(p["temperature"]) for p in rows if value(p["temperature"]) is not None]
+        humidity = [value(p["relativeHumidity"]) for p in rows if value(p["relativeHumidity"]) is not None]
+        winds = [max(int(t) for t in p["windSpeed"].split() if t.isdigit()) for p in rows]
+        summaries.append(
+            {
+                "date": day.isoformat(),
+                "label": day.strftime("%A"),
+                "temp_high": max(temps),
+                "temp_low": min(temps),
+                "temp_mean": sum(temps) / len(temps),
+                "precip_max": max(value(p["probabilityOfPrecipitation"]) for p in rows),
+                "humidity_mean": sum(humidity) / len(humidity),
+                "wind_speed": f"{max(winds)} mph",
+                "hours": len(rows),
+                "unit": "F",
+            }
+        )
+    return summaries
+
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(hourly, "np", None)
+    return request.param
+
+
+def check(summaries, expected):
+    assert len(summaries) == len(expected)
+    for got, want in zip(summaries, expected):
+        got = got.as_dict()
+        for key in ("date", "label", "temp_high", "temp_low", "precip_max", "wind_speed", "hours", "unit"):
+            assert got[key] == want[key], key
+        assert got["temp_mean"] == pytest.approx(want["temp_mean"], abs=0.051)
+        assert got["humidity_mean"] == pytest.approx(want["humidity_mean"], abs=0.051)
+
+
+def test_decoded_timestamps_match_fromisoformat():
+    periods = make_periods(1)
+    cols = decode_hourly(periods)
+    assert list(cols.timestamp) == [int(datetime.fromisoformat(p["startTime"]).timestamp()) for p in periods]
+    assert list(cols.hour) == [datetime.fromisoformat(p["startTime"]).hour for p in periods]
+
+
+def test_day_summaries_match_a_per_row_reference(backend):
+    periods = make_periods(2)
+    check(hourly_day_summaries(periods), reference(periods))
+
+
+def test_summarize_many_matches_one_city_at_a_time(backend):
+    locations = [make_periods(seed, hours) for seed, hours in ((3, 80), (4, 0), (5, 30), (6, 156))]
+    batched = summarize_many(locations)
+    assert batched == [hourly_day_summaries(periods) for periods in locations]
+    for summaries, periods in zip(batched, locations):
+        check(summaries, reference(periods))
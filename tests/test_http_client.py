@@ -0,0 +1,65 @@
+import time
+
+import pytest
+import requests
+
+from src.http_client import NWSClient, parse_retry_after
+
+
+def scripted(client, *answers):
+    """Make client.session.get answer from a list of responses (or exceptions); returns the calls made."""
+    answers = list(answers)
+    calls = []
+
+    def get(url, timeout, **kwargs):
+        calls.append(timeout)
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    client.session.get = get
+    return calls
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_server_errors_and_connection_errors_are_retried(make_response):
+    client = NWSClient(base_url="http://test", backoff=0.001)
+    calls = scripted(client, make_response(503), requests.ConnectionError("reset"), make_response(200, body={}))
+    assert client.get("http://test/points/40.0,-80.0").status_code == 200
+    assert len(calls) == 3
+
+
+def test_last_response_is_returned_when_retries_run_out(make_response):
+    client = NWSClient(base_url="http://test", backoff=0.001, max_retries=2)
+    calls = scripted(client, *[make_response(503)] * 3)
+    assert client.get("http://test/points/40.0,-80.0").status_code == 503
+    assert len(calls) == 3
+
+
+def test_read_timeout_is_not_retried(standin):
+    server = standin(latency=1.0)
+    client = NWSClient(base_url=server.base_url, timeout=0.2)
+    start = time.perf_counter()
+    with pytest.raises(requests.ReadTimeout):
+        client.get(client.url("/points/40.0,-80.0"))
+    client.close()
+    assert time.perf_counter() - start < 0.8
+
+
+def test_retries_stop_at_the_call_deadline(make_response):
+    client = NWSClient(base_url="http://test", backoff=0.2, max_call_seconds=0.5)
+    calls = scripted(client, *[make_response(503)] * 4)
+    start = time.perf_counter()
+    assert client.get("http://test/points/40.0,-80.0").status_code == 503
+    assert time.perf_counter() - start < 0.5
+    # 0.2 s of backoff fits before the deadline, the next 0.4 s does not.
+    assert len(calls) == 2
+    # Each attempt's timeout is clipped to what is left of the deadline.
+    assert all(timeout <= 0.5 for timeout in calls)
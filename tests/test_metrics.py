@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.http_client import NWSClient, endpoint_of
+from src.metrics import METRICS, Metrics, Trace, traced, tracing
+
+
+def test_counters_are_keyed_by_name_and_labels():
+    metrics = Metrics()
+    metrics.count("requests", endpoint="points", status=200)
+    metrics.count("requests", 2, status=200, endpoint="points")
+    metrics.count("requests", endpoint="forecast", status=200)
+    assert metrics.counter("requests", endpoint="points", status="200") == 3
+    assert metrics.counter("requests", endpoint="forecast", status=200) == 1
+    assert metrics.counter("requests", endpoint="stations", status=200) == 0
+
+
+def test_timer_percentiles_snapshot_and_prometheus():
+    metrics = Metrics()
+    assert metrics.percentile("nws_request", 0.5, endpoint="points") is None
+    for ms in range(1, 101):
+        metrics.observe("nws_request", ms / 1000, endpoint="points")
+    assert metrics.percentile("nws_request", 0.5, endpoint="points") == 0.051
+    assert metrics.percentile("nws_request", 0.95, endpoint="points") == 0.096
+
+    (timer,) = metrics.snapshot()["timers"]
+    assert timer["labels"] == {"endpoint": "points"}
+    assert timer["count"] == 100 and timer["max_seconds"] == 0.1
+
+    text = metrics.prometheus()
+    assert "# TYPE nws_request_seconds histogram" in text
+    assert 'nws_request_seconds_bucket{endpoint="points",le="0.01"} 10' in text
+    assert 'nws_request_seconds_bucket{endpoint="points",le="+Inf"} 100' in text
+    assert 'nws_request_seconds_count{endpoint="points"} 100' in text
+
+
+def test_trace_collects_spans_across_threads():
+    metrics = Metrics()
+    trace = Trace()
+
+    def work(endpoint):
+        with metrics.span("nws_request", endpoint=endpoint):
+            pass
+
+    with ThreadPoolExecutor(3) as pool:
+        list(pool.map(lambda e: traced(trace, work, e), ["points", "observation", "observation"]))
+    # Spans outside the trace are not added to it.
+    work("forecast")
+    with tracing(None):
+        work("forecast")
+
+    assert {name: n for name, (n, _) in trace.breakdown().items()} == {"points": 1, "observation": 2}
+    assert trace.summary().startswith(("points", "observation")) and "total" in trace.summary()
+
+
+def test_endpoint_of():
+    assert endpoint_of("https://api.weather.gov/points/40.4406,-79.9959") == "points"
+    assert endpoint_of("https://api.weather.gov/gridpoints/PBZ/77,65/forecast") == "forecast"
+    assert endpoint_of("https://api.weather.gov/gridpoints/PBZ/77,65/forecast/hourly?units=us") == "forecast_hourly"
+    assert endpoint_of("https://api.weather.gov/gridpoints/PBZ/77,65/stations") == "stations"
+    assert endpoint_of("https://api.weather.gov/stations/KPIT/observations/latest") == "observation"
+    assert endpoint_of("https://api.weather.gov/alerts") == "other"
+
+
+def test_client_counts_requests_retries_and_bytes(make_response):
+    client = NWSClient(base_url="http://test", backoff=0.001)
+    answers = [make_response(503), make_response(200, body={"ok": True})]
+    client.session.get = lambda url, timeout, **kwargs: answers.pop(0)
+
+    def counted():
+        return (
+            METRICS.counter("nws_requests_total", endpoint="stations", status=503),
+            METRICS.counter("nws_requests_total", endpoint="stations", status=200),
+            METRICS.counter("nws_retries_total", endpoint="stations"),
+            METRICS.counter("nws_response_bytes_total", endpoint="stations"),
+        )
+
+    before = counted()
+    client.get("http://test/gridpoints/TST/1,2/stations")
+    after = counted()
+    assert [b - a for a, b in zip(before, after)] == [1, 1, 1, len(b'{"ok": true}')]
@@ -0,0 +1,137 @@
+import time
+
+import pytest
+import requests
+
+from src.http_client import NWSClient
+from src.metrics import METRICS
+from src.nws_cache import ResponseCache, freshness_lifetime
+
+URL = "http://test/gridpoints/TST/1,2/forecast"
+
+
+class ScriptedClient:
+    """Answers get() from a list of responses (or exceptions) and remembers the headers it was sent."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.sent = []
+
+    def get(self, url, headers=None):
+        self.sent.append(headers or {})
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def _metric(result):
+    return METRICS.counter("nws_cache_total", cache="forecast", result=result)
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"Cache-Control": "max-age=60"}) == (60.0, True, None)
+    assert freshness_lifetime({"Cache-Control": "max-age=60", "Age": "20"}) == (40.0, True, None)
+    assert freshness_lifetime({"Cache-Control": "no-store"}) == (0.0, False, None)
+    assert freshness_lifetime({"Cache-Control": "no-cache"}) == (0.0, True, 0.0)
+    assert freshness_lifetime({"Cache-Control": "no-cache, stale-while-revalidate=30"}) == (0.0, True, 30.0)
+
+
+def test_fresh_entry_is_served_without_a_request(make_response):
+    cache = ResponseCache()
+    client = ScriptedClient(make_response(200, {"Cache-Control": "max-age=60"}, {"v": 1}))
+    hits = _metric("hits")
+    assert cache.get_json(client, URL) == {"v": 1}
+    assert cache.get_json(client, URL) == {"v": 1}
+    assert len(client.sent) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert _metric("hits") == hits + 1
+
+
+def test_expired_entry_is_revalidated_with_304(make_response):
+    cache = ResponseCache(stale_while_revalidate=0)
+    client = ScriptedClient(
+        make_response(200, {"Cache-Control": "max-age=0", "ETag": '"abc"'}, {"v": 1}),
+        make_response(304, {"Cache-Control": "max-age=60"}),
+    )
+    revalidated = _metric("revalidated")
+    saved = METRICS.counter("nws_cache_bytes_saved_total", cache="forecast")
+    cache.get_json(client, URL)
+    assert cache.get_json(client, URL) == {"v": 1}
+    assert client.sent[1] == {"If-None-Match": '"abc"'}
+    assert cache.stats()["revalidated"] == 1
+    assert _metric("revalidated") == revalidated + 1
+    assert METRICS.counter("nws_cache_bytes_saved_total", cache="forecast") == saved + len(b'{"v": 1}')
+    assert cache.stats()["bytes_saved"] == len(b'{"v": 1}')
+    # The 304 made the entry fresh again.
+    assert cache.get_json(client, URL) == {"v": 1}
+    assert len(client.sent) == 2
+
+
+def test_stale_entry_is_served_while_revalidating(make_response):
+    cache = ResponseCache()
+    client = ScriptedClient(
+        make_response(200, {"Cache-Control": "max-age=0, stale-while-revalidate=60"}, {"v": 1}),
+        make_response(200, {"Cache-Control": "max-age=60"}, {"v": 2}),
+    )
+    cache.get_json(client, URL)
+    assert cache.get_json(client, URL) == {"v": 1}
+    deadline = time.monotonic() + 5
+    while cache.stats()["refreshed"] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert cache.get_json(client, URL) == {"v": 2}
+
+
+def test_no_cache_response_is_never_served_stale(make_response):
+    cache = ResponseCache(stale_while_revalidate=600)
+    client = ScriptedClient(
+        make_response(200, {"Cache-Control": "no-cache", "ETag": '"a"'}, {"v": 1}),
+        make_response(200, {"Cache-Control": "no-cache", "ETag": '"b"'}, {"v": 2}),
+    )
+    cache.get_json(client, URL)
+    # Revalidated in the foreground, so the new body comes back at once.
+    assert cache.get_json(client, URL) == {"v": 2}
+    assert client.sent[1] == {"If-None-Match": '"a"'}
+    assert cache.stats()["stale"] == 0
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [requests.ConnectionError("down"), "503"],
+)
+def test_stale_entry_stands_in_when_nws_fails(make_response, failure):
+    cache = ResponseCache(stale_while_revalidate=0)
+    if failure == "503":
+        failure = make_response(503)
+    client = ScriptedClient(make_response(200, {"Cache-Control": "max-age=0"}, {"v": 1}), failure)
+    cache.get_json(client, URL)
+    assert cache.get_json(client, URL) == {"v": 1}
+    assert cache.stats()["stale"] == 1
+
+
+def test_errors_without_a_usable_entry_are_raised(make_response):
+    cache = ResponseCache(stale_if_error=0)
+    client = ScriptedClient(requests.ConnectionError("down"))
+    with pytest.raises(requests.ConnectionError):
+        cache.get_json(client, URL)
+
+    client = ScriptedClient(make_response(200, {"Cache-Control": "max-age=0"}, {"v": 1}), make_response(503))
+    cache = ResponseCache(stale_while_revalidate=0, stale_if_error=0)
+    cache.get_json(client, URL)
+    with pytest.raises(requests.HTTPError):
+        cache.get_json(client, URL)
+
+
+def test_revalidation_against_the_standin(standin):
+    server = standin()
+    client = NWSClient(base_url=server.base_url)
+    cache = ResponseCache(stale_while_revalidate=0)
+    url = client.url("/gridpoints/TST/4000,5217/forecast")
+    body = cache.get_json(client, url)
+    cache._entries[url]["expires_at"] = 0
+    assert cache.get_json(client, url) == body
+    client.close()
+    assert cache.stats()["revalidated"] == 1
+    # The second answer was a 304 with no body.
+    assert server.state.requests == 2
@@ -0,0 +1,65 @@
+import json
+
+from src.nws_cache import PointsCache, point_key
+
+PROPERTIES = {
+    "forecast": "https://api.weather.gov/gridpoints/PBZ/77,65/forecast",
+    "observationStations": "https://api.weather.gov/gridpoints/PBZ/77,65/stations",
+    "gridId": "PBZ",
+    "gridX": 77,
+    "gridY": 65,
+    "relativeLocation": {"type": "Feature"},
+    "county": "https://api.weather.gov/zones/county/PAC003",
+}
+
+
+def test_point_key_rounds_like_nws():
+    assert point_key(40.44062, -79.99589) == "40.4406,-79.9959"
+    assert point_key(40.4406, -80) == "40.4406,-80.0000"
+
+
+def test_only_the_used_fields_are_kept(tmp_path):
+    cache = PointsCache(tmp_path / "points.json")
+    kept = cache.put(40.4406, -79.9959, PROPERTIES)
+    assert set(kept) == {"forecast", "observationStations", "gridId", "gridX", "gridY"}
+    # Nearby coordinates that NWS rounds to the same point share the entry.
+    assert cache.get(40.44062, -79.99589) == kept
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = tmp_path / "points.json"
+    cache = PointsCache(path)
+    kept = cache.put(40.4406, -79.9959, PROPERTIES)
+    cache.flush()
+    assert PointsCache(path).get(40.4406, -79.9959) == kept
+
+
+def test_disk_writes_are_deferred_and_coalesced(tmp_path):
+    path = tmp_path / "points.json"
+    cache = PointsCache(path)
+    cache.put(40.0, -80.0, PROPERTIES)
+    cache.put(41.0, -80.0, PROPERTIES)
+    assert not path.exists()
+    cache.flush()
+    with path.open(encoding="utf-8") as f:
+        assert len(json.load(f)) == 2
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = PointsCache(tmp_path / "points.json", ttl=0)
+    cache.put(40.4406, -79.9959, PROPERTIES)
+    assert cache.get(40.4406, -79.9959) is None
+
+
+def test_memory_and_disk_are_bounded(tmp_path):
+    path = tmp_path / "points.json"
+    cache = PointsCache(path, max_memory=1, max_disk=2)
+    for lat in (40.0, 41.0, 42.0):
+        cache.put(lat, -80.0, PROPERTIES)
+    cache.flush()
+    assert len(cache._memory) == 1
+    with path.open(encoding="utf-8") as f:
+        assert sorted(json.load(f)) == ["41.0000,-80.0000", "42.0000,-80.0000"]
+    # Evicted from memory but still on disk.
+    assert cache.get(41.0, -80.0) is not None
+    assert cache.get(40.0, -80.0) is None
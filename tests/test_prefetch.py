@@ -0,0 +1,20 @@
+from src.prefetch import PrefetchScheduler
+
+AUSTIN = ("Austin city, TX", 30.2672, -97.7431)
+BOSTON = ("Boston city, MA", 42.3601, -71.0589)
+
+
+def test_tracked_cities_are_written_behind(tmp_path):
+    path = tmp_path / "prefetch.json"
+    scheduler = PrefetchScheduler(engine=None, path=path)
+    scheduler.touch(*AUSTIN)
+    scheduler.pin(*BOSTON)
+    # touch and pin run on the Tk thread; neither writes the file itself.
+    assert not path.exists()
+    scheduler.flush()
+    scheduler.stop()
+
+    reloaded = PrefetchScheduler(engine=None, path=path)
+    assert reloaded.tracked() == [AUSTIN[0], BOSTON[0]]
+    assert reloaded.is_pinned(BOSTON[0]) and not reloaded.is_pinned(AUSTIN[0])
+    reloaded.stop()
@@ -0,0 +1,160 @@
+import time
+
+import pytest
+import requests
+
+from src.http_client import NWSClient
+from src.metrics import METRICS
+from src.resilience import CircuitBreaker, CircuitOpenError, HedgeBudget, LatencyTracker
+from src.weather import fetch_latest_relative_humidity, fetch_points, ranked_station_ids
+
+
+def test_breaker_opens_after_threshold_and_lists_the_key():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record("points", False)
+    assert breaker.allow("points")
+    breaker.record("points", False)
+    assert not breaker.allow("points")
+    assert breaker.open_keys() == ["points"]
+    assert breaker.allow("forecast")
+
+
+def test_breaker_success_resets_the_count():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record("points", False)
+    breaker.record("points", True)
+    breaker.record("points", False)
+    assert breaker.allow("points")
+
+
+def test_breaker_half_open_allows_one_trial():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record("points", False)
+    assert not breaker.allow("points")
+    time.sleep(0.06)
+    assert breaker.allow("points")
+    # Only one trial at a time.
+    assert not breaker.allow("points")
+    breaker.record("points", True)
+    assert breaker.allow("points")
+    assert breaker.open_keys() == []
+
+
+def test_breaker_failed_trial_reopens_for_a_full_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record("points", False)
+    time.sleep(0.06)
+    assert breaker.allow("points")
+    breaker.record("points", False)
+    assert not breaker.allow("points")
+    assert breaker.open_keys() == ["points"]
+
+
+def test_breaker_trial_that_never_reports_expires():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record("points", False)
+    time.sleep(0.06)
+    assert breaker.allow("points")
+    time.sleep(0.06)
+    assert breaker.allow("points")
+
+
+def test_latency_tracker_timeout_and_hedge_delay():
+    tracker = LatencyTracker(min_samples=10, multiplier=4, min_timeout=0.5)
+    for _ in range(9):
+        tracker.add("points", 0.1)
+    assert tracker.timeout("points", 20) == 20
+    assert tracker.hedge_delay("points") is None
+
+    tracker.add("points", 0.1)
+    assert tracker.timeout("points", 20) == pytest.approx(0.5)  # 4 x 0.1, raised to the floor
+    assert tracker.hedge_delay("points") == pytest.approx(0.1)
+    assert tracker.timeout("points", 0.3) == 0.3  # never above the fixed timeout
+
+
+def test_hedge_budget_allows_burst_then_ratio():
+    budget = HedgeBudget(ratio=0.1, burst=2)
+    assert budget.try_hedge() and budget.try_hedge()
+    assert not budget.try_hedge()
+    for _ in range(10):
+        budget.count_request()
+    assert budget.try_hedge()
+    assert not budget.try_hedge()
+
+
+def test_slow_first_attempt_is_hedged(make_response):
+    client = NWSClient(base_url="http://test", circuit_breakers=False)
+    for _ in range(30):
+        client.latency.add("points", 0.01)
+    calls = []
+
+    def get(url, timeout, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(1.0)
+        return make_response(200, body={"n": len(calls)})
+
+    client.session.get = get
+    wins = METRICS.counter("nws_hedge_wins_total", endpoint="points")
+    start = time.perf_counter()
+    response = client.get("http://test/points/40.0,-80.0")
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    assert response.json() == {"n": 2}
+    assert elapsed < 0.5
+    assert METRICS.counter("nws_hedge_wins_total", endpoint="points") == wins + 1
+
+
+def test_fast_attempt_is_not_hedged(make_response):
+    client = NWSClient(base_url="http://test")
+    for _ in range(30):
+        client.latency.add("points", 0.05)
+    calls = []
+    client.session.get = lambda url, timeout, **kwargs: calls.append(url) or make_response(200, body={})
+    for _ in range(5):
+        client.get("http://test/points/40.0,-80.0")
+    client.close()
+    assert len(calls) == 5
+
+
+def test_breaker_short_circuits_a_failing_endpoint(standin):
+    server = standin(error_rate=1.0)
+    client = NWSClient(base_url=server.base_url, max_retries=0, hedge=False)
+    for _ in range(5):
+        assert client.get(client.url("/points/40.0,-80.0")).status_code == 503
+    with pytest.raises(CircuitOpenError):
+        client.get(client.url("/points/40.0,-80.0"))
+    client.close()
+    assert server.state.snapshot()["requests"] == 5
+
+
+def test_half_open_trial_survives_its_own_retries(make_response):
+    client = NWSClient(backoff=0.001, hedge=False)
+    client.breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    client.breaker.record("points", False)
+    time.sleep(0.02)
+    statuses = [503, 503, 200]
+    client._send = lambda *args: make_response(statuses.pop(0))
+    assert client.get("http://test/points/40.0,-80.0").status_code == 200
+    assert client.breaker.open_keys() == []
+
+
+def test_timed_out_station_falls_through_to_the_next(standin):
+    server = standin()
+    client = NWSClient(base_url=server.base_url, hedge=False)
+    first, second = ranked_station_ids(fetch_points(41.5, -81.7, client), client)[:2]
+    sent = []
+    get = client.get
+
+    def get_or_time_out(url, **kwargs):
+        sent.append(url)
+        if f"/stations/{first}/" in url:
+            raise requests.ReadTimeout(url)
+        return get(url, **kwargs)
+
+    client.get = get_or_time_out
+    assert fetch_latest_relative_humidity(41.5, -81.7, client) is not None
+    client.close()
+    assert [url.split("/")[-3] for url in sent] == [first, second]
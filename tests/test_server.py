@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.http_client import NWSClient
+from src.server import HTTPError, WeatherService, _read_request
+
+
+def _read(raw):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await _read_request(reader), await _read_request(reader)
+
+    return asyncio.run(read())
+
+
+def test_request_body_is_dropped_and_the_next_request_is_read():
+    first, second = _read(b"POST /health HTTP/1.1\r\nContent-Length: 3\r\n\r\nabcGET /search HTTP/1.1\r\n\r\n")
+    assert first == ("POST", "/health", True)
+    assert second == ("GET", "/search", True)
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-1", b"1.5"])
+def test_bad_content_length_is_a_400(length):
+    with pytest.raises(HTTPError) as e:
+        _read(b"GET /health HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+    assert e.value.status == 400
+
+
+def test_search_and_forecast_run_off_the_event_loop(standin):
+    server = standin()
+    service = WeatherService(NWSClient(base_url=server.base_url), workers=2)
+    threads = []
+    search, day_summaries = service._search, service._day_summaries
+    service._search = lambda *args: threads.append(threading.current_thread()) or search(*args)
+    service._day_summaries = lambda *args: threads.append(threading.current_thread()) or day_summaries(*args)
+
+    async def run():
+        return [
+            await service.dispatch("GET", "/search?q=pitts&limit=3"),
+            await service.dispatch("GET", "/forecast?lat=40.44&lon=-79.99&days=2&hourly=1"),
+        ]
+
+    try:
+        (search_status, found), (forecast_status, forecast) = asyncio.run(run())
+    finally:
+        service.close()
+    assert search_status == 200 and found["results"]
+    assert forecast_status == 200 and len(forecast["days"]) == 2
+    assert len(threads) == 2 and threading.main_thread() not in threads
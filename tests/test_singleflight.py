@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.http_client import NWSClient
+from src.singleflight import SingleFlight
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _run_concurrently(flight, fn, callers):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def call(i):
+        try:
+            results[i] = flight.do("key", fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"answer": 42}
+
+    threads, results, errors = _run_concurrently(flight, fn, 5)
+    _wait_for(lambda: flight.in_flight().get("key") == 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert errors == [None] * 5
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {"leaders": 1, "collapsed": 4}
+    assert flight.in_flight() == {}
+
+
+def test_error_reaches_every_caller():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, results, errors = _run_concurrently(flight, fn, 3)
+    _wait_for(lambda: flight.in_flight().get("key") == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_finished_calls_are_not_reused():
+    flight = SingleFlight("test")
+    calls = []
+    assert flight.do("key", lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do("key", lambda: calls.append(1) or len(calls)) == 2
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_client_sends_one_request_for_identical_concurrent_gets(standin):
+    server = standin(latency=0.3)
+    client = NWSClient(base_url=server.base_url)
+    url = client.url("/points/40.0000,-80.0000")
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(lambda _: client.get(url), range(4)))
+    client.close()
+
+    assert server.state.snapshot()["requests"] == 1
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].json() == responses[3].json()
+
+
+def test_coalesced_callers_get_their_own_response(standin):
+    server = standin(latency=0.3)
+    client = NWSClient(base_url=server.base_url)
+    url = client.url("/points/40.0000,-80.0000")
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(lambda _: client.get(url), range(4)))
+    client.close()
+
+    assert server.state.snapshot()["requests"] == 1
+    assert len({id(r) for r in responses}) == 4
+    responses[0].headers["X-Changed"] = "1"
+    responses[0].close()
+    assert "X-Changed" not in responses[1].headers
+    assert responses[1].json() == responses[2].json()
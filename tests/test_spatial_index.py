@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from src.cities import ALL_CITIES, CITY_DB, cities_within, nearest_cities
+from src.spatial_index import SpatialIndex, haversine_km
+
+rng = random.Random(15113)
+# Clustered like real places, plus points near the poles and the antimeridian.
+POINTS = [(rng.uniform(25, 49), rng.uniform(-125, -67)) for _ in range(2000)]
+POINTS += [(rng.uniform(85, 90), rng.uniform(-180, 180)) for _ in range(50)]
+POINTS += [(rng.uniform(-60, 60), rng.choice((-1, 1)) * rng.uniform(178, 180)) for _ in range(50)]
+QUERIES = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(100)]
+QUERIES += [(40.4406, -79.9959), (89.9, 0.0), (0.0, 179.99), (0.0, -179.99)]
+
+
+def brute_force(lat, lon):
+    return sorted((haversine_km(lat, lon, p_lat, p_lon), i) for i, (p_lat, p_lon) in enumerate(POINTS))
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SpatialIndex([p[0] for p in POINTS], [p[1] for p in POINTS])
+
+
+def test_nearest_matches_brute_force(index):
+    for lat, lon in QUERIES:
+        expected = brute_force(lat, lon)[:5]
+        found = index.nearest(lat, lon, k=5)
+        assert [i for i, _ in found] == [i for _, i in expected]
+        assert [km for _, km in found] == pytest.approx([km for km, _ in expected], abs=1e-6)
+
+
+def test_within_matches_brute_force(index):
+    for lat, lon in QUERIES:
+        for radius in (50.0, 500.0):
+            expected = [i for km, i in brute_force(lat, lon) if km <= radius]
+            assert [i for i, _ in index.within(lat, lon, radius)] == expected
+
+
+def test_empty_index_and_k_zero(index):
+    assert SpatialIndex([], []).nearest(40.0, -80.0) == []
+    assert index.nearest(40.0, -80.0, k=0) == []
+
+
+def test_nearest_city_names():
+    name = ALL_CITIES[0]
+    lat, lon = CITY_DB[name]
+    assert nearest_cities(lat, lon, k=1)[0][0] == name
+    assert name in [n for n, _ in cities_within(lat, lon, 1.0)]
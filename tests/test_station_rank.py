@@ -0,0 +1,62 @@
+import time
+
+from src.http_client import NWSClient
+from src.station_rank import StationRanking
+from src.weather import fetch_latest_relative_humidity
+
+URL = "http://test/gridpoints/TST/1,2/stations"
+
+
+class StationList:
+    """fetch_station_ids stand-in that counts its calls."""
+
+    def __init__(self, *station_ids):
+        self.station_ids = list(station_ids)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.station_ids)
+
+
+def test_nws_order_until_something_is_learned(tmp_path):
+    ranking = StationRanking(tmp_path / "stations.json")
+    fetch = StationList("A", "B", "C")
+    assert ranking.ordered(URL, fetch) == ["A", "B", "C"]
+    assert ranking.ordered(URL, fetch) == ["A", "B", "C"]
+    assert fetch.calls == 1
+
+
+def test_reporting_station_goes_first_and_silent_ones_sink(tmp_path):
+    ranking = StationRanking(tmp_path / "stations.json")
+    fetch = StationList("A", "B", "C", "D")
+    ranking.ordered(URL, fetch)
+    ranking.record(URL, "A", False)
+    ranking.record(URL, "C", True)
+    assert ranking.ordered(URL, fetch) == ["C", "B", "D", "A"]
+    # The last good station loses its place as soon as it stops reporting.
+    ranking.record(URL, "C", False)
+    assert ranking.ordered(URL, fetch) == ["B", "C", "D", "A"]
+
+
+def test_stale_list_is_refetched_and_keeps_what_was_learned(tmp_path):
+    ranking = StationRanking(tmp_path / "stations.json", ttl=0.05)
+    fetch = StationList("A", "B", "C")
+    ranking.ordered(URL, fetch)
+    ranking.record(URL, "B", True)
+    ranking.record(URL, "C", False)
+    time.sleep(0.06)
+    fetch.station_ids = ["C", "D", "A"]
+    assert ranking.ordered(URL, fetch) == ["D", "A", "C"]
+    assert fetch.calls == 2
+
+
+def test_repeat_lookup_needs_one_observation_request(standin):
+    server = standin()
+    client = NWSClient(base_url=server.base_url)
+    first = fetch_latest_relative_humidity(40.4406, -79.9959, client)
+    before = server.state.requests
+    assert fetch_latest_relative_humidity(40.4406, -79.9959, client) == first
+    client.close()
+    assert first is not None
+    assert server.state.requests - before == 1